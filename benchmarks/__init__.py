@@ -0,0 +1,4 @@
+"""
+Benchmarks for tyme, run from the repository root with
+`python -m benchmarks.<name>`.
+"""
@@ -0,0 +1,80 @@
+"""
+Fires many concurrent `tyme start` invocations, along with readers running
+`tyme status`, at the same timeline, then checks that no event was lost and
+reports the throughput.
+
+    python -m benchmarks.bench_concurrency [--starts STARTS]
+                                           [--readers READERS]
+                                           [--concurrency CONCURRENCY]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# counts the entries of the default user's timeline
+COUNT_ENTRIES = """
+from tyme.timeline import Timeline
+timeline = Timeline()
+print(sum(1 for _ in timeline.iter_recent()))
+"""
+
+
+def tyme(tyme_dir: str, *args: str, stdin: str = None) -> None:
+    subprocess.run([sys.executable, "-m", "tyme", *args],
+                   env=dict(os.environ, TYME_DIR=tyme_dir),
+                   input=stdin, universal_newlines=True,
+                   stdout=subprocess.DEVNULL, check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--starts", type=int, default=200)
+    parser.add_argument("--readers", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    tyme_dir = tempfile.mkdtemp()
+    try:
+        tyme(tyme_dir, "status", stdin="benchmark\n")
+        for i in range(10):
+            tyme(tyme_dir, "make", "-p", f"/benchmark/activity{i}")
+
+        commands = [("start", f"activity{i % 10}") for i in range(args.starts)]
+        commands += [("status",)] * args.readers
+        # interleave readers and writers
+        random.Random(0).shuffle(commands)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            for future in [pool.submit(tyme, tyme_dir, *command)
+                           for command in commands]:
+                future.result()
+        elapsed = time.perf_counter() - start
+
+        result = subprocess.run([sys.executable, "-c", COUNT_ENTRIES],
+                                env=dict(os.environ, TYME_DIR=tyme_dir),
+                                stdout=subprocess.PIPE,
+                                universal_newlines=True, check=True)
+        entries = int(result.stdout)
+
+        print(f"{len(commands)} invocations with {args.concurrency} at a "
+              f"time: {elapsed:.2f}s, {len(commands) / elapsed:.1f}/s")
+        print(f"entries: {entries} of {args.starts}")
+
+        if entries != args.starts:
+            print(f"lost {args.starts - entries} events")
+            sys.exit(1)
+
+    finally:
+        shutil.rmtree(tyme_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Measures what is saved by entries that only store the short id of their
+activity, over the uuid4 and name they stored before version 3 of the
+storage layout (see `tyme.migrate`): the size of the shards and the time
+taken to read every one of them, along with the time taken to migrate a
+timeline from the old layout.
+
+    python -m benchmarks.bench_ids [--years YEARS] [--activities ACTIVITIES]
+                                   [--runs RUNS]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from benchmarks.bench_suite import median_ms
+from benchmarks.generate import USER, generate
+
+
+def write_version_2(directory: Path, old_directory: Path) -> None:
+    """
+    Writes the timeline in `directory` to `old_directory` as version 2 of
+    the storage layout wrote it, with random uuid4s as activity ids.
+    """
+    from tyme.activities import (ActivityIndex, read_activities,
+                                 write_activities)
+    from tyme.meta import read_meta, write_meta
+    from tyme.shards import is_shard
+
+    rng = random.Random(0)
+    activities = read_activities(directory)
+    names = ActivityIndex(activities).name_by_id
+    uuids = {activity_id: str(uuid.UUID(int=rng.getrandbits(128), version=4))
+             for activity_id in names}
+
+    def old_hierarchy(category):
+        return {name: (uuids[activity_id], old_hierarchy(children))
+                for name, (activity_id, children) in category.items()}
+
+    old_directory.mkdir(parents=True)
+    write_activities(old_directory, old_hierarchy(activities))
+    write_meta(old_directory, {"version": 2,
+                               "longest": read_meta(directory)["longest"]})
+
+    for path in directory.iterdir():
+        if not is_shard(path):
+            continue
+
+        with open(path) as shard, open(old_directory / path.name, "w") as old:
+            for line in shard:
+                entry = json.loads(line)
+                old_entry = {"day": entry.pop("day"),
+                             "id": uuids[entry["id"]],
+                             "name": names[entry.pop("id")],
+                             **entry}
+                old.write(json.dumps(old_entry, separators=(",", ":")) + "\n")
+
+
+def shards_size(directory: Path) -> int:
+    """
+    Returns the number of bytes taken by the shards of the timeline in
+    `directory`.
+    """
+    from tyme.shards import is_shard
+
+    return sum(path.stat().st_size for path in directory.iterdir()
+               if is_shard(path))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--activities", type=int, default=2000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    # must be set before `tyme` is imported, since its paths are computed then
+    tyme_dir = tempfile.mkdtemp()
+    os.environ["TYME_DIR"] = tyme_dir
+
+    from tyme.migrate import shorten_ids
+    from tyme.shards import TimelineShards
+
+    try:
+        generate(Path(tyme_dir), years=args.years, activities=args.activities)
+        directory = Path(tyme_dir) / "timelines" / USER
+        old_directory = Path(tyme_dir) / "timelines" / "version2"
+        write_version_2(directory, old_directory)
+
+        def load(path):
+            return lambda: sum(len(entries) for _, entries
+                               in TimelineShards(path).items())
+
+        entries = load(directory)()
+        print(f"{entries} entries over {args.activities} activities")
+        for name, path in [("uuids and names", old_directory),
+                           ("short ids      ", directory)]:
+            print(f"{name}: {shards_size(path) / 2 ** 20:8.2f} MiB, "
+                  f"read in {median_ms(load(path), args.runs):8.1f}ms")
+
+        start = time.perf_counter()
+        shorten_ids(old_directory)
+        print(f"migrated in {time.perf_counter() - start:.2f}s, to "
+              f"{shards_size(old_directory) / 2 ** 20:.2f} MiB")
+
+    finally:
+        shutil.rmtree(tyme_dir)
+
+
+if __name__ == "__main__":
+    main()
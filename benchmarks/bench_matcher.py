@@ -0,0 +1,77 @@
+"""
+Compares resolving partial activity names with `tyme.matcher` to scanning a
+hierarchy, enumerated recursively for every lookup as `tyme make` used to.
+
+    python -m benchmarks.bench_matcher [--activities ACTIVITIES]
+                                       [--number NUMBER]
+"""
+
+import argparse
+import timeit
+import uuid
+
+from tyme.activities import ActivityIndex
+from tyme.matcher import ActivityMatcher
+
+
+def make_activities(activities: int):
+    """
+    Returns a hierarchy of `activities` activities, ten per category.
+    """
+    hierarchy = {}
+    categories = [hierarchy]
+    for i in range(activities):
+        children = {}
+        categories[i // 10][f"activity{i}"] = (str(uuid.uuid4()), children)
+        categories.append(children)
+
+    return hierarchy
+
+
+def enumerate_paths(tree, prefix=""):
+    out = []
+    for name, (activity_id, subtree) in tree.items():
+        out.append((f"{prefix}/{name}", activity_id))
+        out.extend(enumerate_paths(subtree, f"{prefix}/{name}"))
+    return out
+
+
+def scan(activities, query):
+    return [activity_id for path, activity_id in enumerate_paths(activities)
+            if query in path.rsplit("/", 1)[-1].lower()]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--activities", type=int, default=1000)
+    parser.add_argument("--number", type=int, default=1000)
+    args = parser.parse_args()
+
+    activities = make_activities(args.activities)
+    index = ActivityIndex(activities)
+
+    build = min(timeit.repeat(lambda: ActivityMatcher(index),
+                              number=1, repeat=5))
+    matcher = ActivityMatcher(index)
+
+    # prefixes of names, and parts of names that aren't prefixes
+    queries = [f"activity{i * 7 % args.activities}" for i in range(10)]
+    queries += [f"ity{i * 13 % args.activities}" for i in range(10)]
+
+    print(f"{args.activities} activities, building the matcher: "
+          f"{build * 1e3:.2f}ms")
+    baseline = None
+    for name, lookup in [("scan", lambda q: scan(activities, q)),
+                         ("matcher", matcher.match)]:
+        rounds = max(1, args.number // len(queries))
+        elapsed = min(timeit.repeat(lambda: [lookup(q) for q in queries],
+                                    number=rounds,
+                                    repeat=3))
+        per_lookup = elapsed / (rounds * len(queries))
+        baseline = baseline or per_lookup
+        print(f"  {name:10} {per_lookup * 1e6:10.1f}us per lookup "
+              f"({baseline / per_lookup:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
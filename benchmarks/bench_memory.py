@@ -0,0 +1,84 @@
+"""
+Measures the memory taken by timeline entries kept as the dictionaries of
+strings they are stored as, and as `Entry` objects.
+
+    python -m benchmarks.bench_memory [--entries ENTRIES]
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+from datetime import datetime, timedelta
+
+from tyme.entry import Entry
+
+
+def make_lines(entries: int):
+    """
+    Returns `entries` shard lines, over 50 activities.
+    """
+    lines = []
+    moment = datetime(2000, 1, 1)
+    for i in range(entries):
+        next_moment = moment + timedelta(minutes=60 + i % 90)
+        lines.append(json.dumps({
+            "day": moment.date().isoformat(),
+            "id": str(i % 50 + 1),
+            "start": moment.strftime("%Y-%m-%d_%H:%M:%S"),
+            "end": next_moment.strftime("%Y-%m-%d_%H:%M:%S"),
+        }))
+        moment = next_moment
+
+    return lines
+
+
+def measure(load, lines) -> int:
+    """
+    Returns the number of bytes allocated by `load(lines)` and still held by
+    its result.
+    """
+    gc.collect()
+    tracemalloc.start()
+    result = load(lines)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def load_dicts(lines):
+    entries = []
+    for line in lines:
+        entry = json.loads(line)
+        entry.pop("day")
+        entries.append(entry)
+    return entries
+
+
+def load_entries(lines):
+    entries = []
+    for line in lines:
+        entry = json.loads(line)
+        entry.pop("day")
+        entries.append(Entry.from_json(entry))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    lines = make_lines(args.entries)
+    scale = 1_000_000 / args.entries
+
+    print(f"{args.entries} entries, memory per million entries:")
+    for name, load in [("dicts  ", load_dicts), ("Entry  ", load_entries)]:
+        size = measure(load, lines)
+        print(f"{name} {size * scale / 2 ** 20:8.1f} MiB "
+              f"({size / args.entries:6.1f} bytes per entry)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Measures how long tyme takes to start up: the time spent importing
+`tyme.cli.cli` as reported by `python -X importtime`, and the wall time of a
+full `tyme status` invocation.
+
+    python -m benchmarks.bench_startup [--runs RUNS]
+                                       [--record FILE] [--baseline FILE]
+
+With --record, the results are written to FILE as JSON. With --baseline, the
+results are compared to a previously recorded FILE and the benchmark exits
+with a non-zero status if any of them regressed by more than --tolerance.
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks import results
+
+
+def import_times() -> Tuple[int, List[Tuple[int, str]]]:
+    """
+    Imports `tyme.cli.cli` in a fresh interpreter, returning the cumulative
+    import time in microseconds and the self time of every module imported.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import tyme.cli.cli"],
+        stderr=subprocess.PIPE, universal_newlines=True, check=True)
+
+    total = 0
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((int(self_us), name.strip()))
+
+        # modules at the outermost level are not indented
+        if not name.startswith("  ") or name.strip() == "tyme.cli.cli":
+            total = max(total, int(cumulative_us))
+
+    return total, modules
+
+
+def status_time(tyme_dir: str) -> float:
+    """
+    Returns the wall time of running `tyme status` in a fresh interpreter.
+    """
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-m", "tyme", "status"],
+                   env=dict(os.environ, TYME_DIR=tyme_dir),
+                   stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+
+def measure(runs: int) -> Dict[str, float]:
+    tyme_dir = tempfile.mkdtemp()
+    try:
+        subprocess.run([sys.executable, "-m", "tyme", "status"],
+                       env=dict(os.environ, TYME_DIR=tyme_dir),
+                       input="benchmark\n", universal_newlines=True,
+                       stdout=subprocess.DEVNULL, check=True)
+
+        imports = [import_times() for _ in range(runs)]
+        statuses = [status_time(tyme_dir) for _ in range(runs)]
+    finally:
+        shutil.rmtree(tyme_dir)
+
+    print("slowest imports (self time, last run):")
+    for self_us, name in sorted(imports[-1][1], reverse=True)[:10]:
+        print(f"  {self_us / 1000:8.2f}ms  {name}")
+
+    return {
+        "import_tyme_cli_ms": statistics.median(t for t, _ in imports) / 1000,
+        "tyme_status_ms": statistics.median(statuses) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    results.add_arguments(parser)
+    args = parser.parse_args()
+
+    results.report(args, measure(args.runs), runs=args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Compares how long it takes to load and save a timeline in the old hjson
+format and in the current JSON Lines shards.
+
+    python -m benchmarks.bench_storage [--years YEARS]
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import hjson
+
+from tyme.shards import TimelineShards
+
+
+def make_timeline(years: int):
+    """
+    Returns a timeline with roughly ten entries a day for `years` years.
+    """
+    activity_ids = [str(uuid.uuid4()) for _ in range(50)]
+
+    timeline = {}
+    moment = datetime(2000, 1, 1)
+    end = moment + timedelta(days=365 * years)
+    i = 0
+    while moment < end:
+        next_moment = moment + timedelta(minutes=60 + i % 90)
+        timeline.setdefault(moment.date().isoformat(), []).append({
+            "id": activity_ids[i % len(activity_ids)],
+            "name": f"activity {i % len(activity_ids)}",
+            "start": moment.strftime("%Y-%m-%d_%H:%M:%S"),
+            "end": next_moment.strftime("%Y-%m-%d_%H:%M:%S"),
+        })
+        moment = next_moment
+        i += 1
+
+    return timeline
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=int, default=5)
+    args = parser.parse_args()
+
+    timeline = make_timeline(args.years)
+    directory = Path(tempfile.mkdtemp())
+
+    try:
+        hjson_path = directory / "timeline.hjson"
+
+        def save_hjson():
+            with open(hjson_path, "w") as timeline_file:
+                hjson.dump({"timeline": timeline, "activities": {}},
+                           timeline_file)
+
+        def load_hjson():
+            with open(hjson_path) as timeline_file:
+                hjson.load(timeline_file)
+
+        def save_shards():
+            TimelineShards(directory / "shards", days=timeline).save()
+
+        def load_shards():
+            list(TimelineShards(directory / "shards").items())
+
+        def load_last_month():
+            shards = TimelineShards(directory / "shards")
+            shards[shards.last_day()]
+
+        entries = sum(map(len, timeline.values()))
+        print(f"{entries} entries over {len(timeline)} days")
+        print(f"hjson  save:            {timed(save_hjson):8.3f}s")
+        print(f"hjson  load:            {timed(load_hjson):8.3f}s")
+        print(f"shards save:            {timed(save_shards):8.3f}s")
+        print(f"shards load:            {timed(load_shards):8.3f}s")
+        print(f"shards load last month: {timed(load_last_month):8.3f}s")
+
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Times the `Timeline` methods and cli commands used day to day against a
+large synthetic timeline (see `benchmarks.generate`), so that releases can be
+compared on realistic data.
+
+    python -m benchmarks.bench_suite [--years YEARS]
+                                     [--activities ACTIVITIES]
+                                     [--depth DEPTH] [--runs RUNS]
+                                     [--storage {files,sqlite}]
+                                     [--record FILE] [--baseline FILE]
+
+Every measurement is the median of --runs runs, in milliseconds. Methods are
+timed on a freshly loaded timeline, as a cli invocation would run them, and
+cli commands are timed in a fresh interpreter with --direct, so that a
+running tyme daemon doesn't skew them. The timeline is moved to --storage
+before anything is measured. See `benchmarks.results` for --record and
+--baseline.
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from benchmarks import results
+from benchmarks.generate import USER, generate
+
+
+def median_ms(function: Callable[[], None],
+              runs: int,
+              setup: Optional[Callable[[], None]] = None) -> float:
+    """
+    Returns the median time `function` takes over `runs` runs, in
+    milliseconds. `setup` is run before every run, and is not timed.
+    """
+    times = []
+    for _ in range(runs):
+        if setup is not None:
+            setup()
+
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    return statistics.median(times) * 1000
+
+
+def cli_ms(tyme_dir: str, runs: int, *args: str) -> float:
+    """
+    Returns the median wall time of the cli command `args`, in milliseconds.
+    """
+    def run() -> None:
+        subprocess.run([sys.executable, "-m", "tyme", "--direct", *args],
+                       env=dict(os.environ, TYME_DIR=tyme_dir),
+                       stdout=subprocess.DEVNULL, check=True)
+
+    return median_ms(run, runs)
+
+
+def measure(tyme_dir: str, runs: int, storage: str) -> Dict[str, float]:
+    from tyme.timeline import Timeline
+
+    with Timeline.locked(USER) as timeline:
+        timeline.convert(storage)
+        timeline.save()
+
+    def load() -> Timeline:
+        return Timeline(user=USER)
+
+    timeline = load()
+    last_day = timeline.timeline.last_day()
+    month = last_day[:8] + "01"
+    names: List[str] = sorted(timeline.index.name_by_id.values())
+    name = names[len(names) // 2]
+    partial = name[3:]
+
+    def on_loaded(method: Callable[[Timeline], None]) -> float:
+        # the timeline is loaded outside of what is timed
+        loaded: List[Timeline] = []
+        return median_ms(lambda: method(loaded.pop()),
+                         runs,
+                         setup=lambda: loaded.append(load()))
+
+    def locked(method: Callable[[Timeline], None]) -> Callable[[], None]:
+        def run() -> None:
+            with Timeline.locked(USER) as timeline:
+                method(timeline)
+                timeline.save()
+
+        return run
+
+    measurements = {
+        "load_ms": median_ms(load, runs),
+        "load_all_days_ms": median_ms(lambda: len(load().timeline), runs),
+        "current_activity_ms": on_loaded(Timeline.current_activity),
+        "recent_activities_ms": on_loaded(
+            lambda timeline: timeline.recent_activities(100)),
+        "activity_id_ms": on_loaded(
+            lambda timeline: timeline.activity_id(name)),
+        "activity_id_partial_ms": on_loaded(
+            lambda timeline: timeline.activity_id(partial)),
+        "report_month_ms": on_loaded(
+            lambda timeline: timeline.report(month, last_day)),
+        "report_all_ms": on_loaded(
+            lambda timeline: timeline.report("2000-01-01", last_day)),
+        "start_save_ms": median_ms(
+            locked(lambda timeline: timeline.start(name)), runs),
+        "done_save_ms": median_ms(
+            locked(Timeline.done), runs,
+            setup=locked(lambda timeline: timeline.start(name))),
+        "compact_ms": on_loaded(Timeline.compact),
+    }
+
+    for command in [["status"],
+                    ["log"],
+                    ["report", "--from", month, "--to", last_day],
+                    ["start", name],
+                    ["stop"]]:
+        key = "cli_" + command[0] + "_ms"
+        measurements[key] = cli_ms(tyme_dir, runs, *command)
+
+    # only reads the status cache, see `tyme.status`
+    measurements["cli_status_fast_ms"] = cli_ms(tyme_dir, runs,
+                                                "status", "--fast")
+
+    return measurements
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--activities", type=int, default=2000)
+    parser.add_argument("--depth", type=int, default=8)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--storage", choices=["files", "sqlite"],
+                        default="files")
+    results.add_arguments(parser)
+    args = parser.parse_args()
+
+    # must be set before `tyme` is imported, since its paths are computed then
+    tyme_dir = tempfile.mkdtemp()
+    os.environ["TYME_DIR"] = tyme_dir
+
+    try:
+        start = time.perf_counter()
+        generate(Path(tyme_dir),
+                 years=args.years,
+                 activities=args.activities,
+                 depth=args.depth)
+        print(f"generated {args.years} years over {args.activities} "
+              f"activities in {time.perf_counter() - start:.1f}s")
+
+        measurements = measure(tyme_dir, args.runs, args.storage)
+
+    finally:
+        shutil.rmtree(tyme_dir)
+
+    results.report(args,
+                   measurements,
+                   years=args.years,
+                   activities=args.activities,
+                   depth=args.depth,
+                   runs=args.runs,
+                   storage=args.storage)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Measures how `tyme team-report` scales with the number of worker processes,
+over many users each with a year of history.
+
+    python -m benchmarks.bench_team [--users USERS] [--days DAYS]
+                                    [--workers WORKERS [WORKERS ...]]
+"""
+
+import argparse
+import itertools
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+
+def make_user(directory: Path, days: int, seed: int) -> None:
+    """
+    Writes a timeline with roughly ten entries a day for `days` days, over
+    a small hierarchy of activities, to `directory`.
+    """
+    from tyme.activities import write_activities
+    from tyme.meta import FORMAT_VERSION, write_meta
+    from tyme.shards import TimelineShards
+
+    ids = (str(activity_id) for activity_id in itertools.count(1))
+
+    activities = {}
+    leaves = []
+    for project in range(5):
+        project_id = next(ids)
+        children = {}
+        for task in range(10):
+            activity_id = next(ids)
+            children[f"task{task}"] = (activity_id, {})
+            leaves.append(activity_id)
+        activities[f"project{project}"] = (project_id, children)
+
+    timeline = {}
+    moment = datetime(2019, 1, 1)
+    end = moment + timedelta(days=days)
+    i = seed
+    while moment < end:
+        next_moment = moment + timedelta(minutes=60 + i % 90)
+        timeline.setdefault(moment.date().isoformat(), []).append({
+            "id": leaves[i % len(leaves)],
+            "start": moment.strftime("%Y-%m-%d_%H:%M:%S"),
+            "end": next_moment.strftime("%Y-%m-%d_%H:%M:%S"),
+        })
+        moment = next_moment
+        i += 1
+
+    TimelineShards(directory, days=timeline).save()
+    write_activities(directory, activities)
+
+    # entries last at most 149 minutes
+    write_meta(directory, {"version": FORMAT_VERSION, "longest": 149 * 60})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=[1, 2, 4, os.cpu_count()])
+    args = parser.parse_args()
+
+    # must be set before `tyme` is imported, since its paths are computed then
+    tyme_dir = tempfile.mkdtemp()
+    os.environ["TYME_DIR"] = tyme_dir
+
+    from tyme.common import TYME_TIMELINES_DIR
+    from tyme.team import team_report
+
+    try:
+        for user in range(args.users):
+            make_user(TYME_TIMELINES_DIR / f"user{user}", args.days, user)
+
+        users = [f"user{user}" for user in range(args.users)]
+        first_day = "2019-01-01"
+        last_day = (datetime(2019, 1, 1)
+                    + timedelta(days=args.days - 1)).date().isoformat()
+
+        print(f"{args.users} users, {args.days} days each")
+        baseline = None
+        for workers in sorted(set(args.workers)):
+            start = time.perf_counter()
+            team_report(users, first_day, last_day, workers=workers)
+            elapsed = time.perf_counter() - start
+
+            baseline = baseline or elapsed
+            print(f"{workers:3} workers: {elapsed:8.3f}s "
+                  f"({baseline / elapsed:.1f}x)")
+
+    finally:
+        shutil.rmtree(tyme_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Compares the timestamp helpers in `tyme.utils` with the implementations
+based on `datetime.strptime` and `strftime` that they replaced.
+
+    python -m benchmarks.bench_timestamps [--number NUMBER]
+"""
+
+import argparse
+import calendar
+import timeit
+from datetime import datetime, timedelta
+
+from tyme import utils
+
+
+class EagerTimestamp:
+    """
+    `utils.Timestamp` as it was, computing every string up front.
+    """
+
+    def __init__(self, datetime: datetime) -> None:
+        self.datetime = datetime
+        self.date_str = datetime.date().isoformat()
+        self.time_str = datetime.time().isoformat()
+        self.datetime_str = datetime.strftime(utils.day_and_time_format)
+
+
+def strptime_parse(day_and_time: str) -> EagerTimestamp:
+    return EagerTimestamp(
+        datetime.strptime(day_and_time, utils.day_and_time_format))
+
+
+def strptime_utc_now() -> EagerTimestamp:
+    now_str = datetime.utcnow().strftime(utils.day_and_time_format)
+    return EagerTimestamp(
+        datetime.strptime(now_str, utils.day_and_time_format))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=100_000)
+    args = parser.parse_args()
+
+    # roughly ten times a day, as in a timeline
+    start = datetime(2019, 1, 1)
+    times = [(start + timedelta(minutes=150 * i)).strftime(
+        utils.day_and_time_format) for i in range(args.number)]
+
+    def timed(function):
+        return min(timeit.repeat(function, number=1, repeat=3))
+
+    results = [
+        ("parse", [
+            ("strptime", lambda: [strptime_parse(t) for t in times]),
+            ("utils.parse", lambda: [utils.parse(t) for t in times]),
+        ]),
+        ("parse to epoch seconds", [
+            ("strptime", lambda: [calendar.timegm(
+                strptime_parse(t).datetime.timetuple()) for t in times]),
+            ("utils.parse_epoch",
+             lambda: [utils.parse_epoch(t) for t in times]),
+            ("utils.parse_many", lambda: utils.parse_many(times)),
+        ]),
+        ("utc_now", [
+            ("strftime+strptime",
+             lambda: [strptime_utc_now() for _ in times]),
+            ("utils.utc_now", lambda: [utils.utc_now() for _ in times]),
+        ]),
+    ]
+
+    print(f"{args.number} timestamps")
+    for title, variants in results:
+        print(f"{title}:")
+        baseline = None
+        for name, function in variants:
+            elapsed = timed(function)
+            baseline = baseline or elapsed
+            print(f"  {name:20} {elapsed:8.3f}s ({baseline / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
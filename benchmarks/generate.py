@@ -0,0 +1,165 @@
+"""
+Generates realistic synthetic timelines to benchmark tyme against: years of
+history over a deep hierarchy of thousands of activities, with a handful of
+activities spanning several days.
+
+    python -m benchmarks.generate DIRECTORY [--years YEARS]
+                                            [--activities ACTIVITIES]
+                                            [--depth DEPTH] [--seed SEED]
+
+DIRECTORY is used as a TYME_DIR, with the timeline stored for the user
+"benchmark", who is also made the default user.
+"""
+
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# user whose timeline is generated
+USER = "benchmark"
+
+# the first day of generated timelines
+FIRST_DAY = datetime(2000, 1, 1)
+
+
+def make_activities(rng: random.Random,
+                    activities: int,
+                    depth: int) -> Tuple[Dict, List[Tuple[str, str]]]:
+    """
+    Returns a hierarchy of `activities` activities, at most `depth` levels
+    deep, along with the id and name of every activity in it. Most activities
+    are nested under a few large categories, as in real hierarchies.
+    """
+    hierarchy: Dict = {}
+    nodes: List[Tuple[Dict, int]] = [(hierarchy, 0)]
+    ids_and_names = []
+
+    for i in range(activities):
+        # prefer recent categories, which makes for deeper, narrower trees
+        parent, level = nodes[max(0, len(nodes) - 1 - int(
+            rng.expovariate(1 / 20)))]
+        while level >= depth:
+            parent, level = nodes[rng.randrange(len(nodes))]
+
+        activity_id = str(i + 1)
+        name = f"activity{i}"
+        children: Dict = {}
+        parent[name] = (activity_id, children)
+
+        nodes.append((children, level + 1))
+        ids_and_names.append((activity_id, name))
+
+    return hierarchy, ids_and_names
+
+
+def make_timeline(rng: random.Random,
+                  ids_and_names: List[Tuple[str, str]],
+                  years: int,
+                  ongoing: bool) -> Dict[str, List[Dict[str, str]]]:
+    """
+    Returns a timeline of `years` years, with roughly ten entries a day
+    separated by short gaps. About one entry in 500 spans several days.
+    Most entries are of a small set of frequent activities.
+    """
+    frequent = ids_and_names[:50]
+
+    timeline: Dict[str, List[Dict[str, str]]] = {}
+    moment = FIRST_DAY
+    end = moment + timedelta(days=365 * years)
+    while moment < end:
+        if rng.random() < 0.002:
+            duration = timedelta(days=rng.uniform(1, 4))
+        else:
+            duration = timedelta(minutes=rng.randint(10, 180))
+
+        activity_id, _ = rng.choice(
+            frequent if rng.random() < 0.9 else ids_and_names)
+
+        entry = {"id": activity_id,
+                 "start": moment.strftime("%Y-%m-%d_%H:%M:%S")}
+        moment += duration
+        if moment < end or not ongoing:
+            entry["end"] = moment.strftime("%Y-%m-%d_%H:%M:%S")
+
+        timeline.setdefault(entry["start"][:10], []).append(entry)
+        moment += timedelta(minutes=rng.randint(0, 30))
+
+    return timeline
+
+
+def generate(tyme_dir: Path,
+             years: int = 5,
+             activities: int = 2000,
+             depth: int = 8,
+             seed: int = 0,
+             ongoing: bool = True) -> None:
+    """
+    Writes a synthetic timeline for the user `USER` to `tyme_dir`, in the
+    current storage layout, and makes it the default user. The same
+    arguments always generate the same timeline.
+
+    Args:
+        tyme_dir (Path): the directory to be used as TYME_DIR
+        years (int): the years of history in the timeline
+        activities (int): the number of activities in the hierarchy
+        depth (int): the depth of the hierarchy
+        seed (int): the seed of the generated data
+        ongoing (bool): whether the last activity is still ongoing
+    """
+    from tyme.activities import ActivityIndex, write_activities
+    from tyme.meta import FORMAT_VERSION, write_meta
+    from tyme.rollups import Rollups
+    from tyme.shards import TimelineShards
+
+    rng = random.Random(seed)
+    hierarchy, ids_and_names = make_activities(rng, activities, depth)
+    timeline = make_timeline(rng, ids_and_names, years, ongoing)
+
+    directory = tyme_dir / "timelines" / USER
+    directory.mkdir(parents=True, exist_ok=True)
+
+    shards = TimelineShards(directory, days=timeline)
+    shards.save(prune=True)
+    write_activities(directory, hierarchy)
+
+    rollups = Rollups(directory, ActivityIndex(hierarchy), fresh=True)
+    for day in shards:
+        for entry in shards[day]:
+            if entry.end is not None:
+                rollups.add(entry.id, entry.start, entry.end)
+    rollups.save()
+
+    write_meta(directory, {
+        "version": FORMAT_VERSION,
+        "longest": max(entry.end - entry.start
+                       for day in shards
+                       for entry in shards[day]
+                       if entry.end is not None),
+        "rollups": True,
+    })
+
+    with open(tyme_dir / "state.hjson", "w") as state:
+        json.dump({"default_user": USER}, state)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory")
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--activities", type=int, default=2000)
+    parser.add_argument("--depth", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generate(Path(args.directory),
+             years=args.years,
+             activities=args.activities,
+             depth=args.depth,
+             seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
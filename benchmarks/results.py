@@ -0,0 +1,69 @@
+"""
+Recording and comparison of benchmark results, so that regressions can be
+found between versions of tyme. Results are recorded as JSON, along with the
+version of tyme and Python they were measured with.
+"""
+
+import argparse
+import json
+import platform
+import sys
+from typing import Any, Dict
+
+Results = Dict[str, float]
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the --record, --baseline and --tolerance arguments to `parser`.
+    """
+    parser.add_argument("--record", help="file to write the results to")
+    parser.add_argument("--baseline", help="results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative slowdown against --baseline")
+
+
+def record(path: str, results: Results, **config: Any) -> None:
+    """
+    Writes `results` to `path`, along with the versions they were measured
+    with and the configuration `config` of the benchmark.
+    """
+    from tyme import __version__
+
+    with open(path, "w") as record_file:
+        json.dump({"tyme": __version__,
+                   "python": platform.python_version(),
+                   "config": config,
+                   "results": results}, record_file, indent=2)
+
+
+def report(args: argparse.Namespace, results: Results, **config: Any) -> None:
+    """
+    Prints `results`, records them if --record was given, and compares them
+    to --baseline if it was given, exiting with a non-zero status if any of
+    them regressed by more than --tolerance.
+    """
+    for name, value in results.items():
+        print(f"{name}: {value:.2f}")
+
+    if args.record:
+        record(args.record, results, **config)
+
+    if not args.baseline:
+        return
+
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+
+    # results recorded before versions were, are stored on their own
+    baseline = baseline.get("results", baseline)
+
+    regressions = [name for name, value in results.items()
+                   if name in baseline
+                   and value > baseline[name] * (1 + args.tolerance)]
+    for name in regressions:
+        print(f"regression: {name} went from {baseline[name]:.2f} "
+              f"to {results[name]:.2f}")
+
+    if regressions:
+        sys.exit(1)
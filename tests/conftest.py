@@ -0,0 +1,20 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# must be set before `tyme` is imported, since its paths are computed then
+os.environ["TYME_DIR"] = tempfile.mkdtemp(prefix="tyme-tests-")
+
+from tyme.common import TYME_DIR, TYME_TIMELINES_DIR
+
+
+@pytest.fixture
+def tyme_dir():
+    """
+    Provides an empty tyme directory for the duration of a test.
+    """
+    os.makedirs(TYME_TIMELINES_DIR)
+    yield TYME_DIR
+    shutil.rmtree(TYME_DIR)
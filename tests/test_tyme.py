@@ -1,5 +1,936 @@
+import pytest
+
 from tyme import __version__
 
 
 def test_version():
     assert __version__ == '0.1.0'
+
+
+def test_journal_replay(tyme_dir):
+    from tyme.timeline import Timeline
+
+    Timeline.make_empty("user")
+    snapshot = (tyme_dir / "timelines" / "user" / "activities.json")
+    snapshot = snapshot.read_text()
+
+    timeline = Timeline(user="user")
+    timeline.new_activity("/leisure/cooking", parents=True)
+    timeline.start("cooking")
+    timeline.save()
+
+    # changes are appended to the journal, the snapshot is left alone
+    assert (tyme_dir / "timelines" / "user" / "activities.json").read_text() \
+        == snapshot
+
+    timeline = Timeline(user="user")
+    assert timeline.activity_path("cooking") == "/leisure/cooking"
+    assert timeline.status()["name"] == "cooking"
+
+    timeline.compact()
+    assert not timeline.storage.journal.path.exists()
+    assert Timeline(user="user").status()["name"] == "cooking"
+
+
+def test_read_only_save_does_not_write(tyme_dir):
+    from tyme.timeline import Timeline
+
+    Timeline.make_empty("user")
+    Timeline(user="user").save()
+
+    assert not (tyme_dir / "timelines" / "user" / "journal.jsonl").exists()
+
+
+def test_saving_keeps_file_modes(tyme_dir, monkeypatch):
+    import os
+    import stat
+    from tyme import files
+    from tyme.status import status_path
+    from tyme.timeline import Timeline
+
+    def mode(path):
+        return stat.S_IMODE(path.stat().st_mode)
+
+    def timeline_files():
+        return sorted(path for path in directory.rglob("*") if path.is_file())
+
+    # new files follow the umask rather than being readable by their owner only
+    umask = os.umask(0o022)
+    monkeypatch.setattr(files, "_UMASK", 0o022)
+    try:
+        Timeline.make_empty("user")
+        directory = tyme_dir / "timelines" / "user"
+        assert all(mode(path) == 0o644 for path in timeline_files())
+
+        # existing files keep their mode, e.g. in a directory shared with a
+        # team
+        shared = timeline_files()[0]
+        shared.chmod(0o664)
+        with Timeline.locked("user") as timeline:
+            timeline.new_activity("/cooking")
+            timeline.start("cooking")
+            timeline.compact()
+            timeline.write_status()
+    finally:
+        os.umask(umask)
+
+    assert mode(shared) == 0o664
+    assert all(mode(path) == 0o644 for path in timeline_files()
+               if path != shared)
+    assert mode(status_path("user")) == 0o644
+
+
+def test_shards_are_loaded_lazily(tyme_dir):
+    from tyme.entry import Entry
+    from tyme.timeline import Timeline
+
+    entry = {"id": "0", "name": "cooking",
+             "start": "2019-08-26_02:04:06", "end": "2019-08-26_03:09:16"}
+    Timeline(user="user",
+             timeline={"2019-08-26": [entry],
+                       "2019-09-01": [dict(entry, start="2019-09-01_00:00:00",
+                                           end="2019-09-01_01:00:00")]},
+             activities={"cooking": ("0", {})}).save()
+
+    assert sorted(p.name for p in (tyme_dir / "timelines" / "user").iterdir()) \
+        == ["2019-08.jsonl", "2019-09.jsonl", "activities.json",
+            "meta.json", "rollups"]
+
+    timeline = Timeline(user="user")
+    assert timeline.recent_activities(1) == {
+        "2019-09-01": [Entry.from_json(dict(entry,
+                                            start="2019-09-01_00:00:00",
+                                            end="2019-09-01_01:00:00"))]}
+    assert timeline.timeline._shards == {}
+
+    assert timeline.timeline["2019-08-26"] == [Entry.from_json(entry)]
+    assert "2019-09" not in timeline.timeline._shards
+
+
+def test_locks_are_held_per_thread(tmp_path):
+    import threading
+    import time
+    from tyme.files import locked
+
+    path = tmp_path / "user.lock"
+    events = []
+
+    def take():
+        with locked(path):
+            events.append("taken")
+
+    with locked(path):
+        # reentrant within a thread
+        with locked(path):
+            pass
+
+        thread = threading.Thread(target=take)
+        thread.start()
+        time.sleep(0.1)
+        events.append("released")
+
+    thread.join()
+    assert events == ["released", "taken"]
+
+
+def test_single_file_migration(tyme_dir):
+    import hjson
+    from tyme.entry import Entry
+    from tyme.timeline import Timeline
+
+    entry = {"id": "0", "name": "cooking",
+             "start": "2019-08-26_02:04:06", "end": "2019-08-26_03:09:16"}
+    with open(tyme_dir / "timelines" / "user.hjson", "w") as timeline_file:
+        hjson.dump({"timeline": {"2019-08-26": [entry]},
+                    "activities": {"cooking": ["0", {}]}}, timeline_file)
+
+    timeline = Timeline(user="user")
+    assert timeline.timeline["2019-08-26"] == [Entry.from_json(entry)]
+    assert (tyme_dir / "timelines" / "user.hjson.migrated").exists()
+
+
+def test_links_are_collapsed_by_migration(tyme_dir):
+    import json
+    from tyme.activities import write_activities
+    from tyme.meta import read_meta
+    from tyme.timeline import Timeline
+
+    directory = tyme_dir / "timelines" / "user"
+    directory.mkdir()
+    write_activities(directory, {"cooking": ("0", {})})
+
+    entry = {"id": "0", "name": "cooking",
+             "start": "2019-08-30_22:00:00", "end": "2019-09-02_01:00:00"}
+    lines = [dict(entry, day="2019-08-30"),
+             dict(entry, day="2019-08-31", previous="")]
+    (directory / "2019-08.jsonl").write_text(
+        "".join(json.dumps(line) + "\n" for line in lines))
+    (directory / "2019-09.jsonl").write_text(
+        "".join(json.dumps(dict(entry, day=day, previous="")) + "\n"
+                for day in ["2019-09-01", "2019-09-02"]))
+
+    timeline = Timeline(user="user")
+    assert list(timeline.timeline) == ["2019-08-30"]
+    assert not (directory / "2019-09.jsonl").exists()
+    assert read_meta(directory) == {"version": 3, "longest": 51 * 60 * 60,
+                                    "rollups": True}
+    assert timeline.report("2019-09-01", "2019-09-01") == {"0": 24 * 60 * 60}
+
+    # reports read the roll-ups built by the migration, without rebuilding
+    # them from every shard
+    assert (directory / "rollups" / "2019.json").exists()
+    assert Timeline(user="user").rollups.day("2019-09-01") \
+        == {"0": 24 * 60 * 60}
+
+
+def test_ids_are_shortened_by_migration(tyme_dir):
+    import json
+    from tyme.activities import read_activities, write_activities
+    from tyme.meta import read_meta, write_meta
+    from tyme.timeline import Timeline
+
+    leisure, cooking = "2b1b4c1e-0000-4000-8000-000000000000", \
+        "9f6d3a52-0000-4000-8000-000000000000"
+
+    directory = tyme_dir / "timelines" / "user"
+    directory.mkdir()
+    write_activities(directory, {"leisure": (leisure, {
+        "cooking": (cooking, {})})})
+    write_meta(directory, {"version": 2, "longest": 60 * 60})
+    (directory / "2019-08.jsonl").write_text(json.dumps(
+        {"day": "2019-08-26", "id": cooking, "name": "cooking",
+         "start": "2019-08-26_02:00:00", "end": "2019-08-26_03:00:00"})
+        + "\n")
+    (directory / "journal.jsonl").write_text(json.dumps(
+        {"op": "start", "id": cooking, "name": "cooking",
+         "start": "2019-08-27_02:00:00", "index": 0}) + "\n")
+
+    timeline = Timeline(user="user")
+    assert read_activities(directory) \
+        == {"leisure": ["1", {"cooking": ["2", {}]}]}
+    assert read_meta(directory)["version"] == 3
+    assert "name" not in (directory / "2019-08.jsonl").read_text()
+    assert timeline.status()["path"] == "/leisure/cooking"
+    assert timeline.report("2019-08-26", "2019-08-26") \
+        == {"1": 60 * 60, "2": 60 * 60}
+
+    # new activities are numbered after those that exist
+    timeline.new_activity("/leisure/reading")
+    assert timeline.activity_id("reading") == "3"
+
+
+def test_activity_index():
+    import pytest
+    from tyme.timeline import AmbiguousActivityError, Timeline
+
+    timeline = Timeline(user="user", timeline={}, activities={})
+    timeline.new_activity("/projects/tyme", parents=True)
+    timeline.new_activity("/projects/reading")
+    timeline.new_activity("/leisure/reading", parents=True)
+
+    assert timeline.activity_path("tyme") == "/projects/tyme"
+    assert timeline.activity_id("/projects/tyme") \
+        == timeline.activities["projects"][1]["tyme"][0]
+    assert timeline.activity_id("missing") is None
+
+    with pytest.raises(AmbiguousActivityError):
+        timeline.activity_id("reading")
+
+    timeline.start("/leisure/reading")
+    assert timeline.status()["name"] == "reading"
+
+
+def test_partial_activity_names():
+    import pytest
+    from tyme.timeline import AmbiguousActivityError, Timeline
+
+    timeline = Timeline(user="user", timeline={}, activities={})
+    timeline.new_activity("/leisure/cooking", parents=True)
+    timeline.new_activity("/leisure/cookies")
+    timeline.new_activity("/work/tyme", parents=True)
+
+    # the matcher is kept up to date once it is built
+    assert timeline.activity_path("tym") == "/work/tyme"
+    timeline.new_activity("/work/tymeline")
+
+    assert timeline.activity_path("cookin") == "/leisure/cooking"
+    assert timeline.activity_path("KING") == "/leisure/cooking"
+    assert timeline.activity_path("/work/tymel") == "/work/tymeline"
+    assert timeline.activity_path("ymel") == "/work/tymeline"
+    assert timeline.activity_path("tyme") == "/work/tyme"
+    assert timeline.activity_path("baking") is None
+
+    with pytest.raises(AmbiguousActivityError) as error:
+        timeline.activity_id("cook")
+    assert error.value.paths == ["/leisure/cookies", "/leisure/cooking"]
+
+    timeline.start("ookin")
+    assert timeline.status()["name"] == "cooking"
+
+
+def test_shards_keep_days_ordered():
+    from tyme.shards import TimelineShards
+
+    shards = TimelineShards()
+    for day in ["2019-09-02", "2018-01-05", "2019-09-01", "2019-08-30"]:
+        shards[day] = []
+
+    assert list(shards) == ["2018-01-05", "2019-08-30", "2019-09-01",
+                            "2019-09-02"]
+    assert list(reversed(shards)) == list(shards)[::-1]
+    assert shards.last_day() == "2019-09-02"
+
+    del shards["2019-09-02"]
+    assert shards.last_day() == "2019-09-01"
+
+
+def test_iter_recent_newest_first():
+    from tyme import utils
+    from tyme.timeline import Timeline
+
+    def entry(start, end):
+        return {"id": "0", "name": "cooking", "start": start, "end": end}
+
+    timeline = Timeline(user="user",
+                        timeline={"2019-08-26": [
+                                      entry("2019-08-26_01:00:00",
+                                            "2019-08-26_02:00:00"),
+                                      entry("2019-08-26_02:00:00",
+                                            "2019-08-27_01:00:00")],
+                                  "2019-08-27": [
+                                      dict(entry("2019-08-26_02:00:00",
+                                                 "2019-08-27_01:00:00"),
+                                           previous=""),
+                                      entry("2019-08-27_01:00:00",
+                                            "2019-08-27_02:00:00")]},
+                        activities={"cooking": ("0", {})})
+
+    assert [(day, utils.format_epoch(activity.start))
+            for day, activity in timeline.iter_recent(2)] == [
+        ("2019-08-27", "2019-08-27_01:00:00"),
+        ("2019-08-26", "2019-08-26_02:00:00")]
+    assert list(timeline.recent_activities(2)) == ["2019-08-26", "2019-08-27"]
+
+
+def test_read_lines_reversed(tmp_path):
+    from tyme.shards import read_lines_reversed
+
+    path = tmp_path / "lines"
+    lines = [f"line {i}" * (i % 7) for i in range(1, 200)]
+    path.write_text("\n".join(lines) + "\n")
+
+    expected = [line for line in reversed(lines) if line]
+    assert list(read_lines_reversed(path, block_size=16)) == expected
+
+
+def test_report_rolls_up_without_double_counting():
+    from tyme.timeline import Timeline
+
+    timeline = Timeline(user="user", timeline={}, activities={})
+    timeline.new_activity("/projects/tyme", parents=True)
+    timeline.new_activity("/projects/site")
+    tyme_id = timeline.activity_id("tyme")
+    site_id = timeline.activity_id("site")
+
+    for event in [
+            {"op": "start", "id": tyme_id, "name": "tyme",
+             "start": "2019-08-26_22:00:00"},
+            {"op": "done", "start": "2019-08-26_22:00:00",
+             "end": "2019-08-28_01:00:00"},
+            {"op": "start", "id": site_id, "name": "site",
+             "start": "2019-08-28_01:00:00"},
+            {"op": "done", "start": "2019-08-28_01:00:00",
+             "end": "2019-08-28_01:30:00"}]:
+        timeline._apply(event)
+
+    hour = 60 * 60
+    projects_id = timeline.activity_id("projects")
+
+    seconds = timeline.report("2019-08-26", "2019-08-28")
+    assert seconds == {tyme_id: 27 * hour, site_id: hour // 2,
+                       projects_id: 27 * hour + hour // 2}
+
+    # only the part of the activity within the range is counted
+    seconds = timeline.report("2019-08-27", "2019-08-27")
+    assert seconds == {tyme_id: 24 * hour, projects_id: 24 * hour}
+
+
+def test_rollups_follow_the_journal(tyme_dir):
+    from tyme import utils
+    from tyme.rollups import Rollups
+    from tyme.timeline import Timeline
+
+    Timeline.make_empty("user")
+    with Timeline.locked("user") as timeline:
+        timeline.new_activity("/projects/tyme", parents=True)
+        timeline.add_entry(timeline.activity_id("tyme"),
+                           utils.parse("2019-08-31_22:00:00"),
+                           utils.parse("2019-09-01_02:00:00"))
+        timeline.save()
+
+    hour = 60 * 60
+    tyme_id = timeline.activity_id("tyme")
+    projects_id = timeline.activity_id("projects")
+    assert timeline.rollups.day("2019-08-31") == {tyme_id: 2 * hour}
+    assert timeline.rollups.week("2019-W35") \
+        == {tyme_id: 4 * hour, projects_id: 4 * hour}
+    assert timeline.rollups.month("2019-09") \
+        == {tyme_id: 2 * hour, projects_id: 2 * hour}
+
+    # entries completed through the journal are rolled up once loaded
+    with Timeline.locked("user") as timeline:
+        timeline._record({"op": "start", "id": tyme_id, "name": "tyme",
+                          "start": "2019-09-02_10:00:00", "index": 0})
+        timeline._record({"op": "done", "start": "2019-09-02_10:00:00",
+                          "end": "2019-09-02_11:00:00", "index": 0})
+        timeline.save()
+
+    timeline = Timeline(user="user")
+    assert timeline.rollups.month("2019-09")[tyme_id] == 3 * hour
+    assert timeline.report("2019-08-01", "2019-09-30")[projects_id] \
+        == 5 * hour
+
+    timeline.compact()
+    rebuilt = Rollups(timeline.directory, timeline.index, fresh=True)
+    for day in timeline.timeline:
+        for entry in timeline.timeline[day]:
+            rebuilt.add(entry.id, entry.start, entry.end)
+
+    stored = Timeline(user="user").rollups
+    for month in ["2019-08", "2019-09"]:
+        assert stored.month(month) == rebuilt.month(month)
+
+
+def test_sqlite_storage(tyme_dir):
+    from tyme.timeline import Timeline, TimelineError
+
+    Timeline.make_empty("user")
+    with Timeline.locked("user") as timeline:
+        timeline.new_activity("/projects/tyme", parents=True)
+        timeline.start("tyme")
+        timeline.save()
+
+    with Timeline.locked("user") as timeline:
+        timeline.convert("sqlite")
+        timeline.save()
+
+    directory = tyme_dir / "timelines" / "user"
+    assert sorted(path.name for path in directory.iterdir()) \
+        == ["rollups", "timeline.db"]
+
+    # changes are written to the database in place
+    with Timeline.locked("user") as timeline:
+        assert timeline.storage.name == "sqlite"
+        timeline.new_activity("/projects/site")
+        timeline.start("site")
+        timeline.save()
+
+    timeline = Timeline(user="user")
+    assert timeline.activity_path("site") == "/projects/site"
+    assert [timeline.index.name_by_id[entry.id]
+            for _, entry in timeline.iter_recent()] \
+        == ["site", "tyme"]
+    assert timeline.current_activity().end is None
+    with pytest.raises(TimelineError):
+        timeline.archive("2100")
+
+    with Timeline.locked("user") as timeline:
+        timeline.convert("files")
+        timeline.save()
+
+    timeline = Timeline(user="user")
+    assert timeline.storage.name == "files"
+    assert not (directory / "timeline.db").exists()
+    assert [timeline.index.name_by_id[entry.id]
+            for _, entry in timeline.iter_recent()] \
+        == ["site", "tyme"]
+
+
+def test_interval_index():
+    from tyme import utils
+    from tyme.timeline import Timeline
+
+    def entry(start, end):
+        return {"id": "0", "name": "cooking", "start": start, "end": end}
+
+    timeline = Timeline(user="user",
+                        timeline={"2019-08-26": [
+                            entry("2019-08-26_01:00:00",
+                                  "2019-08-26_02:00:00"),
+                            entry("2019-08-26_01:30:00",
+                                  "2019-08-26_03:00:00")]},
+                        activities={"cooking": ("0", {})})
+    first, second = timeline.timeline["2019-08-26"]
+
+    def at(moment):
+        return [entry for _, entry in timeline.at(utils.parse_moment(moment))]
+
+    assert at("2019-08-26_00:59:59") == []
+    assert at("2019-08-26_01:45:00") == [first, second]
+    assert at("2019-08-26_02:30:00") == [second]
+    assert timeline.intervals.overlaps() == [(("2019-08-26", first),
+                                              ("2019-08-26", second))]
+
+    timeline._apply({"op": "start", "id": "0", "name": "cooking",
+                     "start": "2019-08-26_04:00:00"})
+    assert len(at("2019-08-26_05:00:00")) == 1
+
+    timeline._apply({"op": "done", "start": "2019-08-26_04:00:00",
+                     "end": "2019-08-26_04:30:00"})
+    assert at("2019-08-26_05:00:00") == []
+
+    start = utils.epoch(utils.parse("2019-08-26_00:00:00"))
+    hour = 60 * 60
+    assert timeline.intervals.gaps(start, start + 5 * hour) == [
+        (start, start + hour),
+        (start + 3 * hour, start + 4 * hour),
+        (start + 4 * hour + hour // 2, start + 5 * hour)]
+
+    # moments with a UTC offset are looked up in UTC
+    assert at("2019-08-26T03:45:00+02:00") == [first, second]
+    assert utils.epoch(utils.parse_moment("2019-08-26T03:45:00+02:00")) \
+        == utils.epoch(utils.parse("2019-08-26_01:45:00"))
+
+    with pytest.raises(ValueError):
+        timeline.intervals.close(start, start + hour)
+
+
+def test_replaying_compacted_events_has_no_effect(tyme_dir):
+    from tyme.journal import Journal
+    from tyme.timeline import Timeline
+
+    Timeline.make_empty("user")
+    with Timeline.locked("user") as timeline:
+        timeline.new_activity("/cooking")
+        timeline.start("cooking")
+        timeline.start("cooking")
+        timeline.done()
+        timeline.save()
+
+    events = timeline.storage.journal.read()
+
+    # a reader that read the journal just before it was compacted
+    timeline.compact()
+    Journal(timeline.storage.journal.path).append(events)
+
+    timeline = Timeline(user="user")
+    assert len(list(timeline.iter_recent())) == 2
+    assert timeline.current_activity() is None
+    assert len(timeline.index.ids("cooking")) == 1
+
+
+def test_daemon_runs_commands(tyme_dir):
+    import argparse
+    import asyncio
+    from tyme.daemon import Server
+    from tyme.timeline import Timeline
+
+    Timeline.make_empty("user")
+    with Timeline.locked("user") as timeline:
+        timeline.new_activity("/cooking")
+        timeline.save()
+
+    def command(name, **kwargs):
+        return argparse.Namespace(command=name, user="user", no_color=True,
+                                  color=False, **kwargs)
+
+    async def run():
+        server = Server(tyme_dir / "tyme.sock")
+        await server.run(command("start", activity="cooking"))
+        # changes are saved before the client is answered
+        assert Timeline(user="user").status()["name"] == "cooking"
+        return await server.run(command("status", format=None))
+
+    loop = asyncio.new_event_loop()
+    try:
+        assert "cooking" in loop.run_until_complete(run())
+    finally:
+        loop.close()
+
+
+def test_daemon_reports_every_failure(tyme_dir, monkeypatch):
+    import argparse
+    import asyncio
+    from tyme.cli import cli
+    from tyme.common import TYME_SOCKET
+    from tyme.daemon import Server, forward
+    from tyme.timeline import Timeline, TimelineError
+
+    Timeline.make_empty("user")
+
+    def fail(timeline, args):
+        raise RuntimeError("unexpected")
+
+    monkeypatch.setattr(cli, "run_command", fail)
+    args = argparse.Namespace(command="stop", user="user", no_color=True,
+                              color=False)
+
+    async def run():
+        server = await asyncio.start_unix_server(Server().handle,
+                                                 path=str(TYME_SOCKET))
+        try:
+            # the client mustn't fall back to running the command itself
+            with pytest.raises(TimelineError, match="RuntimeError"):
+                await loop.run_in_executor(None, forward, args)
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(run())
+    finally:
+        loop.close()
+
+
+def test_status_cache(tyme_dir, capsys, monkeypatch):
+    import json
+    import sys
+    from tyme.cli import fast
+    from tyme.common import TYME_STATE_FILE
+    from tyme.status import read_status
+    from tyme.timeline import Timeline
+
+    Timeline.make_empty("user")
+    with open(TYME_STATE_FILE, "w") as state_file:
+        json.dump({"default_user": "user"}, state_file)
+    assert read_status("user") is None
+
+    # without a cache, the full cli reads the timeline without waiting for
+    # its lock
+    monkeypatch.setattr(Timeline, "locked", None)
+    monkeypatch.setattr(sys, "argv", ["tyme", "--direct", "status", "--fast"])
+    fast.main()
+    assert capsys.readouterr().out == "There is no ongoing activity.\n"
+    assert read_status("user") is None
+    monkeypatch.undo()
+
+    with Timeline.locked("user") as timeline:
+        timeline.new_activity("/leisure/cooking", parents=True)
+        timeline.start("cooking")
+        timeline.save()
+
+    status = read_status("user")
+    assert status["name"] == "cooking"
+    assert status["path"] == "/leisure/cooking"
+    assert status == Timeline(user="user").status()
+
+    # read from the cache alone, the timeline isn't loaded
+    monkeypatch.setattr(Timeline, "__init__", None)
+    monkeypatch.setattr(sys, "argv", ["tyme", "--direct", "status", "--fast",
+                                      "--format", "{path} {elapsed}"])
+    fast.main()
+    assert capsys.readouterr().out.startswith("/leisure/cooking 00:00:")
+    monkeypatch.undo()
+
+    with Timeline.locked("user") as timeline:
+        timeline.done()
+        timeline.save()
+    assert read_status("user") == {}
+
+
+def test_fast_status_skips_the_timeline(tyme_dir):
+    import json
+    import subprocess
+    import sys
+    from pathlib import Path
+    from tyme.common import TYME_STATE_FILE
+    from tyme.status import write_status
+
+    with open(TYME_STATE_FILE, "w") as state_file:
+        json.dump({"default_user": "user"}, state_file)
+    write_status("user", {"id": "0", "name": "cooking",
+                          "path": "/leisure/cooking", "start": 0})
+
+    # run in a fresh interpreter, since the tests import the timeline
+    code = ("import sys; from tyme.cli.fast import main; main(); "
+            "print(sorted(name for name in sys.modules "
+            "if name.startswith('tyme')))")
+    output = subprocess.run(
+        [sys.executable, "-c", code, "-u", "user", "status", "--fast",
+         "--format", "{path} {start}"],
+        cwd=Path(__file__).parent.parent,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+        check=True).stdout
+
+    assert output.splitlines() == [
+        "/leisure/cooking 00:00:00",
+        "['tyme', 'tyme.cli', 'tyme.cli.fast', 'tyme.common', "
+        "'tyme.status', 'tyme.trace']"]
+
+
+def test_parse_fast_status():
+    from tyme.cli.fast import FastStatusArgs, parse_fast_status
+
+    assert parse_fast_status(["-d", "--user=user", "status", "--fast"]) \
+        == FastStatusArgs("user", False, None)
+    assert parse_fast_status(["-c", "status", "--format", "{name}",
+                              "--fast"]) \
+        == FastStatusArgs(None, True, "{name}")
+
+    # anything else is left to the full cli
+    assert parse_fast_status(["status"]) is None
+    assert parse_fast_status(["log", "--fast"]) is None
+    assert parse_fast_status(["--profile", "status", "--fast"]) is None
+    assert parse_fast_status(["status", "--fast", "-h"]) is None
+    assert parse_fast_status(["-u", "status", "--fast"]) is None
+
+
+def test_make_existing_activity(tyme_dir, capsys, monkeypatch):
+    import json
+    import sys
+    from tyme.cli import cli
+    from tyme.common import TYME_STATE_FILE
+    from tyme.timeline import Timeline
+
+    Timeline.make_empty("user")
+    with open(TYME_STATE_FILE, "w") as state_file:
+        json.dump({"default_user": "user"}, state_file)
+
+    monkeypatch.setattr(sys, "argv", ["tyme", "--direct", "make", "-p",
+                                      "/leisure/cooking"])
+    cli.main()
+    capsys.readouterr()
+
+    cli.main()
+    assert "'/leisure/cooking' already exists" in capsys.readouterr().out
+    assert len(Timeline(user="user").index.ids("cooking")) == 1
+
+
+def test_unknown_user(tyme_dir, capsys, monkeypatch):
+    import json
+    import sys
+    from tyme.cli import cli
+    from tyme.common import TYME_STATE_FILE
+    from tyme.timeline import Timeline
+
+    Timeline.make_empty("user")
+    with open(TYME_STATE_FILE, "w") as state_file:
+        json.dump({"default_user": "user"}, state_file)
+
+    for command in [["status"], ["start", "cooking"]]:
+        monkeypatch.setattr(sys, "argv",
+                            ["tyme", "--direct", "-u", "nobody", *command])
+        cli.main()
+        assert "no timeline for user 'nobody'" in capsys.readouterr().out
+
+    assert not Timeline.lock_path("nobody").exists()
+
+
+def test_report_rejects_invalid_days(capsys, monkeypatch):
+    import sys
+    from tyme.cli import cli
+
+    monkeypatch.setattr(sys, "argv", ["tyme", "report", "--from",
+                                      "2019-08-01", "--to", "2019-08-31"])
+    args = cli.parse_args()
+    assert (args.first_day, args.last_day) == ("2019-08-01", "2019-08-31")
+
+    for command in ["report", "team-report"]:
+        for day in ["foo", "2019-13-01", "20190801"]:
+            monkeypatch.setattr(sys, "argv", ["tyme", command, "--to", day])
+            with pytest.raises(SystemExit):
+                cli.parse_args()
+            assert f"invalid day '{day}'" in capsys.readouterr().err
+
+
+def test_import(tyme_dir, tmp_path):
+    from tyme import utils
+    from tyme.importer import import_records, read_records
+    from tyme.timeline import Timeline, TimelineError
+
+    Timeline.make_empty("user")
+    records = tmp_path / "records.csv"
+    records.write_text(
+        "activity,start,end\n"
+        "/work/tyme,2019-08-30 22:00:00,2019-09-01 02:00:00\n"
+        "/leisure/cooking,2019-09-01T03:00:00+01:00,2019-09-01 04:00\n")
+
+    with Timeline.locked("user") as timeline:
+        assert import_records(timeline, read_records(records),
+                              batch_size=1) == 2
+
+    timeline = Timeline(user="user")
+    assert timeline.activity_path("cooking") == "/leisure/cooking"
+    assert [utils.format_epoch(entry.start)
+            for entry in timeline.timeline["2019-09-01"]] \
+        == ["2019-09-01_02:00:00"]
+    assert "2019-08-31" not in timeline.timeline
+    assert timeline.report("2019-08-31", "2019-08-31") == {
+        timeline.activity_id("/work"): 24 * 60 * 60,
+        timeline.activity_id("/work/tyme"): 24 * 60 * 60}
+    assert not list((tyme_dir / "timelines" / "user").glob(".*"))
+
+    # overlapping records are rejected, and nothing is saved
+    records.write_text("activity,start,end\n"
+                       "/work/tyme,2019-08-01 00:00:00,2019-08-01 01:00:00\n"
+                       "/new,2019-08-31 00:00:00,2019-08-31 01:00:00\n")
+    with pytest.raises(TimelineError, match="Line 3"):
+        with Timeline.locked("user") as timeline:
+            import_records(timeline, read_records(records), batch_size=1)
+
+    timeline = Timeline(user="user")
+    assert "2019-08-01" not in timeline.timeline
+    assert timeline.activity_id("new") is None
+
+    # as are records that end in the future
+    records.write_text("activity,start,end\n"
+                       "/new,2019-09-02 00:00:00,2019-09-02 01:00:00\n"
+                       "/new,2019-09-02 02:00:00,2999-01-01 00:00:00\n")
+    with pytest.raises(TimelineError, match="Line 3: .* after the current"):
+        with Timeline.locked("user") as timeline:
+            import_records(timeline, read_records(records))
+
+    assert Timeline(user="user").activity_id("new") is None
+
+
+def test_team_report_merges_by_path(tyme_dir):
+    from tyme.team import team_report
+    from tyme.timeline import Timeline
+
+    for user, activity_id in [("alice", "a"), ("bob", "b")]:
+        Timeline(user=user,
+                 timeline={"2019-08-26": [
+                     {"id": activity_id, "name": "tyme",
+                      "start": "2019-08-26_10:00:00",
+                      "end": "2019-08-26_11:00:00"}]},
+                 activities={"work": (activity_id + "0", {
+                     "tyme": (activity_id, {})})}).save()
+
+    assert Timeline.users() == ["alice", "bob"]
+    for workers in [1, 2]:
+        assert team_report(["alice", "bob"], "2019-08-26", "2019-08-26",
+                           workers=workers) \
+            == {"/work": 7200, "/work/tyme": 7200}
+
+
+def test_fixed_format_parsing():
+    import calendar
+    from datetime import datetime
+    from tyme import utils
+
+    times = ["2019-08-26_02:04:06", "2020-02-29_23:59:59",
+             "2019-08-26_00:00:00"]
+    for day_and_time in times:
+        expected = datetime.strptime(day_and_time, utils.day_and_time_format)
+        assert utils.parse(day_and_time).datetime == expected
+        assert utils.parse(day_and_time).datetime_str == day_and_time
+        assert utils.parse_epoch(day_and_time) \
+            == calendar.timegm(expected.timetuple())
+
+    assert utils.parse_many(times) == [utils.parse_epoch(t) for t in times]
+
+    for invalid in ["2019-08-26 02:04:06", "2019-02-30_00:00:00",
+                    "2019-08-26_24:00:00", "2019-08-26_+1:00:00"]:
+        with pytest.raises(ValueError):
+            utils.parse(invalid)
+        with pytest.raises(ValueError):
+            utils.parse_many(["2019-08-26_00:00:00", invalid])
+
+
+def test_log_without_colors(capsys):
+    from tyme.activities import ActivityIndex
+    from tyme.cli import render
+    from tyme.entry import Entry
+
+    entries = [("2019-08-26", Entry("1", 0, 60)),
+               ("2019-08-26", Entry("1", 120, 180))]
+
+    render.set_color(False)
+    try:
+        render.print_log(entries, ActivityIndex({"cooking": ("1", {})}))
+    finally:
+        render.set_color(True)
+
+    output = capsys.readouterr().out
+    assert "\x1b" not in output
+    assert output.count("cooking (1 minute):") == 2
+    assert " | (1 minute)\n" in output
+
+
+def test_profile_summary_goes_to_stderr(tyme_dir, capsys, monkeypatch,
+                                        tmp_path):
+    import json
+    import sys
+    from tyme.cli import cli
+    from tyme.common import TYME_STATE_FILE
+    from tyme.timeline import Timeline
+
+    Timeline.make_empty("user")
+    with open(TYME_STATE_FILE, "w") as state_file:
+        json.dump({"default_user": "user"}, state_file)
+
+    profile = tmp_path / "tyme.prof"
+    monkeypatch.setattr(sys, "argv",
+                        ["tyme", "--direct", "--profile-file", str(profile),
+                         "status"])
+    cli.main()
+
+    captured = capsys.readouterr()
+    assert "tyme:" not in captured.out
+    for phase in ["import", "init", "load", "command", "save", "total"]:
+        assert f"tyme: {phase:>10}" in captured.err
+    assert profile.exists()
+
+    # the flag doesn't take the command as its value
+    monkeypatch.setattr(sys, "argv", ["tyme", "--direct", "--profile",
+                                      "status"])
+    args = cli.parse_args()
+    assert (args.profile, args.profile_file, args.command) \
+        == (True, None, "status")
+
+    cli.main()
+    assert "tyme:      total" in capsys.readouterr().err
+
+
+def test_archive(tyme_dir):
+    from tyme import utils
+    from tyme.timeline import Timeline, TimelineError
+
+    def entry(start, end):
+        return {"id": "0", "name": "cooking", "start": start, "end": end}
+
+    days = {"2017-06-01": [entry("2017-06-01_10:00:00",
+                                 "2017-06-01_11:00:00")],
+            "2018-03-01": [entry("2018-03-01_10:00:00",
+                                 "2018-03-01_12:00:00")],
+            "2018-12-31": [entry("2018-12-31_23:00:00",
+                                 "2019-01-01_01:00:00")],
+            "2019-02-01": [entry("2019-02-01_10:00:00",
+                                 "2019-02-01_10:30:00")]}
+    Timeline(user="user", timeline=days,
+             activities={"cooking": ("0", {})}).save()
+
+    with Timeline.locked("user") as timeline:
+        assert timeline.archive("2019", "lzma") == ["2017", "2018"]
+        timeline.save()
+
+    directory = tyme_dir / "timelines" / "user"
+    assert sorted(path.name for path in directory.glob("20*")) \
+        == ["2017.jsonl.xz", "2018.jsonl.xz", "2019-02.jsonl"]
+
+    timeline = Timeline(user="user")
+    assert timeline.timeline.archives["2018"] == {
+        "file": "2018.jsonl.xz", "first_day": "2018-03-01",
+        "last_day": "2018-12-31", "months": ["2018-03", "2018-12"],
+        "entries": 2}
+    assert [day for day, _ in timeline.iter_recent()] == list(reversed(days))
+
+    # archived years are still counted from the roll-ups
+    hour = 60 * 60
+    assert timeline.report("2018-01-01", "2018-12-31") == {"0": 3 * hour}
+    assert timeline.report("2017-01-01", "2019-12-31") == {"0": 5.5 * hour}
+    assert timeline.report("2018-12-31", "2019-01-01") == {"0": 2 * hour}
+
+    with pytest.raises(TimelineError, match="2018 is archived"):
+        timeline.add_entry("0", utils.parse("2018-05-01_10:00:00"),
+                           utils.parse("2018-05-01_11:00:00"))
+
+    with Timeline.locked("user") as timeline:
+        assert timeline.archive("2019") == []
+
+        # the current year is still being written to
+        next_year = str(int(utils.utc_now().date_str[:4]) + 1)
+        with pytest.raises(TimelineError, match="current year"):
+            timeline.archive(next_year)
@@ -1,30 +1,42 @@
-import os
+# imported first, so that importing the rest of tyme can be timed
+import tyme.trace
 
-import hjson
+import json
 
 from tyme.common import *
-from tyme.timeline import *
 
 
 __version__ = "0.1.6"
 
 
+def __getattr__(name):
+    # the timeline is only imported once it is used, so that `tyme status
+    # --fast` can be answered without it (see `tyme.cli.fast`)
+    import tyme.timeline as timeline
+
+    if name.startswith("_") or not hasattr(timeline, name):
+        raise AttributeError(f"module 'tyme' has no attribute '{name}'")
+
+    return getattr(timeline, name)
+
+
 def init():
     """
     Initializes tyme environment with .tyme folder and initial files.
     """
 
-    if not os.path.isdir(TYME_DIR):
-        os.mkdir(TYME_DIR)
-        os.mkdir(TYME_TIMELINES_DIR)
+    # the state file is created last, so if it exists, so does everything else
+    if not TYME_STATE_FILE.exists():
+        TYME_TIMELINES_DIR.mkdir(parents=True, exist_ok=True)
 
-    if not os.path.exists(TYME_STATE_FILE):
         print("Couldn't find any users, tyme has probably not been setup yet.")
         user = input("What user would you like to use for your timeline?\n"
                      "username: ")
         state = {'default_user': user}
 
-        with open(TYME_STATE_FILE, 'w') as state_file:
-            hjson.dump(state, state_file)
-
+        from tyme.timeline import Timeline
         Timeline.make_empty(user)
+
+        # the state is plain JSON, which is also valid hjson
+        with open(TYME_STATE_FILE, 'w') as state_file:
+            json.dump(state, state_file)
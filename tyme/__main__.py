@@ -0,0 +1,7 @@
+"""
+Allows running tyme's cli as `python -m tyme`.
+"""
+
+from tyme.cli.fast import main
+
+main()
@@ -0,0 +1,132 @@
+"""
+Storage of and lookup tables over the activity hierarchy. The hierarchy
+itself is a nested structure of `name: (id, children)` pairs, which would
+otherwise have to be searched recursively every time an activity is looked up
+by name.
+
+Activities are identified by short ids, consecutive integers starting from 1
+(see `ActivityIndex.next_id`), which are all that entries store of their
+activity. Timelines written by older versions of tyme identified activities
+by uuid4s instead (see `tyme.migrate`).
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from tyme.common import ACTIVITIES_FILE_NAME
+from tyme.files import atomic_write
+
+JSONActivities = Dict[str, Tuple[str, "JSONActivities"]]
+
+
+def read_activities(directory: Path) -> JSONActivities:
+    """
+    Reads the activity hierarchy stored in `directory`.
+
+    Args:
+        directory (Path): the directory of a user's timeline
+
+    Returns:
+        JSONActivities: the activity hierarchy
+    """
+    with open(directory / ACTIVITIES_FILE_NAME) as activities:
+        return json.load(activities)
+
+
+def write_activities(directory: Path, activities: JSONActivities) -> None:
+    """
+    Writes the activity hierarchy `activities` to `directory`.
+
+    Args:
+        directory (Path): the directory of a user's timeline
+        activities (JSONActivities): the activity hierarchy
+    """
+    with atomic_write(directory / ACTIVITIES_FILE_NAME) as activities_file:
+        json.dump(activities, activities_file, separators=(",", ":"))
+
+
+class ActivityIndex:
+    """
+    Indexes an activity hierarchy by name, id and path. The index must be
+    kept up to date with `add` whenever an activity is created.
+
+    Args:
+        activities (JSONActivities): the hierarchy to be indexed
+
+    Attributes:
+        ids_by_name (Dict[str, List[str]]):
+            the ids of every activity with a given name
+        id_by_path (Dict[str, str]): the id of the activity at a given path
+        path_by_id (Dict[str, str]): the absolute path of an activity
+        name_by_id (Dict[str, str]): the name of an activity
+        parent_by_id (Dict[str, Optional[str]]):
+            the id of the parent of an activity, `None` for top-level ones
+    """
+
+    def __init__(self, activities: JSONActivities) -> None:
+        self.ids_by_name: Dict[str, List[str]] = {}
+        self.id_by_path: Dict[str, str] = {}
+        self.path_by_id: Dict[str, str] = {}
+        self.name_by_id: Dict[str, str] = {}
+        self.parent_by_id: Dict[str, Optional[str]] = {}
+
+        # one more than the largest id, see `next_id`
+        self._next_id = 1
+
+        stack: List[Tuple[Optional[str], JSONActivities]] = [
+            (None, activities)]
+        while stack:
+            parent_id, category = stack.pop()
+            for name, (activity_id, children) in category.items():
+                self.add(name, activity_id, parent_id)
+                stack.append((activity_id, children))
+
+    def add(self, name: str, activity_id: str, parent_id: Optional[str]) -> None:
+        """
+        Adds an activity to the index. Its parent must already be indexed.
+
+        Args:
+            name (str): the name of the activity
+            activity_id (str): the id of the activity
+            parent_id (Optional[str]):
+                the id of the parent activity, `None` for top-level ones
+        """
+        parent_path = "" if parent_id is None else self.path_by_id[parent_id]
+        path = f"{parent_path}/{name}"
+
+        self.ids_by_name.setdefault(name, []).append(activity_id)
+        self.id_by_path[path] = activity_id
+        self.path_by_id[activity_id] = path
+        self.name_by_id[activity_id] = name
+        self.parent_by_id[activity_id] = parent_id
+
+        if activity_id.isdigit():
+            self._next_id = max(self._next_id, int(activity_id) + 1)
+
+    def next_id(self) -> str:
+        """
+        Returns the id of the next activity to be created, which no activity
+        in the index has.
+
+        Returns:
+            str: the id of the next activity
+        """
+        return str(self._next_id)
+
+    def ids(self, activity: str) -> List[str]:
+        """
+        Returns the ids of every activity matching `activity`, which is
+        either a name or an absolute path.
+
+        Args:
+            activity (str): the name or absolute path of an activity
+
+        Returns:
+            List[str]: the ids of the matching activities
+        """
+        if activity.startswith("/"):
+            activity_id = self.id_by_path.get(activity)
+            return [] if activity_id is None else [activity_id]
+
+        return self.ids_by_name.get(activity, [])
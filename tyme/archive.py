@@ -0,0 +1,126 @@
+"""
+Compressed, read-only archives of closed years of a user's timeline, kept
+alongside its shards so that the shards of recent months stay small.
+
+Each archived year is a single file, YYYY.jsonl.gz or YYYY.jsonl.xz, holding
+the same lines its month shards did (see `tyme.shards`), compressed with
+gzip or lzma. Archives are listed in archives.json, which records for every
+archived year:
+
+    file: the name of its archive file
+    first_day, last_day: the first and last days with entries
+    months: the months with entries
+    entries: the number of entries
+
+Archived months are read from their archive when one of their days is
+accessed, and can no longer be modified.
+"""
+
+import json
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, List, Tuple
+
+from tyme.common import (ARCHIVE_INDEX_FILE_NAME, COMPRESSIONS,
+                         DEFAULT_COMPRESSION)
+from tyme.entry import Entry, JSONEntry
+from tyme.files import atomic_write
+
+JSONArchive = Dict[str, Any]
+
+
+def read_index(directory: Path) -> Dict[str, JSONArchive]:
+    """
+    Reads the index of the archives of the timeline stored in `directory`.
+
+    Args:
+        directory (Path): the directory of a user's timeline
+
+    Returns:
+        Dict[str, JSONArchive]: each archived year and its description
+    """
+    try:
+        with open(directory / ARCHIVE_INDEX_FILE_NAME) as index:
+            return json.load(index)
+    except FileNotFoundError:
+        return {}
+
+
+def write_index(directory: Path, index: Dict[str, JSONArchive]) -> None:
+    """
+    Writes the index of the archives of the timeline stored in `directory`.
+
+    Args:
+        directory (Path): the directory of a user's timeline
+        index (Dict[str, JSONArchive]): each archived year and its description
+    """
+    with atomic_write(directory / ARCHIVE_INDEX_FILE_NAME) as index_file:
+        json.dump(index, index_file, separators=(",", ":"))
+
+
+def _open(file: Any, mode: str, suffix: str) -> IO[str]:
+    """
+    Opens the archive `file`, a path or a binary file, compressed as given by
+    its suffix `suffix`, in text mode.
+    """
+    # compression modules are only imported once an archive is opened
+    if suffix == COMPRESSIONS["lzma"]:
+        import lzma
+        return lzma.open(file, mode)
+
+    import gzip
+    return gzip.open(file, mode)
+
+
+def read_archive(path: Path) -> Iterator[JSONEntry]:
+    """
+    Yields the lines of the archive at `path`, each an entry with a "day"
+    field, in chronological order.
+
+    Args:
+        path (Path): the archive to be read
+
+    Returns:
+        Iterator[JSONEntry]: the entries of the archive
+    """
+    with _open(path, "rt", path.suffix) as archive:
+        for line in archive:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_archive(directory: Path,
+                  year: str,
+                  days: Iterable[Tuple[str, List[Entry]]],
+                  compression: str = DEFAULT_COMPRESSION) -> JSONArchive:
+    """
+    Writes the archive of year `year` of the timeline stored in `directory`.
+    The index is left for the caller to update.
+
+    Args:
+        directory (Path): the directory of a user's timeline
+        year (str): the year being archived, YYYY
+        days (Iterable[Tuple[str, List[Entry]]]):
+            the days of the year and their entries, in order
+        compression (str): either "gzip" or "lzma"
+
+    Returns:
+        JSONArchive: the description of the archive, for the index
+    """
+    suffix = COMPRESSIONS[compression]
+    path = directory / f"{year}.jsonl{suffix}"
+
+    days = list(days)
+    with atomic_write(path, binary=True) as raw, \
+            _open(raw, "wt", suffix) as archive:
+        archive.writelines(
+            json.dumps({"day": day, **entry.to_json()}, separators=(",", ":"))
+            + "\n"
+            for day, entries in days for entry in entries)
+
+    return {
+        "file": path.name,
+        "first_day": days[0][0] if days else None,
+        "last_day": days[-1][0] if days else None,
+        "months": sorted({day[:7] for day, _ in days}),
+        "entries": sum(len(entries) for _, entries in days),
+    }
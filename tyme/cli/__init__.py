@@ -1,3 +1,9 @@
-from tyme.cli.cli import *
-import tyme.cli.fzf as fzf
-import tyme.cli.render as render
+def __getattr__(name):
+    # the cli is only imported once it is used, so that `tyme status --fast`
+    # can be answered without it (see `tyme.cli.fast`)
+    import tyme.cli.cli as cli
+
+    if name.startswith("_") or not hasattr(cli, name):
+        raise AttributeError(f"module 'tyme.cli' has no attribute '{name}'")
+
+    return getattr(cli, name)
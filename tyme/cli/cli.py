@@ -3,15 +3,50 @@ Entrypoint for tyme cli
 """
 
 import argparse
+import contextlib
+import os
 import sys
-
-import colorama
+from datetime import date
+from pathlib import Path
+from typing import Optional
 
 import tyme.cli.render as render
-from tyme.timeline import Timeline, TimelineError
+import tyme.daemon as daemon
+import tyme.trace as trace
+import tyme.utils as utils
+from tyme.common import COMPRESSIONS, DEFAULT_COMPRESSION
+from tyme.status import JSONStatus, read_status
+from tyme.storage import STORAGE_NAMES
+from tyme.timeline import AmbiguousActivityError, Timeline, TimelineError
 from tyme import init as tyme_init
 
 
+def day(value: str) -> str:
+    """
+    Checks that a day given on the command line is a valid YYYY-MM-DD date.
+
+    Args:
+        value (str): the day given
+
+    Returns:
+        str: the day
+
+    Raises:
+        argparse.ArgumentTypeError: if `value` is not a valid day
+    """
+    try:
+        # other ISO 8601 forms, such as YYYYMMDD, aren't compared correctly
+        valid = date.fromisoformat(value).isoformat() == value
+    except ValueError:
+        valid = False
+
+    if not valid:
+        raise argparse.ArgumentTypeError(
+            f"invalid day '{value}', expected YYYY-MM-DD")
+
+    return value
+
+
 def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument("--user",
@@ -21,12 +56,33 @@ def parse_args():
                         help="Specify a user. If this is not present, then "
                         "the default user is assumed.")
 
+    parser.add_argument("--direct",
+                        "-d",
+                        required=False,
+                        action="store_true",
+                        help="Access the timeline files directly, even if "
+                        "the tyme daemon is running.")
+
     parser.add_argument("--no-color",
                         "-c",
                         required=False,
                         action="store_true",
                         help="Disable colors globally.")
 
+    parser.add_argument("--profile",
+                        required=False,
+                        action="store_true",
+                        help="Print the time and memory spent in each phase "
+                        "of the command to stderr. Can also be enabled with "
+                        "TYME_TRACE=1.")
+
+    parser.add_argument("--profile-file",
+                        default=None,
+                        metavar="FILE",
+                        help="Like --profile, and also write cProfile "
+                        "statistics to FILE. Can also be enabled with "
+                        "TYME_TRACE=FILE.")
+
     commands = parser.add_subparsers(title="commands",
                                      required=True,
                                      dest="command",
@@ -36,7 +92,9 @@ def parse_args():
     start = commands.add_parser("start", help="Start a new activity.")
     start.add_argument("activity",
                        metavar="ACTIVITY",
-                       help="The activity to be started.")
+                       help="The activity to be started. Part of its name "
+                       "is enough if no other activity matches it. Use its "
+                       "absolute path if several activities share its name.")
 
     stop = commands.add_parser("stop", help="Stop the current activity.")
 
@@ -60,7 +118,22 @@ def parse_args():
                       "appear, in order to decide where to place this "
                       "activity.")
 
-    commands.add_parser("status", help="Output the current activity if any.")
+    status = commands.add_parser("status",
+                                 help="Output the current activity if any.")
+    status.add_argument("--fast",
+                        action="store_true",
+                        help="Read the current activity from its cache "
+                             "instead of loading the timeline, or even "
+                             "importing it. Python still starts, so status "
+                             "bars and shell prompts that poll often should "
+                             "read the cache file, ~/.tyme/status/USER.json, "
+                             "directly.")
+    status.add_argument("--format",
+                        default=None,
+                        help="Output the current activity with a format "
+                             "string instead, in which {name}, {path}, "
+                             "{start} and {elapsed} are replaced. Nothing "
+                             "is output if there is no current activity.")
 
     log = commands.add_parser("log",
                               help="Get a log of some recent activities. "
@@ -72,6 +145,124 @@ def parse_args():
                      type=int,
                      help="The number of events to display. Defaults to 5.")
 
+    report = commands.add_parser("report",
+                                 help="Show the time spent on each activity "
+                                      "over a range of days, including the "
+                                      "time spent on its children.")
+    report.add_argument("--from",
+                        "-f",
+                        dest="first_day",
+                        type=day,
+                        default=None,
+                        help="The first day of the report, YYYY-MM-DD. "
+                             "Defaults to today.")
+    report.add_argument("--to",
+                        "-t",
+                        dest="last_day",
+                        type=day,
+                        default=None,
+                        help="The last day of the report, YYYY-MM-DD. "
+                             "Defaults to today.")
+
+    team_report = commands.add_parser("team-report",
+                                      help="Show the time spent on each "
+                                           "activity by several users "
+                                           "together, over a range of days. "
+                                           "Activities are matched by path.")
+    team_report.add_argument("--from",
+                             "-f",
+                             dest="first_day",
+                             type=day,
+                             default=None,
+                             help="The first day of the report, YYYY-MM-DD. "
+                                  "Defaults to today.")
+    team_report.add_argument("--to",
+                             "-t",
+                             dest="last_day",
+                             type=day,
+                             default=None,
+                             help="The last day of the report, YYYY-MM-DD. "
+                                  "Defaults to today.")
+    team_report.add_argument("--users",
+                             nargs="+",
+                             default=None,
+                             help="The users to report on. Defaults to every "
+                                  "user with a timeline.")
+    team_report.add_argument("--workers",
+                             "-j",
+                             type=int,
+                             default=None,
+                             help="The number of processes to load timelines "
+                                  "with. Defaults to the number of CPUs.")
+
+    at = commands.add_parser("at",
+                             help="Show the activities that were ongoing at "
+                                  "some moment, or between two moments. "
+                                  "Times without a UTC offset are assumed "
+                                  "to be in UTC.")
+    at.add_argument("moment",
+                    metavar="MOMENT",
+                    help="The moment to look up, e.g. '2019-08-26 15:00'.")
+    at.add_argument("until",
+                    metavar="UNTIL",
+                    nargs="?",
+                    default=None,
+                    help="If present, show every activity between MOMENT "
+                         "and UNTIL instead.")
+
+    import_ = commands.add_parser("import",
+                                  help="Import past activities from a CSV "
+                                       "or JSON Lines file of records with "
+                                       "'activity', 'start' and 'end' "
+                                       "fields, ordered by start time. "
+                                       "Activities are given by their "
+                                       "absolute paths, and are created if "
+                                       "they don't exist. Times without a "
+                                       "UTC offset are assumed to be in UTC.")
+    import_.add_argument("file",
+                         metavar="FILE",
+                         help="The file to import.")
+    import_.add_argument("--format",
+                         choices=["csv", "jsonl"],
+                         default=None,
+                         help="The format of FILE. Defaults to its "
+                              "extension.")
+
+    commands.add_parser("daemon",
+                        help="Run a server that keeps timelines loaded in "
+                             "memory. While it is running, other tyme "
+                             "commands are forwarded to it.")
+
+    commands.add_parser("compact",
+                        help="Rewrite the timeline file with every change "
+                             "recorded in its journal.")
+
+    archive = commands.add_parser("archive",
+                                  help="Move closed years of history into "
+                                       "compressed, read-only archives. "
+                                       "They are still included in logs "
+                                       "and reports.")
+    archive.add_argument("--before",
+                         "-b",
+                         default=None,
+                         metavar="YEAR",
+                         help="The first year not to archive. Defaults to "
+                              "the current year.")
+    archive.add_argument("--compression",
+                         choices=list(COMPRESSIONS),
+                         default=DEFAULT_COMPRESSION,
+                         help="How archives are compressed. Defaults to "
+                              f"{DEFAULT_COMPRESSION}.")
+
+    storage = commands.add_parser("storage",
+                                  help="Move the timeline to another "
+                                       "storage backend: 'files', one JSON "
+                                       "Lines file per month, or 'sqlite', "
+                                       "an indexed SQLite database.")
+    storage.add_argument("backend",
+                         choices=STORAGE_NAMES,
+                         help="The backend to store the timeline with.")
+
     where = commands.add_parser("where",
                                 help="Get the full path of an activity.")
 
@@ -81,47 +272,281 @@ def parse_args():
     return parser.parse_args()
 
 
+# commands that modify the timeline, and so must hold its lock
+MUTATING_COMMANDS = {"start", "stop", "make", "compact", "import", "archive",
+                     "storage"}
+
+
+def run_command(timeline: Timeline, args: argparse.Namespace) -> None:
+    """
+    Runs the command given by `args` on `timeline`, and prints its output.
+
+    Args:
+        timeline (Timeline): the timeline to run the command on
+        args (argparse.Namespace): the parsed command line arguments
+    """
+    render.set_color(args.color)
+
+    if args.command == "start":
+        done_activity = timeline.start(args.activity)
+        # `args.activity` may only be part of the name
+        render.start(timeline.status()["name"], done_activity)
+
+    elif args.command == "stop" and timeline.current_activity() is not None:
+        start, end, activity = timeline.done()
+        render.done(start, end, activity)
+
+    elif args.command == "make":
+        activity = render.select_activity_path(args.activity,
+                                               timeline.index)
+        timeline.new_activity(activity, parents=args.parents)
+        render.new_activity(activity)
+
+    elif args.command == "status":
+        print_status(timeline.status(), args.format)
+
+    elif args.command == "log":
+        # newest first, only as far back as needed
+        recent_activities = list(timeline.iter_recent(num=args.number))
+        render.print_log(reversed(recent_activities), timeline.index)
+
+    elif args.command == "where":
+        print(timeline.activity_path(args.activity))
+
+    elif args.command == "report":
+        today = utils.utc_now().date_str
+        first_day = args.first_day or today
+        last_day = args.last_day or today
+        render.print_report(first_day,
+                            last_day,
+                            timeline.report(first_day, last_day),
+                            timeline.index)
+
+    elif args.command == "at":
+        try:
+            moment = utils.parse_moment(args.moment)
+            until = None if args.until is None else utils.parse_moment(
+                args.until)
+        except ValueError as e:
+            raise TimelineError(f"Invalid moment: {e}")
+
+        if until is None:
+            render.print_log(timeline.at(moment), timeline.index)
+        else:
+            render.print_log(timeline.between(moment, until), timeline.index)
+
+    elif args.command == "compact":
+        render.save(timeline.compact())
+
+    elif args.command == "archive":
+        before = args.before or utils.utc_now().date_str[:4]
+        if len(before) != 4 or not before.isdigit():
+            raise TimelineError(f"Invalid year '{before}'.")
+
+        render.archived(timeline.archive(before, args.compression))
+
+    elif args.command == "storage":
+        render.save(timeline.convert(args.backend))
+
+    elif args.command == "import":
+        # csv is only imported by the command that uses it
+        import tyme.importer as importer
+
+        path = Path(args.file)
+        try:
+            count = importer.import_records(
+                timeline, importer.read_records(path, args.format))
+        except OSError as e:
+            raise TimelineError(f"Could not read {path}: {e.strerror}.")
+
+        render.imported(count, str(path))
+
+
+def print_status(status: JSONStatus, format_string: Optional[str]) -> None:
+    """
+    Prints the ongoing activity, with the format string `format_string` if
+    one is given (see `render.print_formatted_status`).
+
+    Args:
+        status (JSONStatus):
+            the ongoing activity as it is cached (see `tyme.status`), empty
+            if there is none
+        format_string (Optional[str]): the format of the status, if any
+    """
+    if format_string is None:
+        return render.print_status(status)
+
+    try:
+        render.print_formatted_status(format_string,
+                                      status,
+                                      utils.epoch(utils.utc_now()))
+    except (KeyError, IndexError, ValueError) as e:
+        raise TimelineError(f"Invalid format '{format_string}': {e}")
+
+
+def run_fast_status(args: argparse.Namespace) -> None:
+    """
+    Prints the ongoing activity of the user given by `args` from its status
+    cache (see `tyme.status`), without loading the timeline, or forwarding
+    the command to the tyme daemon. If the cache was never written, the
+    timeline is loaded without taking its lock.
+
+    Args:
+        args (argparse.Namespace): the parsed command line arguments
+    """
+    user = args.user or Timeline.default_user()
+    status = read_status(user)
+
+    if status is None:
+        # only written once an activity was started or completed. Prompts may
+        # ask for the status on every render, so this never waits for the
+        # timeline's lock, and leaves writing the cache to the next change
+        status = Timeline(user=user).status()
+
+    print_status(status, args.format)
+
+
+def run_team_report(args: argparse.Namespace) -> None:
+    """
+    Prints the report over several users given by `args`.
+
+    Args:
+        args (argparse.Namespace): the parsed command line arguments
+    """
+    # process pools are only imported by the commands that use them
+    import tyme.team as team
+
+    today = utils.utc_now().date_str
+    first_day = args.first_day or today
+    last_day = args.last_day or today
+    users = args.users or Timeline.users()
+
+    render.print_path_report(first_day,
+                             last_day,
+                             team.team_report(users,
+                                              first_day,
+                                              last_day,
+                                              workers=args.workers),
+                             users=len(users))
+
+
+def run_timeline_command(args: argparse.Namespace) -> None:
+    """
+    Runs the command given by `args` on its user's timeline, on the tyme
+    daemon if it is running, and prints its output.
+
+    Args:
+        args (argparse.Namespace): the parsed command line arguments
+    """
+    if not args.direct:
+        with trace.phase("daemon"):
+            output = daemon.forward(args)
+        if output is not None:
+            return print(output, end="")
+
+    with contextlib.ExitStack() as stack:
+        with trace.phase("load"):
+            if args.command in MUTATING_COMMANDS:
+                timeline = stack.enter_context(Timeline.locked(args.user))
+            else:
+                timeline = Timeline(user=args.user)
+
+        with trace.phase("command"):
+            run_command(timeline, args)
+
+        with trace.phase("save"):
+            timeline.save()
+
+
+def enable_tracing(args: argparse.Namespace) -> None:
+    """
+    Enables tracing if it was requested with --profile, --profile-file or
+    TYME_TRACE.
+
+    Args:
+        args (argparse.Namespace): the parsed command line arguments
+    """
+    if args.profile or args.profile_file is not None:
+        trace.enable(args.profile_file)
+        return
+
+    value = os.environ.get("TYME_TRACE", "")
+    if value not in ("", "0"):
+        trace.enable(None if value == "1" else value)
+
+
 def main():
     """
     Entrypoint for tyme's cli.
     """
+    try:
+        run(parse_args())
+    finally:
+        # kept apart from the normal output, which may be piped elsewhere
+        sys.stderr.write(trace.summary())
+
+
+def run(args: argparse.Namespace) -> None:
+    """
+    Runs the command given by `args`, from setting up tyme to printing its
+    output.
+
+    Args:
+        args (argparse.Namespace): the parsed command line arguments
+    """
+    enable_tracing(args)
 
-    tyme_init()
-    args = parse_args()
+    with trace.phase("init"):
+        tyme_init()
 
-    if args.no_color:
-        colorama.init(autoreset=True, strip=True, convert=False)
-    else:
-        colorama.init(autoreset=True)
+    # escape sequences are only worth writing to a terminal
+    args.color = not args.no_color and sys.stdout.isatty()
+    if args.color and sys.platform == "win32":
+        # converts escape sequences for consoles that don't support them
+        import colorama
+        colorama.init()
+    render.set_color(args.color)
 
     try:
-        timeline = Timeline(user=args.user)
-
-        if args.command == "start":
-            done_activity = timeline.start(args.activity)
-            render.start(args.activity, done_activity)
+        if args.command == "make" and not args.activity.startswith("/"):
+            # pick the location interactively before taking the lock, so that
+            # other processes aren't kept waiting on the user
+            args.activity = render.select_activity_path(
+                args.activity, Timeline(user=args.user).index)
 
-        elif args.command == "stop" and timeline.current_activity() is not None:
-            start, end, activity = timeline.done()
-            render.done(start, end, activity)
+        if args.command == "import":
+            # the daemon doesn't share our working directory
+            args.file = os.path.abspath(args.file)
 
-        elif args.command == "make":
-            activity = render.select_activity_path(args.activity,
-                                                   timeline.activities)
-            timeline.new_activity(activity, parents=args.parents)
-            render.new_activity(activity)
+        if args.command == "daemon":
+            return daemon.Server().serve()
 
-        elif args.command == "status":
-            render.print_status(timeline.current_activity())
+        if args.command == "status" and args.fast:
+            with trace.phase("command"):
+                return run_fast_status(args)
 
-        elif args.command == "log":
-            recent_activities = timeline.recent_activities(num=args.number)
-            render.print_log(recent_activities)
+        # the pager is only started once the timeline's lock is released
+        with render.paged():
+            # reads the timelines of several users in worker processes
+            if args.command == "team-report":
+                with trace.phase("command"):
+                    return run_team_report(args)
 
-        elif args.command == "where":
-            print(timeline.activity_path(args.activity))
+            try:
+                run_timeline_command(args)
+            except AmbiguousActivityError as e:
+                if args.command != "start" or not sys.stdin.isatty():
+                    raise
 
-        timeline.save()
+                # the timeline's lock is released while the user picks
+                args.activity = render.select_activity(e.paths)
+                run_timeline_command(args)
 
     except TimelineError as e:
         print(e)
+
+    except BrokenPipeError:
+        # whatever was reading the output stopped, e.g. `tyme log | head`.
+        # Further writes, including when exiting, would fail again
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
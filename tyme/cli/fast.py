@@ -0,0 +1,252 @@
+"""
+Entrypoint for tyme's cli. `tyme status --fast` is answered here, from the
+status cache (see `tyme.status`), before the rest of tyme is imported: status
+bars and shell prompts may run it every time they are drawn, and importing the
+timeline takes longer than everything else it does. Every other command, and
+this one whenever the cache can't answer it, is run by `tyme.cli.cli`.
+
+Only `tyme.common` and `tyme.status` may be imported here.
+"""
+
+import json
+import os
+import sys
+import time
+from typing import Iterator, List, NamedTuple, Optional
+
+from tyme.common import TYME_STATE_FILE
+from tyme.status import JSONStatus, read_status
+
+# the escape sequences of the colorama styles used by `render.print_status`
+BLUE = "\x1b[34m"
+GREEN = "\x1b[32m"
+YELLOW = "\x1b[33m"
+BRIGHT = "\x1b[1m"
+RESET_ALL = "\x1b[0m"
+
+
+class FastStatusArgs(NamedTuple):
+    """
+    The command line arguments of `tyme status --fast`.
+    """
+    user: Optional[str]
+    no_color: bool
+    format: Optional[str]
+
+
+def _value(option: str, arg: str, args: Iterator[str]) -> Optional[str]:
+    """
+    Returns the value of the option `option` given as `arg`, either as
+    "--option=value" or followed by the next argument in `args`, or `None`
+    if there is none.
+    """
+    if arg.startswith(f"{option}="):
+        return arg[len(option) + 1:]
+
+    value = next(args, None)
+    if value is None or value.startswith("-"):
+        return None
+
+    return value
+
+
+def parse_fast_status(argv: List[str]) -> Optional[FastStatusArgs]:
+    """
+    Parses the command line arguments `argv` if they are those of `tyme
+    status --fast`. Anything this doesn't recognize, such as abbreviated or
+    combined options, is left to `tyme.cli.cli`.
+
+    Args:
+        argv (List[str]): the command line arguments, without the program
+
+    Returns:
+        Optional[FastStatusArgs]:
+            the parsed arguments, or `None` if they are those of any other
+            command
+    """
+    user = format_string = None
+    no_color = fast = False
+
+    args = iter(argv)
+    for arg in args:
+        if arg in ("--direct", "-d"):
+            # the daemon is never asked
+            continue
+        elif arg in ("--no-color", "-c"):
+            no_color = True
+        elif arg in ("--user", "-u") or arg.startswith("--user="):
+            user = _value("--user", arg, args)
+            if user is None:
+                return None
+        else:
+            break
+    else:
+        return None
+
+    if arg != "status":
+        return None
+
+    for arg in args:
+        if arg == "--fast":
+            fast = True
+        elif arg == "--format" or arg.startswith("--format="):
+            format_string = _value("--format", arg, args)
+            if format_string is None:
+                return None
+        else:
+            return None
+
+    if not fast:
+        return None
+
+    return FastStatusArgs(user, no_color, format_string)
+
+
+def default_user() -> Optional[str]:
+    """
+    Returns the default user, if it is stored in a JSON state file.
+
+    Returns:
+        Optional[str]:
+            the default user, or `None` if tyme was never set up, or its
+            state file was written by an older version of tyme as hjson
+    """
+    try:
+        with open(TYME_STATE_FILE) as state_file:
+            return json.load(state_file)["default_user"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def format_elapsed(seconds: int) -> str:
+    """
+    Formats a number of seconds like `render.format_elapsed_time_phrase`,
+    e.g. "1 hour and 3 seconds".
+
+    Args:
+        seconds (int): the number of seconds to format
+
+    Returns:
+        str: the elapsed time phrase
+    """
+    units = [(seconds // (24 * 60 * 60), "day"),
+             (seconds // 3600 % 24, "hour"),
+             (seconds // 60 % 60, "minute"),
+             (seconds % 60, "second")]
+    phrase = [f"{count} {unit}{'s' if count > 1 else ''}"
+              for count, unit in units if count > 0]
+
+    # add an 'and' if there is more than one kind of time
+    if len(phrase) > 1:
+        *rest, last = phrase
+        phrase = [*rest, "and", last]
+
+    return " ".join(phrase)
+
+
+def format_status(status: JSONStatus,
+                  format_string: Optional[str],
+                  color: bool,
+                  now: int) -> Optional[str]:
+    """
+    Formats the ongoing activity the way `tyme status` prints it (see
+    `render.print_status` and `render.print_formatted_status`).
+
+    Args:
+        status (JSONStatus):
+            the ongoing activity as it is cached, empty if there is none
+        format_string (Optional[str]): the format of the status, if any
+        color (bool): whether the output is colored
+        now (int): the current time, in seconds since the epoch
+
+    Returns:
+        Optional[str]: the status, or `None` if nothing is output
+
+    Raises:
+        KeyError: if `format_string` contains any other field
+    """
+    if format_string is not None and not status:
+        return None
+
+    if not status:
+        return "There is no ongoing activity."
+
+    elapsed = max(now - status["start"], 0)
+    start = time.strftime("%H:%M:%S", time.gmtime(status["start"]))
+
+    if format_string is not None:
+        return format_string.format(
+            name=status["name"],
+            path=status["path"],
+            start=start,
+            elapsed=f"{elapsed // 3600:02}:{elapsed // 60 % 60:02}:"
+                    f"{elapsed % 60:02}")
+
+    def paint(text: str, *styles: str) -> str:
+        return "".join(styles) + text + RESET_ALL if color else text
+
+    return (paint(" |-", BLUE) + paint(status["name"], GREEN)
+            + paint(f" ({format_elapsed(elapsed)}):", BRIGHT, YELLOW) + "\n"
+            + paint(" |", BLUE) + "   start: " + paint(start, YELLOW) + "\n"
+            + paint(" |", BLUE) + "   end:   " + paint("...", YELLOW)
+            + "\n" + paint(" V", BLUE))
+
+
+def run_fast_status(argv: List[str]) -> bool:
+    """
+    Prints the ongoing activity from its status cache, if the command line
+    arguments `argv` are those of `tyme status --fast` and the cache can
+    answer it.
+
+    Args:
+        argv (List[str]): the command line arguments, without the program
+
+    Returns:
+        bool: whether the status was printed
+    """
+    # phases are only timed by the full cli
+    if os.environ.get("TYME_TRACE", "") not in ("", "0"):
+        return False
+
+    args = parse_fast_status(argv)
+    if args is None:
+        return False
+
+    # colorama converts escape sequences for consoles that don't support them
+    color = not args.no_color and sys.stdout.isatty()
+    if color and sys.platform == "win32":
+        return False
+
+    user = args.user or default_user()
+    if user is None:
+        return False
+
+    # only written once an activity was started or completed
+    status = read_status(user)
+    if status is None:
+        return False
+
+    try:
+        output = format_status(status, args.format, color, int(time.time()))
+    except (KeyError, IndexError, ValueError):
+        # invalid formats are reported by the full cli
+        return False
+
+    try:
+        if output is not None:
+            print(output)
+    except BrokenPipeError:
+        # see `tyme.cli.cli.run`
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+
+    return True
+
+
+def main():
+    """
+    Entrypoint for tyme's cli.
+    """
+    if not run_fast_status(sys.argv[1:]):
+        from tyme.cli.cli import main as cli_main
+        cli_main()
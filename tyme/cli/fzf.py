@@ -5,20 +5,30 @@ import os.path
 import subprocess
 import sys
 
-from pkg_resources import resource_exists, resource_filename
-
-__all__ = "BUNDLED_EXECUTABLE", "iterfzf"
+__all__ = "bundled_executable", "iterfzf"
 
 EXECUTABLE_NAME = "fzf.exe" if sys.platform == "win32" else "fzf"
-BUNDLED_EXECUTABLE = (
-    resource_filename(__name__, EXECUTABLE_NAME)
-    if resource_exists(__name__, EXECUTABLE_NAME)
-    else (
-        os.path.join(os.path.dirname(__file__), EXECUTABLE_NAME)
-        if os.path.isfile(os.path.join(os.path.dirname(__file__), EXECUTABLE_NAME))
-        else None
-    )
-)
+
+
+def bundled_executable():
+    """
+    Returns the path of the fzf executable bundled with this package, or
+    `None` if there isn't one. This is looked up on demand, since importing
+    `pkg_resources` is slow.
+    """
+    bundled = os.path.join(os.path.dirname(__file__), EXECUTABLE_NAME)
+    if os.path.isfile(bundled):
+        return bundled
+
+    try:
+        from pkg_resources import resource_exists, resource_filename
+    except ImportError:
+        return None
+
+    if resource_exists(__name__, EXECUTABLE_NAME):
+        return resource_filename(__name__, EXECUTABLE_NAME)
+
+    return None
 
 
 def iterfzf(
@@ -37,8 +47,10 @@ def iterfzf(
     # Misc:
     query="",
     encoding=None,
-    executable=BUNDLED_EXECUTABLE or EXECUTABLE_NAME,
+    executable=None,
 ):
+    if executable is None:
+        executable = bundled_executable() or EXECUTABLE_NAME
     cmd = [
         executable,
         "--no-sort",
@@ -62,11 +74,10 @@ def iterfzf(
     if query:
         cmd.append("--query=" + query)
     encoding = encoding or sys.getdefaultencoding()
-    proc = None
-    stdin = None
     byte = None
     lf = u"\n"
     cr = u"\r"
+    lines = []
     for line in iterable:
         if byte is None:
             byte = isinstance(line, bytes)
@@ -83,30 +94,29 @@ def iterfzf(
                 r"element values must not contain CR({1!r})/"
                 r"LF({2!r}): {0!r}".format(line, cr, lf)
             )
-        if proc is None:
-            proc = subprocess.Popen(
-                cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=None
-            )
-            stdin = proc.stdin
         if not byte:
             line = line.encode(encoding)
-        try:
-            stdin.write(line + b"\n")
-            stdin.flush()
-        except IOError as e:
-            if e.errno != errno.EPIPE:
-                raise
-            break
-    if proc is None or proc.wait() not in [0, 1]:
+        lines.append(line + b"\n")
+    if not lines:
         if print_query:
             return None, None
         else:
             return None
+    # every choice is written at once, rather than flushed line by line
+    proc = subprocess.Popen(
+        cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=None
+    )
     try:
-        stdin.close()
+        proc.stdin.write(b"".join(lines))
+        proc.stdin.close()
     except IOError as e:
         if e.errno != errno.EPIPE:
             raise
+    if proc.wait() not in [0, 1]:
+        if print_query:
+            return None, None
+        else:
+            return None
     stdout = proc.stdout
     decode = (lambda b: b) if byte else (lambda t: t.decode(encoding))
     output = [decode(l.strip(b"\r\n")) for l in iter(stdout.readline, b"")]
@@ -2,16 +2,116 @@
 Render has all of the convenience print functions used by tyme/cli/cli.py
 These functions format and color any output that is sent to stdout.
 Any fancy output that you see from tyme has been generated here.
+
+Output is built up as whole lines, or chunks of lines for long logs, which
+are written at once rather than piece by piece. Colors are added as ANSI
+escape sequences only when enabled (see `set_color`), and long output is
+shown through a pager when stdout is a terminal (see `paged`).
 """
 
+import contextlib
+import io
+import os
+import shutil
+import subprocess
+import sys
+import threading
+
+import tyme.trace as trace
 import tyme.utils as utils
-from tyme.timeline import JSONActivities
-from tyme.cli import fzf
+from tyme.activities import ActivityIndex
+from tyme.entry import Entry
 
 from colorama import Fore, Style
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 # from pyfzf import FzfPrompt
 
+# number of log entries formatted before they are written out
+LOG_CHUNK_SIZE = 256
+
+# whether output is colored, see `set_color`. Kept per thread, since the
+# tyme daemon runs the commands of several clients at once
+_state = threading.local()
+
+
+def set_color(enabled: bool) -> None:
+    """
+    Enables or disables colors in everything printed from now on by the
+    current thread. When disabled, no ANSI escape sequences are output at
+    all.
+
+    Args:
+        enabled (bool): whether output should be colored
+    """
+    _state.color = enabled
+
+
+def paint(text: str, *styles: str) -> str:
+    """
+    Returns `text` in the colorama styles `styles`, followed by a reset of
+    all styles, or `text` alone if colors are disabled.
+
+    Args:
+        text (str): the text to be colored
+        styles (str): colorama styles, e.g. `Fore.GREEN`
+
+    Returns:
+        str: the colored text
+    """
+    if not styles or not getattr(_state, "color", True):
+        return text
+
+    return "".join(styles) + text + Style.RESET_ALL
+
+
+def page(text: str) -> None:
+    """
+    Writes `text` to stdout. If stdout is a terminal that `text` doesn't fit
+    on, it is shown through the pager in the PAGER environment variable, or
+    `less` by default, instead.
+
+    Args:
+        text (str): the text to be shown
+    """
+    if not text:
+        return
+
+    if sys.stdout.isatty() and (text.count("\n")
+                                >= shutil.get_terminal_size().lines):
+        pager = os.environ.get("PAGER", "less")
+        if pager and shutil.which(pager.split()[0]):
+            # show colors, and quit right away if it all fits after all
+            env = dict(os.environ)
+            env.setdefault("LESS", "FRX")
+            with contextlib.suppress(KeyboardInterrupt):
+                subprocess.run(pager, shell=True, input=text,
+                               universal_newlines=True, env=env)
+            return
+
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
+@contextlib.contextmanager
+def paged() -> Iterator[None]:
+    """
+    If stdout is a terminal, collects everything printed within the block
+    and shows it with `page` once the block exits. Otherwise, output is
+    written as it is printed.
+    """
+    if not sys.stdout.isatty():
+        yield
+        return
+
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            yield
+    finally:
+        with trace.phase("render"):
+            page(output.getvalue())
+
+
 def start(activity: str,
           done_activity: Tuple[utils.Timestamp, utils.Timestamp, str]) -> None:
     """
@@ -28,8 +128,7 @@ def start(activity: str,
     if done_activity is not None:
         done(*done_activity)
 
-    print(f"You started to spend time on ", end="")
-    print(f"'{Fore.GREEN + activity + Style.RESET_ALL}'.")
+    print(f"You started to spend time on '{paint(activity, Fore.GREEN)}'.")
 
 
 def done(start: utils.Timestamp, end: utils.Timestamp, activity: str) -> None:
@@ -43,9 +142,8 @@ def done(start: utils.Timestamp, end: utils.Timestamp, activity: str) -> None:
     """
 
     phrase = format_elapsed_time_phrase(start, end, activity)
-    print(f"You spent ", end="")
-    print(Fore.YELLOW + Style.BRIGHT + f"({phrase})", end="")
-    print(f" on '{Fore.GREEN + activity + Style.RESET_ALL}'.")
+    print(f"You spent {paint(f'({phrase})', Fore.YELLOW, Style.BRIGHT)} "
+          f"on '{paint(activity, Fore.GREEN)}'.")
 
 
 def save(timeline_file: str) -> None:
@@ -58,6 +156,31 @@ def save(timeline_file: str) -> None:
     print(f"Saved timeline to {timeline_file}")
 
 
+def imported(count: int, import_file: str) -> None:
+    """
+    Prints the activities imported message.
+
+    Args:
+        count (int): the number of activities that were imported
+        import_file (str): the file they were imported from
+    """
+    print(f"Imported {count} {'activity' if count == 1 else 'activities'} "
+          f"from {import_file}")
+
+
+def archived(years: List[str]) -> None:
+    """
+    Prints the years archived message.
+
+    Args:
+        years (List[str]): the years that were archived
+    """
+    if not years:
+        print("There is nothing to archive.")
+    else:
+        print(f"Archived {', '.join(years)}.")
+
+
 def format_elapsed_time_phrase(
         start: utils.Timestamp,
         end: utils.Timestamp,
@@ -100,123 +223,216 @@ def format_elapsed_time_phrase(
     return " ".join(phrase)
 
 
-def print_status(current_activity: Optional[Dict[str, str]]) -> None:
+def print_status(status: Dict[str, Any]) -> None:
     """
     Prints the status of a potentially ongoing activity.
 
     Args:
-        current_activity (Optional[Dict[str, str]]):
-            A dictionary with information about the current activity. The
-            expected fields are `"start"`, `"end"`, `"name"` with types
-            `util.Timestamp` for the start/end, and `str` for the name.
-            If this is `None`, a "no ongoing activity" message is printed.
+        status (Dict[str, Any]):
+            The current activity as it is cached (see `tyme.status`). If
+            this is empty, a "no ongoing activity" message is printed.
     """
 
-    if current_activity is None:
+    if not status:
         return print("There is no ongoing activity.")
 
-    start_timestamp = utils.parse(current_activity["start"])
+    start_timestamp = utils.from_epoch(status["start"])
     end_timestamp = utils.utc_now()
 
+    name = status["name"]
+
     phrase = format_elapsed_time_phrase(start_timestamp,
                                         end_timestamp,
-                                        current_activity["name"])
+                                        name)
+
+    print(paint(" |-", Fore.BLUE) + paint(name, Fore.GREEN)
+          + paint(f" ({phrase}):", Style.BRIGHT, Fore.YELLOW) + "\n"
+          + paint(" |", Fore.BLUE) + "   start: "
+          + paint(start_timestamp.time_str, Fore.YELLOW) + "\n"
+          + paint(" |", Fore.BLUE) + "   end:   " + paint("...", Fore.YELLOW)
+          + "\n" + paint(" V", Fore.BLUE))
+
 
-    name = current_activity["name"]
+def print_formatted_status(format_string: str,
+                           status: Dict[str, Any],
+                           now: int) -> None:
+    """
+    Prints the ongoing activity with the format string `format_string`, in
+    which "{name}", "{path}", "{start}" and "{elapsed}" are replaced by its
+    name, path, start time (HH:MM:SS) and the time spent on it so far
+    (HH:MM:SS). Nothing is printed if there is no ongoing activity.
 
-    print(Fore.BLUE + f" |-", end="")
-    print(Fore.GREEN + f"{name}", end="")
-    print(Style.BRIGHT + Fore.YELLOW + f" ({phrase}):")
-    print(Fore.BLUE + f" |", end="")
-    print(f"   start: ", end="")
-    print(Fore.YELLOW + f"{start_timestamp.time_str}")
+    Args:
+        format_string (str): the format of the status
+        status (Dict[str, Any]):
+            the ongoing activity as it is cached (see `tyme.status`), empty
+            if there is none
+        now (int): the current time, in seconds since the epoch
+
+    Raises:
+        KeyError: if `format_string` contains any other field
+    """
+    if not status:
+        return
 
-    print(Fore.BLUE + " |", end="")
-    print(f"   end:   ", end="")
-    print(Fore.YELLOW + "...")
-    print(Fore.BLUE + " V")
+    print(format_string.format(
+        name=status["name"],
+        path=status["path"],
+        start=utils.from_epoch(status["start"]).time_str,
+        elapsed=format_duration(max(now - status["start"], 0))))
 
 
-def print_log(recent_activities: Dict[str, List[Dict[str, str]]]) -> None:
+def print_log(recent_activities: Iterable[Tuple[str, Entry]],
+              index: ActivityIndex) -> None:
     """
     Prints a log of the given `recent_activities`. Some sections in the log
-    that only show elapsed time represent time that was untracked.
+    that only show elapsed time represent time that was untracked. Entries
+    are printed as they are consumed from `recent_activities`.
 
     Args:
-        recent_activities (Dict[str, List[Dict[str, str]]]):
-            A dictionary with information about some recent activities. The
-            expected structure is
-                {
-                    date: [
-                        {"start": start_time,
-                         "end": end_time,
-                         "name": activity_name}
-                    ]
-                }
+        recent_activities (Iterable[Tuple[str, Entry]]):
+            Pairs of dates and entries of some recent activities, oldest
+            first.
+        index (ActivityIndex): the index of the activity hierarchy
     """
     # Show the oldest event first, so the most recent is at the bottom.
     last_end: Optional[utils.Timestamp] = None
-    for day in sorted(recent_activities):
-        print(Fore.MAGENTA + f"{day}:")
-        for activity in recent_activities[day]:
-            name = activity["name"]
-            start = utils.parse(activity["start"])
-
-            end: Optional[utils.Timestamp] = None
-            if "end" in activity:
-                end = utils.parse(activity["end"])
-
-            if end is not None:
-                phrase = format_elapsed_time_phrase(start,
-                                                    end,
-                                                    name)
-            else:
-                phrase = format_elapsed_time_phrase(start,
-                                                    utils.utc_now(),
-                                                    name)
-
-            # time passed between the end of the last event and the start
-            # of this one. Therefore, there is time unaccounted for.
-            if last_end is not None and last_end != start:
-                untracked_phrase = format_elapsed_time_phrase(last_end,
-                                                              start,
-                                                              "")
-
-                print(Fore.RED + " |")
-                print(Style.DIM + Fore.RED + " |", end="")
-                print(Fore.RED + f" ({untracked_phrase})")
-                print(Fore.RED + " |")
-
-            print(Fore.BLUE + f" |-", end="")
-            print(Fore.GREEN + f"{name}", end="")
-            print(Style.BRIGHT + Fore.YELLOW + f" ({phrase}):")
-            print(Fore.BLUE + f" |", end="")
-            print(f"   start: ", end="")
-            print(Fore.YELLOW + f"{start.time_str}")
-
-            print(Fore.BLUE + " |", end="")
-            if end is None:
-                print(Fore.YELLOW + "          ...")
-            else:
-                print(f"   end:   ", end="")
-                print(Fore.YELLOW + f"{end.time_str}")
-
-            last_end = end
-
-            print(Fore.BLUE + " V")
-
-
-def select_activity_path(activity: str, activities: JSONActivities) -> str:
+    last_day: Optional[str] = None
+    now = utils.utc_now()
+
+    # the parts of lines that are always the same
+    edge = paint(" |", Fore.BLUE)
+    arrow = paint(" V", Fore.BLUE)
+    untracked_edge = paint(" |", Fore.RED)
+    untracked_dim_edge = paint(" |", Style.DIM, Fore.RED)
+
+    chunk: List[str] = []
+    for count, (day, activity) in enumerate(recent_activities, start=1):
+        if day != last_day:
+            chunk.append(paint(f"{day}:", Fore.MAGENTA) + "\n")
+            last_day = day
+
+        name = index.name_by_id[activity.id]
+        start = utils.from_epoch(activity.start)
+
+        end: Optional[utils.Timestamp] = None
+        if activity.end is not None:
+            end = utils.from_epoch(activity.end)
+
+        phrase = format_elapsed_time_phrase(start,
+                                            now if end is None else end,
+                                            name)
+
+        # time passed between the end of the last event and the start
+        # of this one. Therefore, there is time unaccounted for.
+        if last_end is not None and last_end != start:
+            untracked_phrase = format_elapsed_time_phrase(last_end,
+                                                          start,
+                                                          "")
+
+            chunk.append(f"{untracked_edge}\n"
+                         f"{untracked_dim_edge}"
+                         f"{paint(f' ({untracked_phrase})', Fore.RED)}\n"
+                         f"{untracked_edge}\n")
+
+        if end is None:
+            end_line = paint("          ...", Fore.YELLOW)
+        else:
+            end_line = "   end:   " + paint(end.time_str, Fore.YELLOW)
+
+        chunk.append(f"{paint(' |-', Fore.BLUE)}{paint(name, Fore.GREEN)}"
+                     f"{paint(f' ({phrase}):', Style.BRIGHT, Fore.YELLOW)}\n"
+                     f"{edge}   start: {paint(start.time_str, Fore.YELLOW)}\n"
+                     f"{edge}{end_line}\n"
+                     f"{arrow}\n")
+
+        last_end = end
+
+        if count % LOG_CHUNK_SIZE == 0:
+            sys.stdout.write("".join(chunk))
+            chunk = []
+
+    sys.stdout.write("".join(chunk))
+
+
+def format_duration(seconds: int) -> str:
+    """
+    Formats a number of seconds as hours, minutes and seconds, HH:MM:SS.
+
+    Args:
+        seconds (int): the number of seconds to format
+
+    Returns:
+        str: the formatted duration
+    """
+    return f"{seconds // 3600:02}:{seconds // 60 % 60:02}:{seconds % 60:02}"
+
+
+def print_report(first_day: str,
+                 last_day: str,
+                 seconds: Dict[str, int],
+                 index: ActivityIndex) -> None:
+    """
+    Prints the time spent on each activity as a tree following the activity
+    hierarchy.
+
+    Args:
+        first_day (str): the first day of the report
+        last_day (str): the last day of the report
+        seconds (Dict[str, int]):
+            the seconds spent on each activity id, including its children
+        index (ActivityIndex): the index of the activity hierarchy
+    """
+    print_path_report(first_day,
+                      last_day,
+                      {index.path_by_id.get(activity_id, activity_id): spent
+                       for activity_id, spent in seconds.items()})
+
+
+def print_path_report(first_day: str,
+                      last_day: str,
+                      seconds: Dict[str, int],
+                      users: Optional[int] = None) -> None:
+    """
+    Prints the time spent on each activity path as a tree.
+
+    Args:
+        first_day (str): the first day of the report
+        last_day (str): the last day of the report
+        seconds (Dict[str, int]):
+            the seconds spent on each activity path, including its children
+        users (Optional[int]):
+            the number of users the report is over, if it is over several
+    """
+    days = first_day if first_day == last_day else f"{first_day} to {last_day}"
+    if users is not None:
+        days += f", {users} {'user' if users == 1 else 'users'}"
+    print(paint(f"{days}:", Fore.MAGENTA))
+
+    if not seconds:
+        return print("No time was tracked.")
+
+    lines = []
+    for path, spent in sorted(seconds.items()):
+        depth = path.count("/") - 1
+        name = path.rsplit("/", 1)[-1]
+        lines.append(paint(f" {format_duration(spent)} ", Fore.YELLOW)
+                     + "  " * depth + paint(name, Fore.GREEN) + "\n")
+
+    sys.stdout.write("".join(lines))
+
+
+def select_activity_path(activity: str, index: ActivityIndex) -> str:
     """
     Given a potentially non-absolute activity `activity`, find, the path it
-    belongs to. If the activity is not absolute, then a series of interactive
-    selections are made in order to determine the destination of the activity.
+    belongs to. If the activity is not absolute, then its parent is selected
+    interactively among the activities of the hierarchy.
 
     Args:
         activity (str): the potentially absolute activity.
-        activities (JSONActivities):
-            the hierarchy of activities to be used when navigating the tree
-            interactively
+        index (ActivityIndex):
+            the index of the hierarchy of activities to choose the parent of
+            the activity from
     """
     # absolute activity path
     if activity.startswith("/"):
@@ -225,23 +441,41 @@ def select_activity_path(activity: str, activities: JSONActivities) -> str:
     elif "/" in activity:
         raise ValueError("names of activities cannot contain '/'")
 
-    # find out the path interactively using fzf
-    print("where do you want to place the activity '{activity}'?")
-    def enumerate_activity_hierarchy_paths(tree):
-      out = []
-      for name, (id, subtree) in tree.items():
-        out.append(f"{name}/")
+    print(f"where do you want to place the activity '{activity}'?")
+    parents = ["/", *sorted(path + "/" for path in index.path_by_id.values())]
+    return pick(parents) + activity
+
+
+def select_activity(paths: List[str]) -> str:
+    """
+    Interactively selects one of several activities matching a name.
+
+    Args:
+        paths (List[str]): the absolute paths of the matching activities
+
+    Returns:
+        str: the absolute path of the selected activity
+    """
+    return pick(sorted(paths))
+
 
-      for name, (id, subtree) in tree.items():
-        for subpath in enumerate_activity_hierarchy_paths(subtree):
-          out.append(f"{name}/{subpath}")
-      return out
+def pick(choices: List[str]) -> str:
+    """
+    Lets the user pick one of `choices` using fzf.
+
+    Args:
+        choices (List[str]): the choices, in the order they are shown
+
+    Returns:
+        str: the choice that was picked
+    """
+    from tyme.cli import fzf
 
-    path = fzf.iterfzf(["/", *enumerate_activity_hierarchy_paths(activities)])
-    if path is None:
-        raise RuntimeError("no path was selected")
+    choice = fzf.iterfzf(choices)
+    if choice is None:
+        raise RuntimeError("nothing was selected")
 
-    return path + activity
+    return choice
 
 
 def new_activity(activity: str) -> None:
@@ -2,8 +2,28 @@
 Contains constants regarding the location of all `tyme` local data.
 """
 
+import os
 from pathlib import Path
 
-TYME_DIR = Path.home() / ".tyme"
+TYME_DIR = Path(os.environ.get("TYME_DIR", Path.home() / ".tyme"))
 TYME_STATE_FILE = TYME_DIR / "state.hjson"
 TYME_TIMELINES_DIR = TYME_DIR / "timelines"
+TYME_SOCKET = TYME_DIR / "tyme.sock"
+
+# the cached ongoing activity of each user, see `tyme.status`
+TYME_STATUS_DIR = TYME_DIR / "status"
+
+# the storage backend of new timelines, see `tyme.storage`
+TYME_STORAGE = os.environ.get("TYME_STORAGE", "files")
+
+# the compressions of archived years and the suffix of their files, see
+# `tyme.archive`
+COMPRESSIONS = {"gzip": ".gz", "lzma": ".xz"}
+DEFAULT_COMPRESSION = "gzip"
+
+# files within the directory of each user's timeline, TYME_TIMELINES_DIR/user
+ACTIVITIES_FILE_NAME = "activities.json"
+JOURNAL_FILE_NAME = "journal.jsonl"
+META_FILE_NAME = "meta.json"
+ARCHIVE_INDEX_FILE_NAME = "archives.json"
+DATABASE_FILE_NAME = "timeline.db"
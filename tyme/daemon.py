@@ -0,0 +1,313 @@
+"""
+An optional long-running tyme server, which keeps the timelines of every user
+it serves loaded in memory so that commands don't pay for starting Python and
+loading a timeline every time.
+
+The server listens on a Unix socket at TYME_SOCKET. A client sends a single
+JSON line with the parsed command line arguments of a command, and receives a
+single JSON line with either the "output" of that command or an "error",
+along with the matching activities if an activity name was "ambiguous". The
+cli forwards commands to the server when it is running (see `forward`), and
+otherwise accesses the timeline files directly.
+
+Commands are run in worker threads, so that a slow command, such as an
+import, doesn't hold up the commands of other users, while the commands of
+a single user are run one at a time. Commands that modify a timeline hold
+its file lock, like any other process would, until their changes have been
+saved, and only then is the client answered. Every failure is reported to
+the client, which never runs a command itself once it was sent to the
+server. A timeline is reloaded whenever its files were modified by another
+process.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import traceback
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from tyme.common import *
+from tyme.files import locked
+from tyme.timeline import AmbiguousActivityError, Timeline, TimelineError
+
+
+def forward(args: argparse.Namespace) -> Optional[str]:
+    """
+    Runs a command on the server if it is running.
+
+    Args:
+        args (argparse.Namespace): the parsed command line arguments
+
+    Returns:
+        Optional[str]:
+            the output of the command, or `None` if the server isn't running
+
+    Raises:
+        TimelineError: if the command failed on the server
+    """
+    if not hasattr(socket, "AF_UNIX") or not TYME_SOCKET.exists():
+        return None
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        try:
+            connection.connect(str(TYME_SOCKET))
+        except (ConnectionRefusedError, FileNotFoundError):
+            return None
+
+        try:
+            connection.sendall(json.dumps(vars(args)).encode() + b"\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # the server went away before reading the command
+            return None
+
+        response = b""
+        while not response.endswith(b"\n"):
+            data = connection.recv(1 << 16)
+            if not data:
+                break
+            response += data
+
+    # the command may have run, so it mustn't be run again
+    if not response.endswith(b"\n"):
+        raise TimelineError("The tyme daemon stopped before answering, the "
+                            "command may or may not have been run.")
+
+    result = json.loads(response)
+    if "ambiguous" in result:
+        raise AmbiguousActivityError(*result["ambiguous"])
+    if "error" in result:
+        raise TimelineError(result["error"])
+
+    return result["output"]
+
+
+def files_stamp(user: str) -> Tuple[int, ...]:
+    """
+    Returns a value that changes whenever the files of the timeline of user
+    `user` are modified.
+
+    Args:
+        user (str): the user whose timeline is checked
+
+    Returns:
+        Tuple[int, ...]: the modification times and sizes of its files
+    """
+    directory = TYME_TIMELINES_DIR / user
+    stamp = []
+    for path in [directory,
+                 directory / ACTIVITIES_FILE_NAME,
+                 directory / JOURNAL_FILE_NAME,
+                 directory / DATABASE_FILE_NAME]:
+        try:
+            stat = os.stat(path)
+            stamp += [stat.st_mtime_ns, stat.st_size]
+        except FileNotFoundError:
+            stamp += [0, 0]
+
+    return tuple(stamp)
+
+
+class ThreadOutput(io.TextIOBase):
+    """
+    Stands in for stdout while commands are run by several threads at once,
+    so that the output of each command is captured on its own (see
+    `capture`). Output written by other threads goes to `stdout`.
+
+    Args:
+        stdout (IO[str]): the stdout it stands in for
+    """
+
+    def __init__(self, stdout) -> None:
+        self.stdout = stdout
+        self.local = threading.local()
+
+    def _target(self):
+        buffer = getattr(self.local, "buffer", None)
+        return self.stdout if buffer is None else buffer
+
+    def write(self, text: str) -> int:
+        return self._target().write(text)
+
+    def flush(self) -> None:
+        self._target().flush()
+
+    def isatty(self) -> bool:
+        return self._target().isatty()
+
+    @contextlib.contextmanager
+    def capture(self) -> Iterator[io.StringIO]:
+        """
+        Captures the output of the current thread for the duration of the
+        block.
+
+        Returns:
+            Iterator[io.StringIO]: the captured output
+        """
+        self.local.buffer = io.StringIO()
+        try:
+            yield self.local.buffer
+        finally:
+            self.local.buffer = None
+
+
+class Server:
+    """
+    Serves tyme commands over a Unix socket.
+
+    Args:
+        socket_path (Path): the path of the socket to listen on
+    """
+
+    def __init__(self, socket_path=TYME_SOCKET) -> None:
+        import asyncio
+
+        self.socket_path = socket_path
+
+        # user -> loaded timeline and the stamp of its files when loaded
+        self.timelines: Dict[str, Tuple[Timeline, Tuple[int, ...]]] = {}
+
+        # user -> lock serializing the commands of that user
+        self.locks: Dict[str, asyncio.Lock] = {}
+
+    def timeline(self, user: str) -> Timeline:
+        """
+        Returns the timeline of user `user`, loading it if it isn't loaded or
+        its files were modified since it was.
+        """
+        stamp = files_stamp(user)
+        if user not in self.timelines or self.timelines[user][1] != stamp:
+            self.timelines[user] = (Timeline(user=user), stamp)
+
+        return self.timelines[user][0]
+
+    def execute(self,
+                user: str,
+                args: argparse.Namespace,
+                output: ThreadOutput) -> str:
+        """
+        Runs a command for user `user`, and saves its changes if it modifies
+        the timeline. This blocks, and is run in a worker thread.
+
+        Returns:
+            str: the output of the command
+        """
+        from tyme.cli.cli import MUTATING_COMMANDS, run_command
+
+        mutating = args.command in MUTATING_COMMANDS
+
+        with contextlib.ExitStack() as stack:
+            if mutating:
+                stack.enter_context(locked(Timeline.lock_path(user)))
+
+            try:
+                timeline = self.timeline(user)
+                with output.capture() as captured:
+                    run_command(timeline, args)
+
+                if mutating:
+                    timeline.save()
+                    self.timelines[user] = (timeline, files_stamp(user))
+
+            except BaseException:
+                # the timeline may have been left partially modified
+                if mutating:
+                    self.timelines.pop(user, None)
+                raise
+
+        return captured.getvalue()
+
+    async def run(self, args: argparse.Namespace) -> str:
+        """
+        Runs a command for its user in a worker thread, once the commands
+        of that user that came before it are done, and returns its output.
+        """
+        import asyncio
+
+        user = args.user or Timeline.default_user()
+        Timeline.check_exists(user)
+
+        # installed before any command runs, and left for the next ones
+        if not isinstance(sys.stdout, ThreadOutput):
+            sys.stdout = ThreadOutput(sys.stdout)
+
+        lock = self.locks.setdefault(user, asyncio.Lock())
+        async with lock:
+            return await asyncio.get_event_loop().run_in_executor(
+                None, self.execute, user, args, sys.stdout)
+
+    async def handle(self, reader, writer) -> None:
+        """
+        Answers a single request from a client.
+        """
+        try:
+            line = await reader.readline()
+
+            # connections that only check whether the server is running
+            if not line:
+                return
+
+            try:
+                request: Dict[str, Any] = json.loads(line)
+                response = {"output": await self.run(
+                    argparse.Namespace(**request))}
+            except AmbiguousActivityError as e:
+                # lets the client pick one of the activities
+                response = {"error": str(e),
+                            "ambiguous": [e.activity, e.paths]}
+            except (TimelineError, ValueError) as e:
+                response = {"error": str(e)}
+            except Exception as e:
+                # the client mustn't take the lack of an answer as the server
+                # not running, and run the command again
+                traceback.print_exc()
+                response = {"error": "The tyme daemon failed to run the "
+                                     f"command: {type(e).__name__}: {e}"}
+
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+        finally:
+            writer.close()
+
+    def serve(self) -> None:
+        """
+        Serves requests until interrupted.
+        """
+        import asyncio
+
+        if hasattr(socket, "AF_UNIX") and self.socket_path.exists():
+            with socket.socket(socket.AF_UNIX) as connection:
+                try:
+                    connection.connect(str(self.socket_path))
+                except ConnectionRefusedError:
+                    # left behind by a server that is no longer running
+                    os.remove(self.socket_path)
+                else:
+                    raise TimelineError("The tyme daemon is already running.")
+
+        loop = asyncio.new_event_loop()
+        server = loop.run_until_complete(
+            asyncio.start_unix_server(self.handle, path=str(self.socket_path)))
+
+        for signal_number in [signal.SIGINT, signal.SIGTERM]:
+            loop.add_signal_handler(signal_number, loop.stop)
+
+        try:
+            loop.run_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            loop.run_until_complete(server.wait_closed())
+            # commands still running finish saving their changes
+            if hasattr(loop, "shutdown_default_executor"):
+                loop.run_until_complete(loop.shutdown_default_executor())
+            loop.close()
+
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.socket_path)
@@ -0,0 +1,101 @@
+"""
+The in-memory representation of the entries of a timeline. On disk, entries
+are JSON objects whose times are "%Y-%m-%d_%H:%M:%S" strings. In memory they
+are `Entry` objects, whose times are seconds since the epoch, so that they
+can be compared and subtracted without being parsed, and whose activity ids
+are interned, so that the many entries of an activity share them. Entries
+only refer to their activity by its id, and its name and path are found in
+the activity hierarchy (see `tyme.activities`). Entries are converted from
+and to their JSON form only when they are read from or written to disk.
+"""
+
+import sys
+from typing import Dict, List, Optional
+
+import tyme.utils as utils
+
+JSONEntry = Dict[str, str]
+
+
+class Entry:
+    """
+    An occurence of an activity in a timeline.
+
+    Attributes:
+        id (str): the id of the activity
+        start (int): when the activity was started, in seconds since the epoch
+        end (Optional[int]):
+            when the activity was completed, in seconds since the epoch, or
+            `None` if it is ongoing
+    """
+
+    __slots__ = ("id", "start", "end")
+
+    def __init__(self,
+                 id: str,
+                 start: int,
+                 end: Optional[int] = None) -> None:
+        self.id = sys.intern(id)
+        self.start = start
+        self.end = end
+
+    @classmethod
+    def from_json(cls, entry: JSONEntry) -> "Entry":
+        """
+        Converts an entry from the form it is stored in. The name stored
+        along with entries by older versions of tyme is ignored.
+
+        Args:
+            entry (JSONEntry): the stored entry
+
+        Returns:
+            Entry: the entry
+        """
+        return cls(entry["id"],
+                   utils.parse_epoch(entry["start"]),
+                   utils.parse_epoch(entry["end"]) if "end" in entry else None)
+
+    @classmethod
+    def from_json_many(cls, entries: List[JSONEntry]) -> List["Entry"]:
+        """
+        Converts many entries from the form they are stored in, parsing all
+        of their times at once (see `utils.parse_many`).
+
+        Args:
+            entries (List[JSONEntry]): the stored entries
+
+        Returns:
+            List[Entry]: the entries
+        """
+        starts = utils.parse_many(entry["start"] for entry in entries)
+        ends = iter(utils.parse_many(entry["end"] for entry in entries
+                                     if "end" in entry))
+
+        return [cls(entry["id"],
+                    start,
+                    next(ends) if "end" in entry else None)
+                for entry, start in zip(entries, starts)]
+
+    def to_json(self) -> JSONEntry:
+        """
+        Converts this entry to the form it is stored in.
+
+        Returns:
+            JSONEntry: the stored entry
+        """
+        entry = {
+            "id": self.id,
+            "start": utils.format_epoch(self.start),
+        }
+        if self.end is not None:
+            entry["end"] = utils.format_epoch(self.end)
+
+        return entry
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Entry) and all(
+            getattr(self, field) == getattr(other, field)
+            for field in Entry.__slots__)
+
+    def __repr__(self) -> str:
+        return f"Entry({self.to_json()})"
@@ -0,0 +1,7 @@
+"""
+Errors shown to the user by the cli, rather than as a traceback.
+"""
+
+
+class TimelineError(Exception):
+    pass
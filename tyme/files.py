@@ -0,0 +1,123 @@
+"""
+Helpers for safely writing to files that may be read or written by several
+tyme processes at once.
+
+Writers serialize with each other through an advisory lock on a separate
+lock file. Files are never modified in place: they are written to a
+temporary file in the same directory which is then renamed over the
+original, so readers, which never take the lock, see either the old or the
+new contents but never a partial write. Temporary files are given the
+permissions of the file they replace, or those of a newly created file, so
+that timelines shared with other users stay readable by them.
+"""
+
+import contextlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover, not available on windows
+    fcntl = None  # type: ignore
+
+# lock files held by each thread of this process, and how many times each
+# was acquired. Kept per thread, so that another thread of the process, e.g.
+# in the tyme daemon, waits for the lock rather than sharing it
+_local = threading.local()
+
+
+def _read_umask() -> int:
+    """
+    Returns the umask of this process, which can only be read by setting it.
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# read once, as setting it while other threads create files would race them
+_UMASK = _read_umask()
+
+
+def _mode_of(path: Path) -> int:
+    """
+    Returns the permissions `path` has, or would have if it was created.
+    """
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+@contextlib.contextmanager
+def atomic_write(path: Path, binary: bool = False) -> Iterator[IO[Any]]:
+    """
+    Opens a temporary file to write the new contents of `path` to. When the
+    block exits successfully, the temporary file replaces `path`. If it
+    raises, `path` is left untouched.
+
+    Args:
+        path (Path): the file to be written
+        binary (bool): whether the file is opened in binary mode
+
+    Returns:
+        Iterator[IO[Any]]: the temporary file to write to
+    """
+    descriptor, temporary_path = tempfile.mkstemp(dir=path.parent,
+                                                  prefix=f".{path.name}.",
+                                                  suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb" if binary else "w") as temporary:
+            # created readable by its owner only
+            os.chmod(temporary_path, _mode_of(path))
+
+            yield temporary
+            temporary.flush()
+            os.fsync(temporary.fileno())
+
+        os.replace(temporary_path, path)
+
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+
+@contextlib.contextmanager
+def locked(path: Path) -> Iterator[None]:
+    """
+    Holds an exclusive advisory lock on the lock file `path` for the duration
+    of the block, waiting for any other process, or thread, holding it to
+    release it first. The lock can be acquired again by the thread already holding it.
+    The lock file is created if it doesn't exist.
+
+    Args:
+        path (Path): the lock file
+    """
+    if not hasattr(_local, "held"):
+        _local.held = {}
+    held: Dict[Path, int] = _local.held
+
+    if path in held:
+        held[path] += 1
+        try:
+            yield
+        finally:
+            held[path] -= 1
+        return
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path, "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+
+        held[path] = 1
+        try:
+            yield
+        finally:
+            del held[path]
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
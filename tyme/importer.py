@@ -0,0 +1,272 @@
+"""
+Bulk import of past activities, such as those exported from other time
+trackers. Records of (activity path, start, end) are streamed from a CSV or
+JSON Lines file and added to a timeline in batches, creating any activities
+that don't exist yet.
+
+Records must be ordered by start time and must not overlap each other or the
+activities already in the timeline. Each batch is validated before any of it
+is added. Since records are ordered, the months before the current batch are
+never modified again, so their shards are staged (see
+`TimelineShards.stage`) and dropped from memory as the import goes, and the
+whole import is committed at once by compacting the timeline at the end.
+"""
+
+import csv
+import itertools
+import json
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import tyme.utils as utils
+from tyme.shards import month_of
+from tyme.timeline import Timeline, TimelineError
+
+# line number, activity path, start and end of an imported activity
+ImportRecord = Tuple[int, str, utils.Timestamp, utils.Timestamp]
+
+# number of records validated and added at a time
+IMPORT_BATCH_SIZE = 10000
+
+# the fields every record must have
+FIELDS = ["activity", "start", "end"]
+
+
+def parse_time(line: int, value: str) -> utils.Timestamp:
+    """
+    Parses the time `value` of a record into a UTC timestamp, to the second.
+    Times with a UTC offset are converted to UTC, others are assumed to
+    already be in UTC.
+
+    Args:
+        line (int): the line the record is on, for error messages
+        value (str): the time to be parsed
+
+    Returns:
+        utils.Timestamp: the parsed time
+    """
+    try:
+        timestamp = utils.parse_moment(value)
+    except ValueError:
+        raise TimelineError(f"Line {line}: invalid time '{value}'.")
+
+    moment = timestamp.datetime
+    if moment.microsecond == 0:
+        return timestamp
+
+    return utils.Timestamp(moment.replace(microsecond=0))
+
+
+def to_record(line: int, fields: Dict[str, Optional[str]]) -> ImportRecord:
+    """
+    Converts the fields read from a line of an import file into a record.
+
+    Args:
+        line (int): the line the fields were read from
+        fields (Dict[str, Optional[str]]): the fields of the record
+
+    Returns:
+        ImportRecord: the record
+    """
+    for field in FIELDS:
+        if not fields.get(field):
+            raise TimelineError(f"Line {line}: missing '{field}'.")
+
+    return (line,
+            str(fields["activity"]),
+            parse_time(line, str(fields["start"])),
+            parse_time(line, str(fields["end"])))
+
+
+def read_csv(path: Path) -> Iterator[ImportRecord]:
+    """
+    Yields the records of a CSV file with a header naming the columns
+    "activity", "start" and "end". Other columns are ignored.
+
+    Args:
+        path (Path): the file to be read
+
+    Returns:
+        Iterator[ImportRecord]: the records of the file
+    """
+    with open(path, newline="") as records:
+        reader = csv.DictReader(records)
+        for fields in reader:
+            yield to_record(reader.line_num, fields)
+
+
+def read_jsonl(path: Path) -> Iterator[ImportRecord]:
+    """
+    Yields the records of a JSON Lines file, whose lines are objects with
+    "activity", "start" and "end" fields. Other fields are ignored.
+
+    Args:
+        path (Path): the file to be read
+
+    Returns:
+        Iterator[ImportRecord]: the records of the file
+    """
+    with open(path) as records:
+        for line, text in enumerate(records, start=1):
+            if not text.strip():
+                continue
+
+            try:
+                fields = json.loads(text)
+            except ValueError:
+                raise TimelineError(f"Line {line}: invalid JSON.")
+
+            if not isinstance(fields, dict):
+                raise TimelineError(f"Line {line}: expected an object.")
+
+            yield to_record(line, fields)
+
+
+def read_records(path: Path,
+                 format: Optional[str] = None) -> Iterator[ImportRecord]:
+    """
+    Yields the records of the file at `path`, which is read as it is
+    consumed.
+
+    Args:
+        path (Path): the file to be read
+        format (Optional[str]):
+            either "csv" or "jsonl". Defaults to the extension of `path`.
+
+    Returns:
+        Iterator[ImportRecord]: the records of the file
+    """
+    readers = {"csv": read_csv, "jsonl": read_jsonl}
+
+    format = format or path.suffix[1:].lower()
+    if format not in readers:
+        raise TimelineError(f"Unknown import format '{format}', use one of: "
+                            + ", ".join(readers))
+
+    return readers[format](path)
+
+
+def validate(timeline: Timeline,
+             batch: List[ImportRecord],
+             previous_end: int) -> int:
+    """
+    Checks that the records of `batch` can be added to `timeline`.
+
+    Args:
+        timeline (Timeline): the timeline the records are imported into
+        batch (List[ImportRecord]): the records to be checked
+        previous_end (int):
+            the end of the record before this batch, in seconds since the
+            epoch
+
+    Returns:
+        int: the end of the last record of this batch
+
+    Raises:
+        TimelineError: if a record can't be imported
+    """
+    # archived years can't be modified
+    archived_until = max(timeline.timeline.archives, default="")
+
+    # the ongoing activity is looked up on the last day of the timeline, so
+    # activities can't be imported after it
+    now = utils.epoch(utils.utc_now())
+
+    for line, activity, start, end in batch:
+        if not activity.startswith("/") or "" in activity.split("/")[1:]:
+            raise TimelineError(
+                f"Line {line}: '{activity}' is not an absolute activity "
+                "path.")
+
+        start_epoch, end_epoch = utils.epoch(start), utils.epoch(end)
+        if end_epoch <= start_epoch:
+            raise TimelineError(f"Line {line}: the activity ends before it "
+                                "starts.")
+
+        if end_epoch > now:
+            raise TimelineError(f"Line {line}: the activity ends after the "
+                                "current time.")
+
+        if start.date_str[:4] <= archived_until:
+            raise TimelineError(f"Line {line}: the activity starts before "
+                                f"the end of {archived_until}, which is "
+                                "archived.")
+
+        if start_epoch < previous_end:
+            raise TimelineError(f"Line {line}: the activity starts before "
+                                "the previous one ends. Records must be "
+                                "ordered by start time and must not overlap.")
+
+        for _, entry in timeline.entries_between(start_epoch, end_epoch):
+            if entry.end is None:
+                raise TimelineError(f"Line {line}: the activity overlaps "
+                                    "the ongoing activity.")
+
+            raise TimelineError(
+                f"Line {line}: the activity overlaps "
+                f"'{timeline.index.name_by_id[entry.id]}' "
+                f"from {utils.format_epoch(entry.start)} to "
+                f"{utils.format_epoch(entry.end)}.")
+
+        previous_end = end_epoch
+
+    return previous_end
+
+
+def import_records(timeline: Timeline,
+                   records: Iterable[ImportRecord],
+                   batch_size: int = IMPORT_BATCH_SIZE) -> int:
+    """
+    Adds the activities of `records` to `timeline`, and saves it. Nothing is
+    saved if a record can't be imported. The caller must hold the timeline's
+    lock.
+
+    Args:
+        timeline (Timeline): the timeline to import into
+        records (Iterable[ImportRecord]):
+            the records to import, ordered by start time
+        batch_size (int): the number of records validated at a time
+
+    Returns:
+        int: the number of activities imported
+
+    Raises:
+        TimelineError: if a record can't be imported
+    """
+    # imported activities shift the positions that journal events refer to
+    timeline.compact()
+
+    shards = timeline.timeline
+    shards.discard_staged()
+
+    count = 0
+    previous_end = 0
+    records = iter(records)
+    try:
+        while True:
+            batch = list(itertools.islice(records, batch_size))
+            if not batch:
+                break
+
+            previous_end = validate(timeline, batch, previous_end)
+
+            for _, activity, start, end in batch:
+                if activity not in timeline.index.id_by_path:
+                    timeline.new_activity(activity, parents=True)
+
+                timeline.add_entry(timeline.index.id_by_path[activity],
+                                   start,
+                                   end)
+
+            count += len(batch)
+
+            # later records all start after this batch ends
+            shards.stage(
+                before=month_of(utils.format_epoch(previous_end)))
+
+    except BaseException:
+        shards.discard_staged()
+        raise
+
+    timeline.compact()
+    return count
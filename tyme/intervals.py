@@ -0,0 +1,167 @@
+"""
+An index over the time intervals covered by the entries of a timeline, used
+to answer point-in-time and range queries without parsing every entry.
+
+Entries are kept sorted by start time in parallel arrays of start and end
+times, alongside a running maximum of the end times. Since the running
+maximum never decreases, both arrays can be searched with bisect: the
+entries overlapping a range are those after the first running maximum past
+the start of the range and before the first start past its end.
+"""
+
+import bisect
+from array import array
+from typing import Iterator, List, Tuple
+
+from tyme.entry import Entry
+
+# the end of an ongoing activity
+OPEN = 2 ** 63 - 1
+
+# a timeline entry along with the day it is stored under
+EntryRef = Tuple[str, Entry]
+
+
+class IntervalIndex:
+    """
+    Sorted start/end times of timeline entries, in seconds since the epoch.
+
+    Attributes:
+        starts (array): the start of each entry
+        ends (array): the end of each entry, `OPEN` if it is ongoing
+        max_ends (array): the latest end among each entry and those before it
+        entries (List[EntryRef]): the entry corresponding to each interval
+    """
+
+    def __init__(self) -> None:
+        self.starts = array("q")
+        self.ends = array("q")
+        self.max_ends = array("q")
+        self.entries: List[EntryRef] = []
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def add(self, start: int, end: int, entry: EntryRef) -> None:
+        """
+        Adds an interval to the index.
+
+        Args:
+            start (int): the start of the interval
+            end (int): the end of the interval, `OPEN` if it is ongoing
+            entry (EntryRef): the entry covering this interval
+        """
+        index = bisect.bisect_right(self.starts, start)
+
+        self.starts.insert(index, start)
+        self.ends.insert(index, end)
+        self.entries.insert(index, entry)
+        self.max_ends.insert(index, 0)
+        self._update_max_ends(index)
+
+    def close(self, start: int, end: int) -> None:
+        """
+        Sets the end of the last ongoing interval that started at `start`.
+
+        Args:
+            start (int): the start of the interval to close
+            end (int): the new end of the interval
+
+        Raises:
+            ValueError: if no ongoing interval started at or before `start`
+        """
+        index = bisect.bisect_right(self.starts, start) - 1
+        while index >= 0 and self.ends[index] != OPEN:
+            index -= 1
+
+        if index < 0:
+            raise ValueError(f"no ongoing interval started at or before "
+                             f"{start}")
+
+        self.ends[index] = end
+        self._update_max_ends(index)
+
+    def _update_max_ends(self, index: int) -> None:
+        """
+        Recomputes the running maximum of the end times from `index` onwards.
+        """
+        max_end = self.max_ends[index - 1] if index > 0 else 0
+        for i in range(index, len(self.ends)):
+            max_end = max(max_end, self.ends[i])
+            self.max_ends[i] = max_end
+
+    def _overlapping(self, start: int, end: int) -> Iterator[int]:
+        """
+        Yields the indices of the intervals overlapping [start, end).
+        """
+        first = bisect.bisect_right(self.max_ends, start)
+        last = bisect.bisect_left(self.starts, end)
+        for i in range(first, last):
+            if self.ends[i] > start:
+                yield i
+
+    def between(self, start: int, end: int) -> List[EntryRef]:
+        """
+        Returns the entries overlapping [start, end), ordered by start time.
+
+        Args:
+            start (int): the start of the range
+            end (int): the end of the range
+
+        Returns:
+            List[EntryRef]: the entries overlapping the range
+        """
+        return [self.entries[i] for i in self._overlapping(start, end)]
+
+    def at(self, moment: int) -> List[EntryRef]:
+        """
+        Returns the entries that were ongoing at `moment`.
+
+        Args:
+            moment (int): the moment to look up
+
+        Returns:
+            List[EntryRef]: the entries ongoing at `moment`
+        """
+        return self.between(moment, moment + 1)
+
+    def overlaps(self) -> List[Tuple[EntryRef, EntryRef]]:
+        """
+        Returns every pair of entries where the second starts before the
+        first one ends.
+
+        Returns:
+            List[Tuple[EntryRef, EntryRef]]: the overlapping entries
+        """
+        pairs = []
+        for i in range(1, len(self.starts)):
+            if self.starts[i] < self.max_ends[i - 1]:
+                for j in self._overlapping(self.starts[i], self.starts[i] + 1):
+                    if j < i:
+                        pairs.append((self.entries[j], self.entries[i]))
+
+        return pairs
+
+    def gaps(self, start: int, end: int) -> List[Tuple[int, int]]:
+        """
+        Returns the untracked intervals within [start, end), i.e. those not
+        covered by any entry.
+
+        Args:
+            start (int): the start of the range
+            end (int): the end of the range
+
+        Returns:
+            List[Tuple[int, int]]: the start and end of every gap
+        """
+        gaps = []
+        covered_until = start
+        for i in self._overlapping(start, end):
+            if self.starts[i] > covered_until:
+                gaps.append((covered_until, self.starts[i]))
+            covered_until = max(covered_until, self.ends[i])
+
+        if covered_until < end:
+            gaps.append((covered_until, end))
+
+        return gaps
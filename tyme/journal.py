@@ -0,0 +1,72 @@
+"""
+Append-only event log for timelines. Instead of rewriting the whole timeline
+on every change, mutations (starting/finishing activities, creating new
+ones) are appended to a journal as one JSON object per line. The timeline
+snapshot is only rewritten when the journal is compacted.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+
+JournalEvent = Dict[str, str]
+
+
+class Journal:
+    """
+    A per-user log of timeline events.
+
+    Args:
+        path (Path): the location of the journal file
+
+    Attributes:
+        path (Path): the location of the journal file
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def read(self) -> List[JournalEvent]:
+        """
+        Returns every event in the journal, oldest first. A trailing line
+        that was only partially written is ignored.
+
+        Returns:
+            List[JournalEvent]: the events recorded in this journal
+        """
+        try:
+            with open(self.path) as journal:
+                lines = journal.read().split("\n")
+        except FileNotFoundError:
+            return []
+
+        # the last element is either "" or an incomplete record
+        return [json.loads(line) for line in lines[:-1] if line]
+
+    def append(self, events: Iterable[JournalEvent]) -> None:
+        """
+        Appends `events` to the end of the journal in a single write.
+
+        Args:
+            events (Iterable[JournalEvent]): the events to be recorded
+        """
+        data = "".join(json.dumps(event, separators=(",", ":")) + "\n"
+                       for event in events)
+        if not data:
+            return
+
+        with open(self.path, "a") as journal:
+            journal.write(data)
+            journal.flush()
+            os.fsync(journal.fileno())
+
+    def clear(self) -> None:
+        """
+        Removes every event from the journal.
+        """
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,124 @@
+"""
+Resolution of partial activity names, such as `tyme start cook` for an
+activity named "cooking", without searching the hierarchy or spawning fzf.
+
+Names and absolute paths are kept sorted, so that the activities starting
+with a prefix are found by bisection. Queries that aren't a prefix of any
+name are looked up in an index of the trigrams (substrings of three
+characters) of every name, which narrows the candidates down to the few
+activities containing every trigram of the query. Matching is case
+insensitive.
+"""
+
+import bisect
+from typing import Dict, Iterable, List, Set, Tuple
+
+from tyme.activities import ActivityIndex
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Returns the substrings of three characters of `text`.
+
+    Args:
+        text (str): the text to be split
+
+    Returns:
+        Set[str]: the trigrams of `text`
+    """
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class ActivityMatcher:
+    """
+    Finds the activities whose name or path matches a partial name. The
+    matcher must be kept up to date with `add` whenever an activity is
+    created.
+
+    Args:
+        index (ActivityIndex): the index of the activity hierarchy
+    """
+
+    def __init__(self, index: ActivityIndex) -> None:
+        self.index = index
+
+        # (lowercase name, id) and (lowercase path, id) pairs, in order
+        self._names: List[Tuple[str, str]] = sorted(
+            (name.lower(), activity_id)
+            for activity_id, name in index.name_by_id.items())
+        self._paths: List[Tuple[str, str]] = sorted(
+            (path.lower(), activity_id)
+            for activity_id, path in index.path_by_id.items())
+
+        # trigram -> the ids of the activities whose name contains it
+        self._trigrams: Dict[str, Set[str]] = {}
+        for name, activity_id in self._names:
+            self._add_trigrams(name, activity_id)
+
+    def _add_trigrams(self, name: str, activity_id: str) -> None:
+        for trigram in trigrams(name):
+            self._trigrams.setdefault(trigram, set()).add(activity_id)
+
+    def add(self, activity_id: str) -> None:
+        """
+        Adds an activity, which must already be in the index, to the matcher.
+
+        Args:
+            activity_id (str): the id of the activity
+        """
+        name = self.index.name_by_id[activity_id].lower()
+        bisect.insort(self._names, (name, activity_id))
+        bisect.insort(self._paths,
+                      (self.index.path_by_id[activity_id].lower(),
+                       activity_id))
+        self._add_trigrams(name, activity_id)
+
+    @staticmethod
+    def _starting_with(keys: List[Tuple[str, str]],
+                       prefix: str) -> Iterable[str]:
+        """
+        Yields the ids of the pairs of `keys` whose key starts with `prefix`.
+        """
+        index = bisect.bisect_left(keys, (prefix, ""))
+        while index < len(keys) and keys[index][0].startswith(prefix):
+            yield keys[index][1]
+            index += 1
+
+    def match(self, query: str) -> List[str]:
+        """
+        Returns the ids of the activities matching `query`. An absolute path
+        matches the activities whose path starts with it. Otherwise, the
+        activities whose name starts with `query` match, or if there are
+        none, those whose name contains it.
+
+        Args:
+            query (str): a partial name or absolute path
+
+        Returns:
+            List[str]: the ids of the matching activities, ordered by path
+        """
+        query = query.lower()
+
+        if query.startswith("/"):
+            ids = set(self._starting_with(self._paths, query))
+        else:
+            ids = set(self._starting_with(self._names, query))
+
+            if not ids and len(query) >= 3:
+                candidates = None
+                for trigram in trigrams(query):
+                    posting = self._trigrams.get(trigram, set())
+                    candidates = (posting if candidates is None
+                                  else candidates & posting)
+                    if not candidates:
+                        break
+
+                ids = {activity_id for activity_id in candidates or ()
+                       if query in self.index.name_by_id[activity_id].lower()}
+
+            elif not ids:
+                # too short to have trigrams, and there are few such queries
+                ids = {activity_id for name, activity_id in self._names
+                       if query in name}
+
+        return sorted(ids, key=self.index.path_by_id.__getitem__)
@@ -0,0 +1,53 @@
+"""
+Storage of the metadata of a user's timeline, in meta.json alongside its
+activities and shards:
+
+    version: the version of the storage layout (see `tyme.migrate`)
+    longest: the duration of the longest completed entry, in seconds
+    rollups: whether the roll-ups (see `tyme.rollups`) match the snapshot
+
+Since every entry is stored once, under the day it was started on, the
+entries overlapping a range of days are found among those started at most
+`longest` seconds before the range.
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict
+
+from tyme.common import META_FILE_NAME
+from tyme.files import atomic_write
+
+# the version of the storage layout written by this version of tyme
+FORMAT_VERSION = 3
+
+JSONMeta = Dict[str, Any]
+
+
+def read_meta(directory: Path) -> JSONMeta:
+    """
+    Reads the metadata of the timeline stored in `directory`.
+
+    Args:
+        directory (Path): the directory of a user's timeline
+
+    Returns:
+        JSONMeta: the metadata, empty if it has none
+    """
+    try:
+        with open(directory / META_FILE_NAME) as meta:
+            return json.load(meta)
+    except FileNotFoundError:
+        return {}
+
+
+def write_meta(directory: Path, meta: JSONMeta) -> None:
+    """
+    Writes the metadata `meta` of the timeline stored in `directory`.
+
+    Args:
+        directory (Path): the directory of a user's timeline
+        meta (JSONMeta): the metadata
+    """
+    with atomic_write(directory / META_FILE_NAME) as meta_file:
+        json.dump(meta, meta_file, separators=(",", ":"))
@@ -0,0 +1,354 @@
+"""
+Conversions from the storage layouts used by older versions of tyme. These
+are run automatically when a timeline is loaded.
+
+Older layouts were written with hjson, which is only imported here.
+
+The versions of the layout are:
+
+    0: a single user.hjson file, or hjson shards
+    1: JSON Lines shards, where an entry spanning several days is also linked
+       from each of the days after the one it started on
+    2: entries are only stored under the day they started on, and meta.json
+       records the layout version (see `tyme.meta`)
+    3: activities are identified by short ids rather than uuid4s, and
+       entries no longer store the names of their activities
+
+Once a timeline is migrated, its roll-ups (see `tyme.rollups`) are built if
+they weren't, so that reports don't rebuild them from every shard until the
+timeline is next compacted.
+"""
+
+import contextlib
+import itertools
+import json
+import os
+from pathlib import Path
+from typing import Dict, Sequence
+
+import tyme.utils as utils
+from tyme.activities import (ActivityIndex, JSONActivities, read_activities,
+                             write_activities)
+from tyme.archive import (read_archive, read_index, write_archive,
+                          write_index)
+from tyme.common import *
+from tyme.entry import Entry, JSONEntry
+from tyme.files import atomic_write
+from tyme.journal import Journal
+from tyme.meta import FORMAT_VERSION, read_meta, write_meta
+from tyme.rollups import ROLLUPS_DIR_NAME, Rollups
+from tyme.shards import TimelineShards, is_shard
+from tyme.status import status_path
+
+
+def layout_version(directory: Path) -> int:
+    """
+    Returns the version of the layout the timeline in `directory` is stored
+    in.
+
+    Args:
+        directory (Path): the directory of a user's timeline
+
+    Returns:
+        int: the layout version
+    """
+    if not (directory / ACTIVITIES_FILE_NAME).exists():
+        return 0
+
+    return read_meta(directory).get("version", 1)
+
+
+def needs_migration(user: str) -> bool:
+    """
+    Returns whether the timeline of user `user` is stored in an older layout.
+
+    Args:
+        user (str): the user whose timeline is checked
+
+    Returns:
+        bool: whether `migrate` needs to be called
+    """
+    return layout_version(TYME_TIMELINES_DIR / user) < FORMAT_VERSION
+
+
+def migrate(user: str) -> None:
+    """
+    Converts the timeline of user `user` to the current storage layout, if
+    it is stored in an older one. The caller must hold the timeline's lock.
+
+    Args:
+        user (str): the user whose timeline is being migrated
+    """
+    directory = TYME_TIMELINES_DIR / user
+    if not directory.is_dir():
+        migrate_single_file(user)
+
+    elif not (directory / ACTIVITIES_FILE_NAME).exists():
+        migrate_hjson_shards(directory)
+
+    if layout_version(directory) < 2:
+        collapse_links(directory)
+
+    if layout_version(directory) < 3:
+        shorten_ids(directory)
+
+    if not read_meta(directory).get("rollups", False):
+        build_rollups(directory)
+
+
+def migrate_single_file(user: str) -> None:
+    """
+    Splits a timeline stored as a single TYME_TIMELINES_DIR/user.hjson file
+    into a directory of month shards. The original file is kept with a
+    .migrated suffix.
+
+    Args:
+        user (str): the user whose timeline is being migrated
+    """
+    import hjson
+
+    directory = TYME_TIMELINES_DIR / user
+    old_timeline_path = (TYME_TIMELINES_DIR / user).with_suffix(".hjson")
+    with open(old_timeline_path) as timeline_file:
+        user_state = hjson.load(timeline_file)
+
+    TimelineShards(directory, days=user_state["timeline"]).save()
+    write_activities(directory, user_state["activities"])
+
+    # events recorded before the timeline was split into shards are replayed
+    # on load like any others
+    old_journal_path = old_timeline_path.with_suffix(".journal")
+    if old_journal_path.exists():
+        os.rename(old_journal_path, directory / JOURNAL_FILE_NAME)
+
+    os.rename(old_timeline_path,
+              old_timeline_path.with_suffix(".hjson.migrated"))
+
+
+def migrate_hjson_shards(directory: Path) -> None:
+    """
+    Converts a directory of .hjson month shards and activities.hjson to
+    their JSON equivalents. The original files are kept with a .migrated
+    suffix.
+
+    Args:
+        directory (Path): the directory of a user's timeline
+    """
+    import hjson
+
+    old_shards = [path for path in directory.iterdir()
+                  if is_shard(path, suffix=".hjson")]
+
+    days = {}
+    for path in old_shards:
+        with open(path) as shard:
+            days.update(hjson.load(shard))
+
+    TimelineShards(directory, days=days).save()
+
+    old_activities_path = directory / "activities.hjson"
+    with open(old_activities_path) as activities:
+        write_activities(directory, hjson.load(activities))
+
+    for path in [*old_shards, old_activities_path]:
+        os.rename(path, path.with_suffix(".hjson.migrated"))
+
+
+def collapse_links(directory: Path) -> None:
+    """
+    Removes the links to entries spanning several days from the days after
+    the one they started on, and records the duration of the longest entry
+    in the timeline's metadata.
+
+    Args:
+        directory (Path): the directory of a user's timeline
+    """
+    longest = 0
+    for path in sorted(directory.iterdir()):
+        if not is_shard(path):
+            continue
+
+        with open(path) as shard:
+            lines = [line for line in shard if line.strip()]
+
+        entries = [json.loads(line) for line in lines]
+        kept = [line for line, entry in zip(lines, entries)
+                if "previous" not in entry]
+
+        for entry in entries:
+            if "end" in entry and "previous" not in entry:
+                longest = max(longest,
+                              utils.parse_epoch(entry["end"])
+                              - utils.parse_epoch(entry["start"]))
+
+        if not kept:
+            os.remove(path)
+        elif len(kept) != len(lines):
+            with atomic_write(path) as shard:
+                shard.writelines(kept)
+
+    write_meta(directory, {"version": 2, "longest": longest})
+
+
+def short_ids(activity_ids: Sequence[str],
+              created: Sequence[str] = ()) -> Dict[str, str]:
+    """
+    Returns the short id (see `tyme.activities`) replacing each of the ids
+    `activity_ids` of the activities of a hierarchy, parents first, and
+    `created` of activities created since, that isn't one already. They are
+    numbered in that order, after the largest short id in the hierarchy, so
+    that an interrupted migration assigns the same ids when run again.
+
+    Args:
+        activity_ids (Sequence[str]): the ids of the activities, parents first
+        created (Sequence[str]): the ids of activities created since
+
+    Returns:
+        Dict[str, str]: the short id replacing each id
+    """
+    next_id = max((int(activity_id) for activity_id in activity_ids
+                   if activity_id.isdigit()), default=0) + 1
+
+    ids: Dict[str, str] = {}
+    for activity_id in itertools.chain(activity_ids, created):
+        if not activity_id.isdigit() and activity_id not in ids:
+            ids[activity_id] = str(next_id)
+            next_id += 1
+
+    return ids
+
+
+def shorten_rollup_ids(directory: Path, ids: Dict[str, str]) -> None:
+    """
+    Replaces the ids of activities in the roll-ups (see `tyme.rollups`) of
+    the timeline stored in `directory` with their short ids `ids`.
+
+    Args:
+        directory (Path): the directory of a user's timeline
+        ids (Dict[str, str]): the short id replacing each id
+    """
+    rollups_directory = directory / ROLLUPS_DIR_NAME
+    if not rollups_directory.is_dir():
+        return
+
+    for path in sorted(rollups_directory.iterdir()):
+        with open(path) as year_file:
+            rollups = json.load(year_file)
+
+        for periods in rollups.values():
+            for period, seconds in periods.items():
+                periods[period] = {ids.get(activity_id, activity_id): spent
+                                   for activity_id, spent in seconds.items()}
+
+        with atomic_write(path) as year_file:
+            json.dump(rollups, year_file, separators=(",", ":"))
+
+
+def _shorten_entry(entry: JSONEntry, ids: Dict[str, str]) -> JSONEntry:
+    """
+    Returns the shard line `entry` with the short id of its activity and
+    without its name.
+    """
+    shortened = {"day": entry["day"],
+                 "id": ids.get(entry["id"], entry["id"]),
+                 "start": entry["start"]}
+    if "end" in entry:
+        shortened["end"] = entry["end"]
+
+    return shortened
+
+
+def _shorten_hierarchy(activities: JSONActivities,
+                       ids: Dict[str, str]) -> JSONActivities:
+    """
+    Returns the hierarchy `activities` with the short ids `ids`.
+    """
+    return {name: (ids.get(activity_id, activity_id),
+                   _shorten_hierarchy(children, ids))
+            for name, (activity_id, children) in activities.items()}
+
+
+def shorten_ids(directory: Path) -> None:
+    """
+    Replaces the uuid4s identifying activities with short ids, in the
+    hierarchy, shards, archives, journal and roll-ups of the timeline stored
+    in `directory`, and removes the names stored along with its entries. The
+    hierarchy is written last, so that the same ids are assigned if this is
+    interrupted and run again.
+
+    Args:
+        directory (Path): the directory of a user's timeline
+    """
+    activities = read_activities(directory)
+    journal = Journal(directory / JOURNAL_FILE_NAME)
+    events = journal.read()
+    ids = short_ids(list(ActivityIndex(activities).path_by_id),
+                    [event["id"] for event in events if event["op"] == "make"])
+
+    shorten_rollup_ids(directory, ids)
+
+    for path in sorted(directory.iterdir()):
+        if not is_shard(path):
+            continue
+
+        with open(path) as shard:
+            entries = [json.loads(line) for line in shard if line.strip()]
+
+        with atomic_write(path) as shard:
+            shard.writelines(
+                json.dumps(_shorten_entry(entry, ids), separators=(",", ":"))
+                + "\n" for entry in entries)
+
+    archives = read_index(directory)
+    compressions = {suffix: compression
+                    for compression, suffix in COMPRESSIONS.items()}
+    for year, archive in archives.items():
+        path = directory / archive["file"]
+        entries = [_shorten_entry(entry, ids) for entry in read_archive(path)]
+        days = [(day, Entry.from_json_many(list(day_entries)))
+                for day, day_entries in itertools.groupby(
+                    entries, key=lambda entry: entry["day"])]
+        archives[year] = write_archive(directory, year, days,
+                                       compressions[path.suffix])
+    if archives:
+        write_index(directory, archives)
+
+    if events:
+        for event in events:
+            if "id" in event:
+                event["id"] = ids.get(event["id"], event["id"])
+            event.pop("name", None)
+
+        with atomic_write(journal.path) as journal_file:
+            journal_file.writelines(
+                json.dumps(event, separators=(",", ":")) + "\n"
+                for event in events)
+
+    # the cached ongoing activity is written again when next needed
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(status_path(directory.name))
+
+    write_activities(directory, _shorten_hierarchy(activities, ids))
+    write_meta(directory, dict(read_meta(directory), version=3))
+
+
+def build_rollups(directory: Path) -> None:
+    """
+    Builds the roll-ups of the completed entries of the snapshot of the
+    timeline stored in `directory`, archives included, and records that they
+    match it in the timeline's metadata. Entries completed by events in the
+    journal are rolled up as the events are replayed.
+
+    Args:
+        directory (Path): the directory of a user's timeline
+    """
+    rollups = Rollups(directory,
+                      ActivityIndex(read_activities(directory)),
+                      fresh=True)
+    for _, entries in TimelineShards(directory).items():
+        for entry in entries:
+            if entry.end is not None:
+                rollups.add(entry.id, entry.start, entry.end)
+
+    rollups.save()
+    write_meta(directory, dict(read_meta(directory), rollups=True))
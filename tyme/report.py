@@ -0,0 +1,46 @@
+"""
+Computes how much time was spent on each activity over a range of days. The
+time spent on each activity is rolled up through the activity hierarchy, so
+that the time spent on an activity includes the time spent on all of its
+children. Timelines keep these sums up to date per day, week and month (see
+`tyme.rollups`), so that reports only add up the roll-ups and the ongoing
+activity.
+"""
+
+from typing import Dict, Optional
+
+from tyme.activities import ActivityIndex
+
+
+def roll_up(seconds: Dict[str, int], index: ActivityIndex) -> Dict[str, int]:
+    """
+    Adds the time spent on every activity to all of its ancestors.
+
+    Args:
+        seconds (Dict[str, int]): the seconds spent on each activity id
+        index (ActivityIndex): the index of the activity hierarchy
+
+    Returns:
+        Dict[str, int]:
+            the seconds spent on each activity id, including its children
+    """
+    rolled: Dict[str, int] = {}
+    for activity_id, spent in seconds.items():
+        ancestor: Optional[str] = activity_id
+        while ancestor is not None:
+            rolled[ancestor] = rolled.get(ancestor, 0) + spent
+            ancestor = index.parent_by_id.get(ancestor)
+
+    return rolled
+
+
+def add(seconds: Dict[str, int], more: Dict[str, int]) -> None:
+    """
+    Adds the time spent on each activity in `more` to `seconds`.
+
+    Args:
+        seconds (Dict[str, int]): the seconds spent on each activity id
+        more (Dict[str, int]): the seconds to be added to them
+    """
+    for activity_id, spent in more.items():
+        seconds[activity_id] = seconds.get(activity_id, 0) + spent
@@ -0,0 +1,228 @@
+"""
+Materialized roll-ups of the time spent on activities, so that summaries over
+a range of days take time proportional to the number of days rather than the
+number of entries. Three roll-ups are kept:
+
+    days: seconds spent on each activity id during each day
+    weeks: seconds spent on each activity id, including its children, during
+           each ISO week, YYYY-Www
+    months: the same during each month, YYYY-MM
+
+Only completed entries are rolled up, split over the days they span, and
+roll-ups are updated with `add` whenever an entry is completed or added.
+They are stored in one file per year, rollups/YYYY.json, which is only read
+once a period of that year is needed. Weeks are stored in the file of their
+ISO year.
+"""
+
+import json
+import os
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Set
+
+import tyme.utils as utils
+from tyme.activities import ActivityIndex
+from tyme.files import atomic_write
+from tyme.report import add as add_seconds
+from tyme.report import roll_up
+
+# the directory of the roll-ups, within the directory of a user's timeline
+ROLLUPS_DIR_NAME = "rollups"
+
+DAY = 24 * 60 * 60
+
+# period -> seconds spent on each activity id
+Periods = Dict[str, Dict[str, int]]
+
+# "days", "weeks" or "months" -> the periods of a year
+JSONRollups = Dict[str, Periods]
+
+
+def week_of(day: str) -> str:
+    """
+    Returns the ISO week, YYYY-Www, that the day `day` (YYYY-MM-DD) belongs
+    to.
+
+    Args:
+        day (str): the day whose week is desired
+
+    Returns:
+        str: the week containing `day`
+    """
+    year, week, _ = date.fromisoformat(day).isocalendar()
+    return f"{year:04}-W{week:02}"
+
+
+def days_between(first_day: str, last_day: str) -> Iterator[str]:
+    """
+    Yields every day from `first_day` to `last_day`, inclusive.
+    """
+    day = date.fromisoformat(first_day)
+    last = date.fromisoformat(last_day)
+    while day <= last:
+        yield day.isoformat()
+        day += timedelta(days=1)
+
+
+class Rollups:
+    """
+    The roll-ups of a user's timeline.
+
+    Args:
+        directory (Path): the directory of the user's timeline
+        index (ActivityIndex): the index of the activity hierarchy
+        fresh (bool):
+            if true, the roll-ups stored in `directory` are ignored, and
+            replaced by these ones when saved
+    """
+
+    def __init__(self,
+                 directory: Path,
+                 index: ActivityIndex,
+                 fresh: bool = False) -> None:
+        self.directory = directory / ROLLUPS_DIR_NAME
+        self.index = index
+        self._fresh = fresh
+
+        # year -> its roll-ups, for years that have been read
+        self._years: Dict[str, JSONRollups] = {}
+
+        # years modified since they were read
+        self.dirty: Set[str] = set()
+
+    def _year(self, year: str) -> JSONRollups:
+        """
+        Returns the roll-ups of year `year`, reading them if necessary.
+        """
+        if year not in self._years:
+            rollups: JSONRollups = {"days": {}, "weeks": {}, "months": {}}
+            if not self._fresh:
+                try:
+                    with open(self.directory / f"{year}.json") as year_file:
+                        rollups = json.load(year_file)
+                except FileNotFoundError:
+                    pass
+
+            self._years[year] = rollups
+
+        return self._years[year]
+
+    def _periods(self, kind: str, period: str) -> Periods:
+        return self._year(period[:4])[kind]
+
+    def add(self, activity_id: str, start: int, end: int) -> None:
+        """
+        Adds a completed entry to the roll-ups.
+
+        Args:
+            activity_id (str): the id of the activity of the entry
+            start (int): the start of the entry, in seconds since the epoch
+            end (int): the end of the entry, in seconds since the epoch
+        """
+        ancestors = []
+        ancestor: Optional[str] = activity_id
+        while ancestor is not None:
+            ancestors.append(ancestor)
+            ancestor = self.index.parent_by_id.get(ancestor)
+
+        day_start = start - start % DAY
+        while day_start < end:
+            spent = min(end, day_start + DAY) - max(start, day_start)
+            day = utils.format_epoch(day_start)[:10]
+
+            seconds = self._periods("days", day).setdefault(day, {})
+            seconds[activity_id] = seconds.get(activity_id, 0) + spent
+
+            for kind, period in [("weeks", week_of(day)),
+                                 ("months", day[:7])]:
+                seconds = self._periods(kind, period).setdefault(period, {})
+                for node in ancestors:
+                    seconds[node] = seconds.get(node, 0) + spent
+
+                self.dirty.add(period[:4])
+
+            day_start += DAY
+
+    def day(self, day: str) -> Dict[str, int]:
+        """
+        Returns the seconds spent on each activity id during day `day`, not
+        including their children.
+        """
+        return dict(self._periods("days", day).get(day, {}))
+
+    def week(self, week: str) -> Dict[str, int]:
+        """
+        Returns the seconds spent on each activity id, including its
+        children, during the ISO week `week`, YYYY-Www.
+        """
+        return dict(self._periods("weeks", week).get(week, {}))
+
+    def month(self, month: str) -> Dict[str, int]:
+        """
+        Returns the seconds spent on each activity id, including its
+        children, during month `month`, YYYY-MM.
+        """
+        return dict(self._periods("months", month).get(month, {}))
+
+    def between(self, first_day: str, last_day: str) -> Dict[str, int]:
+        """
+        Returns the seconds spent on each activity id, including its
+        children, from the start of `first_day` to the end of `last_day`.
+        Whole months in the range are read from the monthly roll-ups, and
+        only the days of the months at either end are summed.
+
+        Args:
+            first_day (str): the first day of the range
+            last_day (str): the last day of the range
+
+        Returns:
+            Dict[str, int]:
+                the seconds spent on each activity id, including its children
+        """
+        seconds: Dict[str, int] = {}
+        days: Dict[str, int] = {}
+
+        day = first_day
+        while day <= last_day:
+            month = day[:7]
+            next_month = (date.fromisoformat(f"{month}-01")
+                          + timedelta(days=31)).replace(day=1).isoformat()
+            month_last_day = (date.fromisoformat(next_month)
+                              - timedelta(days=1)).isoformat()
+
+            if day.endswith("-01") and month_last_day <= last_day:
+                add_seconds(seconds, self.month(month))
+            else:
+                for partial_day in days_between(
+                        day, min(month_last_day, last_day)):
+                    add_seconds(days, self.day(partial_day))
+
+            day = next_month
+
+        add_seconds(seconds, roll_up(days, self.index))
+        return seconds
+
+    def save(self) -> None:
+        """
+        Writes the roll-ups of every modified year. Fresh roll-ups replace
+        all of those stored before.
+        """
+        if not self.dirty and not self._fresh:
+            return
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        if self._fresh:
+            for path in self.directory.iterdir():
+                if path.stem not in self._years:
+                    os.remove(path)
+            self.dirty.update(self._years)
+            self._fresh = False
+
+        for year in sorted(self.dirty):
+            with atomic_write(self.directory / f"{year}.json") as year_file:
+                json.dump(self._years[year], year_file,
+                          separators=(",", ":"))
+
+        self.dirty.clear()
@@ -0,0 +1,545 @@
+"""
+Lazily loaded, time-partitioned storage for the "timeline" part of a user's
+timeline. Days are grouped into one shard per month, and a shard is only read
+from disk once a day inside of it is accessed.
+
+Shards are JSON Lines files, YYYY-MM.jsonl, holding one entry per line in
+chronological order, each with an additional "day" field. Entries are
+converted to `Entry` objects as shards are read. Since every line
+is a complete record, shards can also be read backwards from the end of the
+file.
+
+Months and days are kept in sorted lists that are maintained on insertion,
+so finding the most recent day or walking backwards over days never requires
+sorting.
+
+Months of closed years may instead be archived (see `tyme.archive`). They
+are read from their archive, a whole year at a time, like any other month,
+but can't be modified.
+"""
+
+import bisect
+import json
+import os
+from pathlib import Path
+from typing import (Dict, Iterator, List, MutableMapping, Optional, Set,
+                    Tuple)
+
+from tyme.archive import (JSONArchive, read_archive, read_index,
+                          write_archive, write_index)
+from tyme.entry import Entry, JSONEntry
+from tyme.errors import TimelineError
+from tyme.files import atomic_write
+
+
+Day = List[Entry]
+
+JSONDay = List[JSONEntry]
+
+SHARD_SUFFIX = ".jsonl"
+
+# added to the name of a shard written by `stage`, until it is moved in place
+STAGED_SUFFIX = ".staged"
+
+# number of bytes read at a time when reading a shard backwards
+REVERSE_BLOCK_SIZE = 1 << 16
+
+
+def month_of(day: str) -> str:
+    """
+    Returns the month (YYYY-MM) that the day `day` (YYYY-MM-DD) belongs to.
+
+    Args:
+        day (str): the day whose month is desired
+
+    Returns:
+        str: the month containing `day`
+    """
+    return day[:7]
+
+
+def read_lines_reversed(path: Path,
+                        block_size: int = REVERSE_BLOCK_SIZE) -> Iterator[str]:
+    """
+    Yields the non-empty lines of the file at `path`, last line first. The
+    file is read in blocks of `block_size` bytes starting from its end, so
+    only as much of the file as is consumed is read.
+
+    Args:
+        path (Path): the file to be read
+        block_size (int): the number of bytes to read at a time
+
+    Returns:
+        Iterator[str]: the lines of the file, in reverse order
+    """
+    with open(path, "rb") as lines:
+        position = lines.seek(0, os.SEEK_END)
+
+        # an incomplete line carried over from the previous block
+        rest = b""
+        while position > 0:
+            size = min(block_size, position)
+            position -= size
+            lines.seek(position)
+
+            *block, first = (lines.read(size) + rest).split(b"\n")[::-1]
+            for line in block:
+                if line:
+                    yield line.decode()
+            rest = first
+
+        if rest:
+            yield rest.decode()
+
+
+def is_shard(path: Path, suffix: str = SHARD_SUFFIX) -> bool:
+    """
+    Returns whether `path` names a month shard, i.e. YYYY-MM.jsonl.
+
+    Args:
+        path (Path): the path to check
+
+    Returns:
+        bool: whether `path` is a month shard
+    """
+    name = path.name
+    return (path.suffix == suffix and len(path.stem) == 7
+            and name[4] == "-" and name[:4].isdigit() and name[5:7].isdigit())
+
+
+class ArchivedYearError(TimelineError, ValueError):
+    """
+    Raised when a day of an archived year would be modified.
+    """
+
+
+class TimelineShards(MutableMapping[str, Day]):
+    """
+    A mapping between days and lists of occurences of activities, backed by
+    one shard file per month in `directory`.
+
+    Args:
+        directory (Optional[Path]):
+            the directory holding the shard files. If `None`, nothing is read
+            from disk.
+        days (Optional[Dict[str, JSONDay]]):
+            days to populate the mapping with, in the form they are stored
+            in. These are considered unsaved. Links to entries started on a
+            previous day, as written by older versions of tyme, are dropped.
+    """
+
+    def __init__(self,
+                 directory: Optional[Path] = None,
+                 days: Optional[Dict[str, JSONDay]] = None) -> None:
+        self.directory = directory
+
+        # every month that has a shard, loaded or not, in order
+        self._months: List[str] = []
+
+        # month -> the days of that month, for shards that have been read
+        self._shards: Dict[str, Dict[str, Day]] = {}
+
+        # month -> the days in `_shards[month]`, in order
+        self._days: Dict[str, List[str]] = {}
+
+        # months whose shards have been modified since they were read
+        self._dirty: Set[str] = set()
+
+        # months whose shards were written by `stage` but not yet saved
+        self._staged: Set[str] = set()
+
+        # each archived year and its description, see `tyme.archive`
+        self.archives: Dict[str, JSONArchive] = {}
+
+        # archived month -> the name of the archive holding it
+        self._archived: Dict[str, str] = {}
+
+        if directory is not None and directory.is_dir():
+            self.archives = read_index(directory)
+            for archive in self.archives.values():
+                for month in archive["months"]:
+                    self._archived[month] = archive["file"]
+
+            # a shard left behind by an interrupted `archive` is ignored
+            self._months = sorted(
+                {path.stem for path in directory.iterdir() if is_shard(path)}
+                | set(self._archived))
+
+        for day, entries in (days or {}).items():
+            entries = [entry for entry in entries if "previous" not in entry]
+            if entries:
+                self[day] = Entry.from_json_many(entries)
+
+    def _read(self, month: str) -> Dict[str, Day]:
+        """
+        Reads the shard of month `month` from disk, without caching it.
+        """
+        if not self._has_month(month) or self.directory is None:
+            return {}
+
+        path = self._path(month)
+        with open(path) as shard:
+            entries = [json.loads(line) for line in shard if line.strip()]
+
+        days: Dict[str, Day] = {}
+        for entry, converted in zip(entries, Entry.from_json_many(entries)):
+            days.setdefault(entry["day"], []).append(converted)
+
+        return days
+
+    def _read_reversed(self, month: str) -> Iterator[Tuple[str, Day]]:
+        """
+        Reads the shard of month `month` backwards from the end of its file,
+        yielding its days most recent first, without caching them.
+        """
+        if not self._has_month(month) or self.directory is None:
+            return
+
+        path = self._path(month)
+
+        day: Optional[str] = None
+        entries: JSONDay = []
+        for line in read_lines_reversed(path):
+            entry = json.loads(line)
+            if entry["day"] != day:
+                if day is not None:
+                    yield day, Entry.from_json_many(entries[::-1])
+                day, entries = entry["day"], []
+
+            entries.append(entry)
+
+        if day is not None:
+            yield day, Entry.from_json_many(entries[::-1])
+
+    def _read_archive(self, name: str) -> None:
+        """
+        Reads every month of the archive named `name` that isn't in memory.
+        """
+        assert self.directory is not None
+        months: Dict[str, Dict[str, JSONDay]] = {}
+        for entry in read_archive(self.directory / name):
+            day = entry.pop("day")
+            months.setdefault(month_of(day), {}).setdefault(day, []).append(
+                entry)
+
+        for month, days in months.items():
+            if month not in self._shards:
+                self._shards[month] = {
+                    day: Entry.from_json_many(entries)
+                    for day, entries in days.items()}
+                self._days[month] = sorted(days)
+
+    def _shard(self, month: str) -> Dict[str, Day]:
+        """
+        Returns the days of month `month`, reading its shard if necessary.
+        """
+        if month in self._archived and month not in self._shards:
+            self._read_archive(self._archived[month])
+
+        if month not in self._shards:
+            self._shards[month] = self._read(month)
+            self._days[month] = sorted(self._shards[month])
+
+        return self._shards[month]
+
+    def _path(self, month: str) -> Path:
+        """
+        Returns the file holding the shard of month `month`, which is its
+        staged copy if it has one.
+        """
+        assert self.directory is not None
+        path = (self.directory / month).with_suffix(SHARD_SUFFIX)
+        if month in self._staged:
+            return self._staged_path(path)
+
+        return path
+
+    @staticmethod
+    def _staged_path(path: Path) -> Path:
+        """
+        Returns where the shard at `path` is written to by `stage`.
+        """
+        return path.with_name(f".{path.name}{STAGED_SUFFIX}")
+
+    def _write(self, month: str, path: Path) -> None:
+        """
+        Writes the days of month `month` to `path`.
+        """
+        days = self._shards[month]
+        with atomic_write(path) as shard:
+            shard.writelines(
+                json.dumps({"day": day, **entry.to_json()},
+                           separators=(",", ":"))
+                + "\n"
+                for day in self._days[month] for entry in days[day])
+
+    def _has_month(self, month: str) -> bool:
+        """
+        Returns whether there is a shard, loaded or not, for month `month`.
+        """
+        index = bisect.bisect_left(self._months, month)
+        return index < len(self._months) and self._months[index] == month
+
+    def __getitem__(self, day: str) -> Day:
+        if not self._has_month(month_of(day)):
+            raise KeyError(day)
+
+        return self._shard(month_of(day))[day]
+
+    def _check_writable(self, month: str) -> None:
+        """
+        Raises an `ArchivedYearError` if the year of month `month` is
+        archived.
+        """
+        if month[:4] in self.archives:
+            raise ArchivedYearError(
+                f"{month[:4]} is archived and can't be modified.")
+
+    def __setitem__(self, day: str, entries: Day) -> None:
+        month = month_of(day)
+        self._check_writable(month)
+        shard = self._shard(month)
+        if day not in shard:
+            bisect.insort(self._days[month], day)
+        if not self._has_month(month):
+            bisect.insort(self._months, month)
+
+        shard[day] = entries
+        self._dirty.add(month)
+
+    def __delitem__(self, day: str) -> None:
+        month = month_of(day)
+        if not self._has_month(month):
+            raise KeyError(day)
+
+        self._check_writable(month)
+        del self._shard(month)[day]
+        self._days[month].remove(day)
+        self._dirty.add(month)
+
+    def __contains__(self, day: object) -> bool:
+        return (isinstance(day, str) and self._has_month(month_of(day))
+                and day in self._shard(month_of(day)))
+
+    def __iter__(self) -> Iterator[str]:
+        for month in list(self._months):
+            self._shard(month)
+            yield from list(self._days[month])
+
+    def __reversed__(self) -> Iterator[str]:
+        """
+        Iterates over the days, most recent first. Shards are only read as
+        the iteration reaches them.
+        """
+        for month in reversed(list(self._months)):
+            self._shard(month)
+            yield from reversed(list(self._days[month]))
+
+    def reversed_items(self) -> Iterator[Tuple[str, Day]]:
+        """
+        Iterates over the days and their entries, most recent first. Unlike
+        iterating over `reversed(self)`, shards that have not been read yet
+        are read backwards from the end of their files and are not kept in
+        memory, so only as much of the timeline as is consumed is read.
+        Archived months are read and kept a whole archive at a time.
+
+        Returns:
+            Iterator[Tuple[str, Day]]: pairs of days and their entries
+        """
+        for month in reversed(list(self._months)):
+            if month in self._shards or month in self._archived:
+                shard = self._shard(month)
+                for day in reversed(list(self._days[month])):
+                    yield day, shard[day]
+            else:
+                yield from self._read_reversed(month)
+
+    def items_between(self,
+                      first_day: str,
+                      last_day: str) -> Iterator[Tuple[str, Day]]:
+        """
+        Iterates over the days from `first_day` to `last_day`, inclusive, and
+        their entries, oldest first. Only the shards of months in that range
+        are read.
+
+        Args:
+            first_day (str): the first day to include
+            last_day (str): the last day to include
+
+        Returns:
+            Iterator[Tuple[str, Day]]: pairs of days and their entries
+        """
+        first = bisect.bisect_left(self._months, month_of(first_day))
+        last = bisect.bisect_right(self._months, month_of(last_day))
+        for month in self._months[first:last]:
+            shard = self._shard(month)
+            days = self._days[month]
+            start = bisect.bisect_left(days, first_day)
+            end = bisect.bisect_right(days, last_day)
+            for day in days[start:end]:
+                yield day, shard[day]
+
+    def __len__(self) -> int:
+        return sum(len(self._shard(month)) for month in self._months)
+
+    def last_day(self) -> Optional[str]:
+        """
+        Returns the most recent day in the timeline, or `None` if it is empty.
+        Only the most recent shard is read.
+
+        Returns:
+            Optional[str]: the most recent day
+        """
+        for month in reversed(self._months):
+            self._shard(month)
+            if self._days[month]:
+                return self._days[month][-1]
+
+        return None
+
+    def mark_dirty(self, day: str) -> None:
+        """
+        Marks the shard containing `day` as modified. This is needed whenever
+        the entries of a day are modified in place.
+
+        Args:
+            day (str): the day that was modified
+        """
+        self._check_writable(month_of(day))
+        self._dirty.add(month_of(day))
+
+    def stage(self, before: str) -> None:
+        """
+        Writes every modified shard of the months before `before` to a
+        staged copy next to its shard file, and stops keeping the shards of
+        those months in memory. Staged copies are moved in place of the
+        shards they replace by the next `save`, and are read instead of them
+        until then. This bounds the memory needed to modify many months at
+        once, without the changes becoming visible to other processes before
+        they are saved.
+
+        Args:
+            before (str): the month (YYYY-MM) before which shards are staged
+        """
+        if self.directory is None:
+            raise ValueError("cannot stage shards without a directory")
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        for month in sorted(self._shards):
+            if month >= before:
+                break
+
+            if month in self._dirty:
+                # removing an emptied shard is left to `save`
+                if not self._shards[month]:
+                    continue
+
+                path = (self.directory / month).with_suffix(SHARD_SUFFIX)
+                self._write(month, self._staged_path(path))
+                self._staged.add(month)
+                self._dirty.remove(month)
+
+            del self._shards[month]
+            del self._days[month]
+
+    def discard_staged(self) -> None:
+        """
+        Removes every staged copy of a shard, along with the changes they
+        held, and any left behind by a process that stopped before saving.
+        """
+        if self.directory is None or not self.directory.is_dir():
+            return
+
+        for path in self.directory.iterdir():
+            if path.name.startswith(".") and path.name.endswith(
+                    SHARD_SUFFIX + STAGED_SUFFIX):
+                os.remove(path)
+
+        for month in self._staged:
+            if not (self.directory / month).with_suffix(SHARD_SUFFIX).exists():
+                self._months.remove(month)
+        self._staged.clear()
+
+    def save(self, prune: bool = False) -> None:
+        """
+        Writes every modified shard to `directory`, and moves any staged
+        shards in place.
+
+        Args:
+            prune (bool):
+                if true, also removes the shards in `directory` that are not
+                part of this mapping.
+        """
+        if self.directory is None:
+            raise ValueError("cannot save shards without a directory")
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        for month in sorted(self._staged):
+            path = (self.directory / month).with_suffix(SHARD_SUFFIX)
+            os.replace(self._staged_path(path), path)
+        self._staged.clear()
+
+        for month in sorted(self._dirty):
+            path = (self.directory / month).with_suffix(SHARD_SUFFIX)
+            if self._shards[month]:
+                self._write(month, path)
+            else:
+                if self._has_month(month):
+                    self._months.remove(month)
+                if path.exists():
+                    os.remove(path)
+
+        self._dirty.clear()
+
+        if prune:
+            for path in self.directory.iterdir():
+                if is_shard(path) and (path.stem not in self._months
+                                       or path.stem in self._archived):
+                    os.remove(path)
+
+    def unarchived_years(self) -> List[str]:
+        """
+        Returns the years with months that aren't archived, in order.
+
+        Returns:
+            List[str]: the years, YYYY
+        """
+        return sorted({month[:4] for month in self._months
+                       if month not in self._archived})
+
+    def archive(self, year: str, compression: str) -> None:
+        """
+        Moves every month of year `year` into a compressed archive, which
+        replaces any existing archive of that year, and removes their shards.
+        The months must have no unsaved changes.
+
+        Args:
+            year (str): the year to be archived, YYYY
+            compression (str): either "gzip" or "lzma"
+        """
+        if self.directory is None:
+            raise ValueError("cannot archive shards without a directory")
+
+        months = [month for month in self._months if month[:4] == year]
+        assert not self._dirty.intersection(months)
+
+        days = [(day, entries) for month in months
+                for day, entries in sorted(self._shard(month).items())]
+        archive = write_archive(self.directory, year, days, compression)
+
+        previous = self.archives.get(year)
+        self.archives[year] = archive
+        write_index(self.directory, self.archives)
+
+        # only removed once the archive is indexed, so that nothing is lost
+        # if this is interrupted
+        if previous is not None and previous["file"] != archive["file"]:
+            os.remove(self.directory / previous["file"])
+
+        for month in months:
+            self._archived[month] = archive["file"]
+            path = (self.directory / month).with_suffix(SHARD_SUFFIX)
+            if path.exists():
+                os.remove(path)
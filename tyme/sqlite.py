@@ -0,0 +1,520 @@
+"""
+Storage of timelines in a single SQLite database, timeline.db, as an
+alternative to month shards (see `tyme.storage`). The database holds three
+tables:
+
+    activities: the id, name and parent id of every activity, parents first
+    entries: the day, position within the day, activity id, start and end of
+             every entry, keyed by day and position, and so ordered by start
+             time, and also indexed by activity and start time
+    meta: the metadata of the timeline (see `tyme.meta`), as JSON values
+
+Like shards, entries only refer to their activity by its id. Days are read a
+range at a time as they are accessed, so finding the most recent activity or
+the entries of a range of days are indexed lookups. Changes are written as
+they are recorded, and committed together by `commit`, so there is no journal
+to replay.
+"""
+
+import bisect
+import contextlib
+import json
+import os
+import sqlite3
+from pathlib import Path
+from typing import (Dict, Iterator, List, MutableMapping, Optional, Set,
+                    Tuple)
+
+from tyme.activities import JSONActivities
+from tyme.common import DATABASE_FILE_NAME
+from tyme.entry import Entry
+from tyme.journal import JournalEvent
+from tyme.meta import FORMAT_VERSION, JSONMeta
+from tyme.migrate import short_ids, shorten_rollup_ids
+from tyme.shards import Day, JSONDay, month_of
+from tyme.status import status_path
+from tyme.storage import Days, Storage
+
+# the version of the schema, kept in the database's user_version
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE activities (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    parent TEXT REFERENCES activities (id)
+);
+CREATE TABLE entries (
+    day TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    activity TEXT NOT NULL REFERENCES activities (id),
+    started INTEGER NOT NULL,
+    ended INTEGER,
+    PRIMARY KEY (day, position)
+) WITHOUT ROWID;
+CREATE INDEX entries_by_activity ON entries (activity, started);
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+SELECT_ENTRIES = """
+SELECT day, activity, started, ended
+FROM entries
+WHERE day BETWEEN ? AND ?
+ORDER BY day, position
+"""
+
+
+def is_complete(path: Path) -> bool:
+    """
+    Returns whether the database at `path` holds a whole timeline, which is
+    only the case once its metadata was written.
+
+    Args:
+        path (Path): the database to check
+
+    Returns:
+        bool: whether the database is complete
+    """
+    try:
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            return connection.execute(
+                "SELECT 1 FROM meta WHERE key = 'version'").fetchone() \
+                is not None
+        finally:
+            connection.close()
+    except sqlite3.Error:
+        return False
+
+
+class SQLiteDays(MutableMapping[str, Day]):
+    """
+    A mapping between days and lists of occurences of activities, backed by
+    the entries table of a timeline's database. Days are kept in memory once
+    they are read, and modified days are written back by `save`.
+
+    Args:
+        storage (SQLiteStorage): the storage of the timeline
+        days (Optional[Dict[str, JSONDay]]):
+            days to populate the mapping with, in the form they are stored
+            in by `TimelineShards`. These are considered unsaved.
+    """
+
+    def __init__(self,
+                 storage: "SQLiteStorage",
+                 days: Optional[Dict[str, JSONDay]] = None) -> None:
+        self._storage = storage
+
+        # day -> its entries, for days that have been read or modified
+        self._days: Dict[str, Day] = {}
+
+        # days deleted since they were read
+        self._deleted: Set[str] = set()
+
+        # every day with entries, in order, once it has been needed
+        self._listed: Optional[List[str]] = None
+
+        # days modified since they were read
+        self._dirty: Set[str] = set()
+
+        # timelines stored in a database are never archived
+        self.archives: Dict[str, dict] = {}
+
+        for day, entries in (days or {}).items():
+            entries = [entry for entry in entries if "previous" not in entry]
+            if entries:
+                self[day] = Entry.from_json_many(entries)
+
+    def _read(self, first_day: str, last_day: str) -> None:
+        """
+        Reads the days from `first_day` to `last_day` that aren't in memory.
+        """
+        rows = self._storage.query(SELECT_ENTRIES, (first_day, last_day))
+
+        days: Dict[str, Day] = {}
+        for day, activity_id, start, end in rows:
+            days.setdefault(day, []).append(Entry(activity_id, start, end))
+
+        for day, entries in days.items():
+            if day not in self._deleted:
+                self._days.setdefault(day, entries)
+
+    def _read_months(self, days: List[str]) -> None:
+        """
+        Reads the months of `days` that have days which aren't in memory.
+        """
+        months = sorted({month_of(day) for day in days
+                         if day not in self._days})
+        for month in months:
+            self._read(f"{month}-01", f"{month}-31")
+
+    def _days_listed(self) -> List[str]:
+        """
+        Returns every day, in order.
+        """
+        if self._listed is None:
+            days = {day for day, in self._storage.query(
+                "SELECT DISTINCT day FROM entries")}
+            days.update(self._days)
+            days.difference_update(self._deleted)
+            self._listed = sorted(days)
+
+        return self._listed
+
+    def __getitem__(self, day: str) -> Day:
+        if day not in self._days:
+            self._read(day, day)
+
+        return self._days[day]
+
+    def __setitem__(self, day: str, entries: Day) -> None:
+        if self._listed is not None:
+            index = bisect.bisect_left(self._listed, day)
+            if index == len(self._listed) or self._listed[index] != day:
+                self._listed.insert(index, day)
+
+        self._days[day] = entries
+        self._deleted.discard(day)
+        self._dirty.add(day)
+
+    def __delitem__(self, day: str) -> None:
+        self[day]
+        del self._days[day]
+        self._deleted.add(day)
+        self._dirty.add(day)
+
+        if self._listed is not None:
+            self._listed.remove(day)
+
+    def __contains__(self, day: object) -> bool:
+        try:
+            return isinstance(day, str) and self[day] is not None
+        except KeyError:
+            return False
+
+    def __iter__(self) -> Iterator[str]:
+        days = list(self._days_listed())
+        self._read_months(days)
+        yield from days
+
+    def __reversed__(self) -> Iterator[str]:
+        for day, _ in self.reversed_items():
+            yield day
+
+    def reversed_items(self) -> Iterator[Tuple[str, Day]]:
+        """
+        Iterates over the days and their entries, most recent first. Days
+        are read a month at a time, as the iteration reaches them.
+
+        Returns:
+            Iterator[Tuple[str, Day]]: pairs of days and their entries
+        """
+        for day in reversed(list(self._days_listed())):
+            if day not in self._days:
+                self._read(f"{month_of(day)}-01", day)
+            yield day, self._days[day]
+
+    def items_between(self,
+                      first_day: str,
+                      last_day: str) -> Iterator[Tuple[str, Day]]:
+        """
+        Iterates over the days from `first_day` to `last_day`, inclusive, and
+        their entries, oldest first. Only the entries of those days are read.
+
+        Args:
+            first_day (str): the first day to include
+            last_day (str): the last day to include
+
+        Returns:
+            Iterator[Tuple[str, Day]]: pairs of days and their entries
+        """
+        self._read(first_day, last_day)
+        for day in sorted(day for day in self._days
+                          if first_day <= day <= last_day):
+            yield day, self._days[day]
+
+    def __len__(self) -> int:
+        return len(self._days_listed())
+
+    def last_day(self) -> Optional[str]:
+        """
+        Returns the most recent day in the timeline, or `None` if it is
+        empty.
+
+        Returns:
+            Optional[str]: the most recent day
+        """
+        if self._listed is None:
+            last = max((day for day, in self._storage.query(
+                "SELECT max(day) FROM entries") if day), default=None)
+
+            # unless it was deleted in memory, in which case every day is
+            # listed instead
+            if last not in self._deleted:
+                return max(list(self._days) + ([last] if last else []),
+                           default=None)
+
+        listed = self._days_listed()
+        return listed[-1] if listed else None
+
+    def mark_dirty(self, day: str) -> None:
+        """
+        Marks `day` as modified. This is needed whenever the entries of a day
+        are modified in place.
+
+        Args:
+            day (str): the day that was modified
+        """
+        self._dirty.add(day)
+
+    def mark_clean(self) -> None:
+        """
+        Marks every day as saved, once their changes were written otherwise.
+        """
+        self._dirty.clear()
+
+    def _write(self, day: str) -> None:
+        """
+        Replaces the stored entries of `day` with those in memory.
+        """
+        connection = self._storage.connection
+        connection.execute("DELETE FROM entries WHERE day = ?", (day,))
+        connection.executemany(
+            "INSERT INTO entries VALUES (?, ?, ?, ?, ?)",
+            ((day, position, entry.id, entry.start, entry.end)
+             for position, entry in enumerate(self._days.get(day, []))))
+
+    def stage(self, before: str) -> None:
+        """
+        Writes every modified day of the months before `before` within the
+        current transaction, and stops keeping them in memory. The changes
+        are only visible to other processes once they are committed.
+
+        Args:
+            before (str): the month (YYYY-MM) before which days are staged
+        """
+        for day in sorted(self._days):
+            if month_of(day) >= before:
+                break
+
+            if day in self._dirty:
+                self._write(day)
+                self._dirty.remove(day)
+
+            del self._days[day]
+
+        self._listed = None
+
+    def discard_staged(self) -> None:
+        """
+        Rolls back every change written but not yet committed.
+        """
+        self._storage.connection.rollback()
+
+    def save(self, prune: bool = False) -> None:
+        """
+        Writes every modified day within the current transaction. Days are
+        deleted from the database as they are from the mapping, so there is
+        never anything to prune.
+        """
+        for day in sorted(self._dirty):
+            self._write(day)
+        self._dirty.clear()
+        self._deleted.clear()
+
+
+class SQLiteStorage(Storage):
+    """
+    Stores a timeline in the SQLite database timeline.db.
+
+    Args:
+        directory (Path): the directory of the user's timeline
+        path (Optional[Path]):
+            the database, if it isn't `directory`/timeline.db
+    """
+
+    name = "sqlite"
+
+    def __init__(self, directory: Path, path: Optional[Path] = None) -> None:
+        super().__init__(directory)
+        self.path = path or directory / DATABASE_FILE_NAME
+        self._connection: Optional[sqlite3.Connection] = None
+
+        # statements recording changes, executed together by `commit`
+        self._pending: List[Tuple[str, Tuple]] = []
+
+        # whether the activities table holds the timeline's hierarchy
+        self._loaded = False
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """
+        The connection to the database, which is created if it doesn't
+        exist.
+        """
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+
+            # the daemon saves timelines from another thread, and only ever
+            # uses a timeline from one thread at a time
+            connection = sqlite3.connect(str(self.path),
+                                         check_same_thread=False)
+            version, = connection.execute("PRAGMA user_version").fetchone()
+            if version < SCHEMA_VERSION:
+                connection.executescript(SCHEMA)
+                connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                connection.commit()
+
+            self._connection = connection
+
+        return self._connection
+
+    def query(self, sql: str, parameters: Tuple = ()) -> List[Tuple]:
+        """
+        Returns the rows selected by `sql`, with `parameters`. A database
+        that doesn't exist yet is empty, and isn't created.
+        """
+        if self._connection is None and not self.path.exists():
+            return []
+
+        return self.connection.execute(sql, parameters).fetchall()
+
+    def close(self) -> None:
+        """
+        Closes the connection to the database, discarding anything that
+        wasn't committed.
+        """
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def needs_migration(self) -> bool:
+        version = self.query("SELECT value FROM meta WHERE key = 'version'")
+        return bool(version) and json.loads(version[0][0]) < FORMAT_VERSION
+
+    def migrate(self) -> None:
+        # databases were first written in version 2, whose activities were
+        # identified by uuid4s (see `tyme.migrate`)
+        ids = short_ids([activity_id for activity_id, in self.query(
+            "SELECT id FROM activities ORDER BY rowid")])
+        shorten_rollup_ids(self.directory, ids)
+
+        with self.connection as connection:
+            for old_id, new_id in ids.items():
+                connection.execute(
+                    "UPDATE activities SET id = ? WHERE id = ?",
+                    (new_id, old_id))
+                connection.execute(
+                    "UPDATE activities SET parent = ? WHERE parent = ?",
+                    (new_id, old_id))
+                connection.execute(
+                    "UPDATE entries SET activity = ? WHERE activity = ?",
+                    (new_id, old_id))
+
+            connection.execute(
+                "UPDATE meta SET value = ? WHERE key = 'version'",
+                (json.dumps(3),))
+
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(status_path(self.directory.name))
+
+    def load(self) -> Tuple[Days, JSONActivities, JSONMeta,
+                            List[JournalEvent]]:
+        self.days = SQLiteDays(self)
+
+        activities: JSONActivities = {}
+        children: Dict[str, JSONActivities] = {}
+        for activity_id, name, parent_id in self.query(
+                "SELECT id, name, parent FROM activities ORDER BY rowid"):
+            category = activities if parent_id is None else children[parent_id]
+            children[activity_id] = {}
+            category[name] = (activity_id, children[activity_id])
+
+        meta = {key: json.loads(value) for key, value in
+                self.query("SELECT key, value FROM meta")}
+
+        self._loaded = True
+        return self.days, activities, meta, []
+
+    def new_days(self, days: Dict[str, JSONDay]) -> Days:
+        self.days = SQLiteDays(self, days=days)
+        return self.days
+
+    def append_entry(self, day: str, index: int, entry: Entry) -> None:
+        self._pending.append((
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+            (day, index, entry.id, entry.start, entry.end)))
+
+    def close_entry(self, day: str, index: int, entry: Entry) -> None:
+        self._pending.append((
+            "UPDATE entries SET ended = ? WHERE day = ? AND position = ?",
+            (entry.end, day, index)))
+
+    def create_activity(self,
+                        path: str,
+                        activity_id: str,
+                        parent_id: Optional[str]) -> None:
+        self._pending.append((
+            "INSERT OR IGNORE INTO activities VALUES (?, ?, ?)",
+            (activity_id, path.rsplit("/", 1)[-1], parent_id)))
+
+    def changes(self) -> int:
+        return len(self._pending)
+
+    def commit(self) -> str:
+        if self._pending:
+            for sql, parameters in self._pending:
+                self.connection.execute(sql, parameters)
+            self.connection.commit()
+            self._pending = []
+
+        # the days modified by the changes were written along with them
+        if isinstance(self.days, SQLiteDays):
+            self.days.mark_clean()
+
+        return str(self.path)
+
+    def compact(self, activities: JSONActivities, prune: bool) -> str:
+        for sql, parameters in self._pending:
+            self.connection.execute(sql, parameters)
+        self._pending = []
+
+        self.days.save(prune=prune)
+
+        # the hierarchy of a loaded timeline is kept up to date by
+        # `create_activity`, so it is only written for new ones
+        if not self._loaded:
+            # parents are written before their children, so that they are
+            # read back first
+            rows = []
+            stack: List[Tuple[Optional[str], JSONActivities]] = [
+                (None, activities)]
+            while stack:
+                parent_id, category = stack.pop()
+                for name, (activity_id, children) in category.items():
+                    rows.append((activity_id, name, parent_id))
+                    stack.append((activity_id, children))
+
+            self.connection.execute("DELETE FROM activities")
+            self.connection.executemany(
+                "INSERT INTO activities VALUES (?, ?, ?)", rows)
+            self._loaded = True
+
+        self.connection.commit()
+
+        return str(self.path)
+
+    def write_meta(self, meta: JSONMeta) -> None:
+        self.connection.execute("DELETE FROM meta")
+        self.connection.executemany(
+            "INSERT INTO meta VALUES (?, ?)",
+            ((key, json.dumps(value)) for key, value in meta.items()))
+        self.connection.commit()
+
+    def remove(self) -> None:
+        self.close()
+        if self.path.exists():
+            os.remove(self.path)
@@ -0,0 +1,71 @@
+"""
+A cache of each user's ongoing activity, so that status bars and shell
+prompts can show it without loading the timeline. It is kept in
+TYME_STATUS_DIR/user.json as a single JSON object:
+
+    id: the id of the ongoing activity
+    name: the name of the ongoing activity
+    path: the absolute path of the ongoing activity
+    start: when it was started, in seconds since the epoch
+
+or as an empty object if there is no ongoing activity. The cache is written
+by `Timeline.save` whenever an activity was started or completed, and is
+replaced atomically (see `tyme.files`), so it can also be read directly by
+other programs.
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from tyme.common import TYME_STATUS_DIR
+
+JSONStatus = Dict[str, Any]
+
+
+def status_path(user: str) -> Path:
+    """
+    Returns the path of the status cache of user `user`.
+
+    Args:
+        user (str): the user whose status cache is desired
+
+    Returns:
+        Path: the status cache
+    """
+    return TYME_STATUS_DIR / f"{user}.json"
+
+
+def read_status(user: str) -> Optional[JSONStatus]:
+    """
+    Reads the cached status of user `user`.
+
+    Args:
+        user (str): the user whose status is desired
+
+    Returns:
+        Optional[JSONStatus]:
+            the ongoing activity, empty if there is none, or `None` if the
+            status was never cached
+    """
+    try:
+        with open(status_path(user)) as status_file:
+            return json.load(status_file)
+    except FileNotFoundError:
+        return None
+
+
+def write_status(user: str, status: JSONStatus) -> None:
+    """
+    Writes the cached status of user `user`.
+
+    Args:
+        user (str): the user whose status is cached
+        status (JSONStatus): the ongoing activity, empty if there is none
+    """
+    # only needed by writers, and slow to import for `tyme.cli.fast`
+    from tyme.files import atomic_write
+
+    TYME_STATUS_DIR.mkdir(parents=True, exist_ok=True)
+    with atomic_write(status_path(user)) as status_file:
+        json.dump(status, status_file, separators=(",", ":"))
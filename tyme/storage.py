@@ -0,0 +1,313 @@
+"""
+Backends that store users' timelines. A `Timeline` only reads and writes its
+data through a `Storage`, which provides:
+
+    days: the entries of each day, read as ranges of days are accessed
+    load: the activity hierarchy, the metadata and any changes to replay
+    append_entry, close_entry, create_activity: record a single change
+    commit: make the changes recorded so far durable
+    compact: write the whole timeline as a new snapshot
+
+There are two backends. `FileStorage` keeps month shards (see `tyme.shards`),
+activities.json and meta.json, and appends changes to a journal (see
+`tyme.journal`). `SQLiteStorage` (see `tyme.sqlite`) keeps all of it in a
+single SQLite database, with entries indexed by day and activity. The
+backend of an existing timeline is found from the files in its directory,
+and new timelines use the one named by TYME_STORAGE, "files" by default.
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, List, MutableMapping, Optional, Tuple
+
+import tyme.migrate as migrate
+import tyme.utils as utils
+from tyme.activities import (JSONActivities, read_activities,
+                             write_activities)
+from tyme.common import *
+from tyme.entry import Entry
+from tyme.journal import Journal, JournalEvent
+from tyme.meta import JSONMeta, read_meta, write_meta
+from tyme.shards import STAGED_SUFFIX, JSONDay, TimelineShards, is_shard
+
+# the days of a timeline, which also provide `items_between`,
+# `reversed_items`, `last_day`, `mark_dirty`, `stage`, `discard_staged`,
+# `save` and `archives` like `TimelineShards` does
+Days = MutableMapping[str, List[Entry]]
+
+# the names of the backends
+STORAGE_NAMES = ["files", "sqlite"]
+
+
+class Storage:
+    """
+    The storage of a user's timeline, kept in `directory`.
+
+    Args:
+        directory (Path): the directory of the user's timeline
+
+    Attributes:
+        name (str): the name of the backend, one of `STORAGE_NAMES`
+        archivable (bool):
+            whether closed years can be moved into archives (see
+            `tyme.archive`)
+        journaled (bool):
+            whether committed changes are replayed from a journal whenever
+            the timeline is loaded, rather than written in place
+        directory (Path): the directory of the user's timeline
+        days (Days): the days of the timeline, once loaded or created
+    """
+
+    name = ""
+    archivable = False
+    journaled = False
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.days: Days = {}
+
+    def needs_migration(self) -> bool:
+        """
+        Returns whether the timeline is stored in an older layout.
+        """
+        return False
+
+    def migrate(self) -> None:
+        """
+        Converts the timeline to the current layout. The caller must hold
+        the timeline's lock.
+        """
+
+    def load(self) -> Tuple[Days, JSONActivities, JSONMeta,
+                            List[JournalEvent]]:
+        """
+        Loads the timeline. Days are read as they are accessed.
+
+        Returns:
+            Tuple[Days, JSONActivities, JSONMeta, List[JournalEvent]]:
+                the days, the activity hierarchy, the metadata, and the
+                changes to replay on top of them
+        """
+        raise NotImplementedError
+
+    def new_days(self, days: Dict[str, JSONDay]) -> Days:
+        """
+        Creates the days of a timeline from `days`, in the form they are
+        stored in by `TimelineShards`, to be written by the next `compact`.
+        """
+        raise NotImplementedError
+
+    def append_entry(self, day: str, index: int, entry: Entry) -> None:
+        """
+        Records that `entry` was started, as the `index`th entry of `day`.
+        """
+        raise NotImplementedError
+
+    def close_entry(self, day: str, index: int, entry: Entry) -> None:
+        """
+        Records that `entry`, the `index`th entry of `day`, was completed.
+        """
+        raise NotImplementedError
+
+    def create_activity(self,
+                        path: str,
+                        activity_id: str,
+                        parent_id: Optional[str]) -> None:
+        """
+        Records that the activity at `path` was created with the id
+        `activity_id`, under the activity `parent_id`.
+        """
+        raise NotImplementedError
+
+    def changes(self) -> int:
+        """
+        Returns the number of changes recorded since the last `compact`.
+        """
+        raise NotImplementedError
+
+    def commit(self) -> str:
+        """
+        Makes every change recorded since the last `commit` durable.
+
+        Returns:
+            str: the location of what was written to
+        """
+        raise NotImplementedError
+
+    def compact(self, activities: JSONActivities, prune: bool) -> str:
+        """
+        Writes the modified days and the activity hierarchy as the snapshot
+        of the timeline, along with every recorded change.
+
+        Args:
+            activities (JSONActivities): the activity hierarchy
+            prune (bool): whether days that are no longer part of the
+                timeline may have been left in storage
+
+        Returns:
+            str: the location of what was written to
+        """
+        raise NotImplementedError
+
+    def write_meta(self, meta: JSONMeta) -> None:
+        """
+        Writes the metadata of the timeline (see `tyme.meta`).
+        """
+        raise NotImplementedError
+
+    def remove(self) -> None:
+        """
+        Removes everything this backend stored, once the timeline was moved
+        to another one. Roll-ups are kept, since they don't depend on it.
+        """
+        raise NotImplementedError
+
+
+class FileStorage(Storage):
+    """
+    Stores a timeline as month shards, activities.json and meta.json, and
+    appends changes to journal.jsonl until the timeline is compacted.
+    """
+
+    name = "files"
+    archivable = True
+    journaled = True
+
+    def __init__(self, directory: Path) -> None:
+        super().__init__(directory)
+        self.journal = Journal(directory / JOURNAL_FILE_NAME)
+
+        # number of events in the journal
+        self._journal_length = 0
+
+        # events that have been recorded but not yet written to the journal
+        self._pending: List[JournalEvent] = []
+
+    def needs_migration(self) -> bool:
+        return migrate.needs_migration(self.directory.name)
+
+    def migrate(self) -> None:
+        migrate.migrate(self.directory.name)
+
+    def load(self) -> Tuple[Days, JSONActivities, JSONMeta,
+                            List[JournalEvent]]:
+        # the journal is read before the snapshot, so that if it is compacted
+        # in the meantime, its events are found in the snapshot instead
+        events = self.journal.read()
+        self._journal_length = len(events)
+        self.days = TimelineShards(self.directory)
+
+        return (self.days,
+                read_activities(self.directory),
+                read_meta(self.directory),
+                events)
+
+    def new_days(self, days: Dict[str, JSONDay]) -> Days:
+        # the journal no longer describes changes to this snapshot
+        self._journal_length = 0
+        self.days = TimelineShards(self.directory, days=days)
+        return self.days
+
+    def append_entry(self, day: str, index: int, entry: Entry) -> None:
+        self._pending.append({
+            "op": "start",
+            "id": entry.id,
+            "start": utils.format_epoch(entry.start),
+            "index": index,
+        })
+
+    def close_entry(self, day: str, index: int, entry: Entry) -> None:
+        assert entry.end is not None
+        self._pending.append({
+            "op": "done",
+            "start": utils.format_epoch(entry.start),
+            "end": utils.format_epoch(entry.end),
+            "index": index,
+        })
+
+    def create_activity(self,
+                        path: str,
+                        activity_id: str,
+                        parent_id: Optional[str]) -> None:
+        self._pending.append({"op": "make", "path": path, "id": activity_id})
+
+    def changes(self) -> int:
+        return self._journal_length + len(self._pending)
+
+    def commit(self) -> str:
+        self.journal.append(self._pending)
+        self._journal_length += len(self._pending)
+        self._pending = []
+
+        return str(self.journal.path)
+
+    def compact(self, activities: JSONActivities, prune: bool) -> str:
+        self.days.save(prune=prune)
+        write_activities(self.directory, activities)
+
+        self.journal.clear()
+        self._journal_length = 0
+        self._pending = []
+
+        return str(self.directory)
+
+    def write_meta(self, meta: JSONMeta) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        write_meta(self.directory, meta)
+
+    def remove(self) -> None:
+        if not self.directory.is_dir():
+            return
+
+        archives = {archive["file"] for archive in
+                    getattr(self.days, "archives", {}).values()}
+        for path in self.directory.iterdir():
+            if (is_shard(path) or path.name in archives
+                    or path.name.endswith(STAGED_SUFFIX)
+                    or path.name in (ACTIVITIES_FILE_NAME, META_FILE_NAME,
+                                     JOURNAL_FILE_NAME,
+                                     ARCHIVE_INDEX_FILE_NAME)):
+                os.remove(path)
+
+
+def open_storage(directory: Path, name: Optional[str] = None) -> Storage:
+    """
+    Returns the storage of the timeline in `directory`. Unless `name` is
+    given, this is the backend the timeline is already stored with, or the
+    one named by TYME_STORAGE for new timelines.
+
+    Args:
+        directory (Path): the directory of a user's timeline
+        name (Optional[str]): the name of the backend, see `STORAGE_NAMES`
+
+    Returns:
+        Storage: the storage of the timeline
+
+    Raises:
+        ValueError: if there is no backend named `name`
+    """
+    if name is None:
+        # a database is only complete once its metadata is written, see
+        # `Timeline.convert`
+        database = directory / DATABASE_FILE_NAME
+        if database.exists():
+            from tyme.sqlite import is_complete
+            if is_complete(database):
+                name = "sqlite"
+
+    if name is None:
+        if directory.exists() or directory.with_suffix(".hjson").exists():
+            name = "files"
+        else:
+            name = TYME_STORAGE
+
+    if name == "files":
+        return FileStorage(directory)
+
+    if name == "sqlite":
+        # sqlite3 is only imported by timelines that use it
+        from tyme.sqlite import SQLiteStorage
+        return SQLiteStorage(directory)
+
+    raise ValueError(f"unknown storage '{name}', use one of: "
+                     + ", ".join(STORAGE_NAMES))
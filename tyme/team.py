@@ -0,0 +1,98 @@
+"""
+Reports over the timelines of several users at once, such as those of a team
+sharing a TYME_TIMELINES_DIR. Each user's timeline is loaded and reported on
+in a separate worker process, and the totals are merged by activity path,
+since the same activity has a different id in every user's hierarchy.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, Iterable, List, Optional
+
+import tyme.utils as utils
+from tyme.timeline import Timeline
+
+
+def user_report(user: str,
+                first_day: str,
+                last_day: str,
+                now: int) -> Dict[str, int]:
+    """
+    Returns the time spent by user `user` on each activity from the start of
+    `first_day` to the end of `last_day`, rolled up through the activity
+    hierarchy.
+
+    Args:
+        user (str): the user whose timeline is reported on
+        first_day (str): the first day of the report
+        last_day (str): the last day of the report
+        now (int): the current time, in seconds since the epoch
+
+    Returns:
+        Dict[str, int]:
+            the seconds spent on each activity path, including its children
+    """
+    timeline = Timeline(user=user)
+    seconds = timeline.report(first_day, last_day, now=now)
+    return {timeline.index.path_by_id[activity_id]: spent
+            for activity_id, spent in seconds.items()}
+
+
+def team_report(users: List[str],
+                first_day: str,
+                last_day: str,
+                workers: Optional[int] = None) -> Dict[str, int]:
+    """
+    Returns the time spent by all of `users` together on each activity from
+    the start of `first_day` to the end of `last_day`, rolled up through the
+    activity hierarchy.
+
+    Args:
+        users (List[str]): the users whose timelines are reported on
+        first_day (str): the first day of the report
+        last_day (str): the last day of the report
+        workers (Optional[int]):
+            the number of worker processes. Defaults to the number of CPUs.
+            With a single worker, or a single user, timelines are reported
+            on in this process.
+
+    Returns:
+        Dict[str, int]:
+            the seconds spent on each activity path, including its children
+    """
+    # every ongoing activity is counted up to the same moment
+    now = utils.epoch(utils.utc_now())
+    report = partial(user_report,
+                     first_day=first_day,
+                     last_day=last_day,
+                     now=now)
+
+    workers = min(workers or os.cpu_count() or 1, len(users))
+
+    if workers <= 1:
+        return merge(map(report, users))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # several users per task, so that small timelines don't cost a
+        # round trip to a worker each
+        chunksize = max(1, len(users) // (workers * 4))
+        return merge(executor.map(report, users, chunksize=chunksize))
+
+
+def merge(reports: Iterable[Dict[str, int]]) -> Dict[str, int]:
+    """
+    Sums the time spent on each activity path over several reports.
+
+    Args:
+        reports (Iterable[Dict[str, int]]): the reports to merge
+
+    Returns:
+        Dict[str, int]: the seconds spent on each activity path
+    """
+    merged: Dict[str, int] = {}
+    for seconds in reports:
+        for path, spent in seconds.items():
+            merged[path] = merged.get(path, 0) + spent
+
+    return merged
@@ -1,26 +1,79 @@
 """
 Main API for interfacing with timeline internal representation. Timelines
-are .hjson files with two fields, "timeline" and "activities". The first is
-a mapping between days and lists of occurences of activities. The second is
-the activity hierarchy.
+have two fields, "timeline" and "activities". The first is a mapping between
+days and lists of occurences of activities, as `Entry` objects (see
+`tyme.entry`). The second is the activity hierarchy, through which the names
+and paths of the activities of entries are found from their ids.
+
+Each user's timeline is stored in its own directory, TYME_TIMELINES_DIR/user,
+by one of the backends of `tyme.storage`. By default, the activity hierarchy
+is kept in activities.json, and the days are split into one JSON Lines shard
+per month (see `tyme.shards`), which are only read when needed. They can
+instead be kept in a SQLite database (see `tyme.sqlite`). Timelines written by
+older versions of tyme are converted on load (see `tyme.migrate`). Every entry
+is stored once, under the day it was started on, and entries spanning several
+days are found from the duration of the longest entry, kept in meta.json (see
+`tyme.meta`). Closed years can be moved into compressed archives (see
+`tyme.archive`), and the time spent on each activity is rolled up per day,
+week and month (see `tyme.rollups`) as entries are completed, so that reports
+don't read entries. Changes to a timeline are not written back to these files
+directly, but appended to a journal (see `tyme.journal`) which is replayed on
+load. The snapshot is only rewritten when the journal is compacted. Databases
+are modified in place instead. The ongoing activity is also cached on its own,
+so that it can be shown without loading the timeline (see `tyme.status`).
+
+Processes that modify a timeline must hold its lock from load to save (see
+`Timeline.locked`). Files are replaced atomically (see `tyme.files`), and
+replaying an event that is already part of the snapshot has no effect, so
+processes that only read a timeline never need to take the lock, even while
+the journal is being compacted.
 """
 
-import uuid
+import bisect
+import contextlib
+import json
+import os
 from collections import defaultdict
-from typing import Any, Dict, List, Optional, Tuple
-
-import hjson
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
+import tyme.archive as archive
+import tyme.report as report
 import tyme.utils as utils
+from tyme.activities import ActivityIndex, JSONActivities
 from tyme.common import *
+from tyme.entry import Entry
+from tyme.errors import TimelineError
+from tyme.files import locked
+from tyme.intervals import OPEN, EntryRef, IntervalIndex
+from tyme.journal import JournalEvent
+from tyme.matcher import ActivityMatcher
+from tyme.meta import FORMAT_VERSION
+from tyme.rollups import Rollups
+from tyme.status import JSONStatus, write_status
+from tyme.storage import open_storage
 
 
 JSONTimeline = Dict[str, List[Dict[str, str]]]
-JSONActivities = Dict[str, Tuple[str, "JSONActivities"]]
 
+# number of journal events after which `save` rebuilds the snapshot
+JOURNAL_COMPACT_THRESHOLD = 256
+
+# marks that the ongoing activity has not been looked up yet
+_UNKNOWN: Any = object()
 
-class TimelineError(Exception):
-    pass
+
+class AmbiguousActivityError(TimelineError):
+    """
+    Raised when a name refers to more than one activity in the hierarchy.
+    """
+
+    def __init__(self, activity: str, paths: List[str]) -> None:
+        self.activity = activity
+        self.paths = paths
+        super().__init__(
+            f"The activity '{activity}' is ambiguous, use one of: "
+            + ", ".join(sorted(paths)))
 
 
 class Timeline:
@@ -48,51 +101,257 @@ class Timeline:
         if user is None:
             user = Timeline.default_user()
         self.user = user
+        self.directory = TYME_TIMELINES_DIR / user
+
+        # the entry of the ongoing activity, if any
+        self._open: Optional[Entry] = _UNKNOWN
+
+        # built on first use, see `intervals`
+        self._intervals: Optional[IntervalIndex] = None
+
+        # built on first use, see `matcher`
+        self._matcher: Optional[ActivityMatcher] = None
+
+        # loaded on first use, see `rollups`
+        self._rollups: Optional[Rollups] = None
+
+        # entries completed since the snapshot was loaded, while the roll-ups
+        # weren't, as (activity id, start, end)
+        self._unrolled: List[Tuple[str, int, int]] = []
+
+        # whether an activity was started or completed since the status
+        # cache was written, see `tyme.status`
+        self._status_stale = False
 
         if timeline is not None and activities is not None:
-            self.timeline = timeline
+            self.storage = open_storage(self.directory)
+            self.timeline = self.storage.new_days(timeline)
             self.activities = activities
+            self.index = ActivityIndex(activities)
+            self.longest = max((entry.end - entry.start
+                                for day in self.timeline
+                                for entry in self.timeline[day]
+                                if entry.end is not None),
+                               default=0)
+
+            self._snapshot_stale = True
+            self._rolled_up = False
 
         elif timeline is None and activities is None:
             user_state = Timeline.load_user_timeline(user)
+            self.storage = user_state["storage"]
             self.timeline = user_state["timeline"]
             self.activities = user_state["activities"]
+            self.index = ActivityIndex(self.activities)
+            self.longest = user_state["meta"].get("longest", 0)
+            self._rolled_up = user_state["meta"].get("rollups", False)
+
+            events = user_state["journal"]
+            for event in events:
+                self._apply(event)
+
+            self._snapshot_stale = False
 
         else:
             raise ValueError(
                 "both timeline and activies must have values or be None")
 
-    def recent_activities(self, num: int) -> Dict[str, List[Dict[str, str]]]:
+    def recent_activities(self, num: int) -> Dict[str, List[Entry]]:
         """
         Returns the `num` most recent activities. The returned object is a
-        dictionary with dates as keys and lists of activities as values. Each
-        activity is also a dictionary, with the same fields present in the
-        timeline.hjson file. The lists are ordered by oldest event first.
+        dictionary with dates as keys and lists of activities as values. The
+        lists are ordered by oldest event first.
 
         Args:
             num (int): the number of activities to return
 
         Returns:
-            Dict[str, List[Dict[str, str]]]: the `num` most recent activities
+            Dict[str, List[Entry]]: the `num` most recent activities
         """
 
         # `activities`: a map from day (str) to a list of timeline entries
-        activities: Dict[str, List[Dict[str, str]]] = defaultdict(list)
+        activities: Dict[str, List[Entry]] = defaultdict(list)
 
-        # Grab the most recent `num` events
-        for day in sorted(self.timeline.keys(), reverse=True):
-            for activity in self.timeline[day]:
-                # not a real activity, but a link to one on a previous day
-                if "previous" in activity:
-                    continue
+        for day, activity in reversed(list(self.iter_recent(num))):
+            activities[day].append(activity)
 
-                activities[day].append(activity)
+        return dict(activities)
 
-                num -= 1
-                if num == 0:
-                    return dict(activities)
+    def iter_recent(self,
+                    num: Optional[int] = None) -> Iterator[Tuple[str, Entry]]:
+        """
+        Yields the activities in this timeline, most recent first, along with
+        the day they were started on. Shards are read as the iteration
+        reaches them, so only as much of the timeline as is consumed is read.
 
-        return dict(activities)
+        Args:
+            num (Optional[int]):
+                the maximum number of activities to yield, or `None` to yield
+                all of them
+
+        Returns:
+            Iterator[Tuple[str, Entry]]: pairs of days and activities
+        """
+        if num is not None and num <= 0:
+            return
+
+        for day, entries in self.timeline.reversed_items():
+            for activity in reversed(entries):
+                yield day, activity
+
+                if num is not None:
+                    num -= 1
+                    if num == 0:
+                        return
+
+    def report(self,
+               first_day: str,
+               last_day: str,
+               now: Optional[int] = None) -> Dict[str, int]:
+        """
+        Returns the number of seconds spent on each activity from the start
+        of `first_day` to the end of `last_day`. The time spent on an
+        activity includes the time spent on all of its children.
+
+        Args:
+            first_day (str): the first day of the report, YYYY-MM-DD
+            last_day (str): the last day of the report, YYYY-MM-DD
+            now (Optional[int]):
+                the end of an ongoing activity, in seconds since the epoch.
+                Defaults to the current time.
+
+        Returns:
+            Dict[str, int]: the seconds spent on each activity id
+        """
+        if now is None:
+            now = utils.epoch(utils.utc_now())
+
+        start = utils.day_epoch(first_day)
+        end = utils.day_epoch(last_day) + 24 * 60 * 60
+
+        # completed entries are counted from the roll-ups, and only the
+        # ongoing activity is clipped to the range
+        seconds = self.rollups.between(first_day, last_day)
+
+        ongoing = self.current_activity()
+        if ongoing is not None:
+            clipped = min(now, end) - max(ongoing.start, start)
+            if clipped > 0:
+                report.add(seconds,
+                           report.roll_up({ongoing.id: clipped}, self.index))
+
+        return seconds
+
+    def entries_between(self, start: int, end: int) -> Iterator[EntryRef]:
+        """
+        Yields the activities that overlap the time between `start` and
+        `end`, along with the day they were started on, oldest first. Unlike
+        `between`, this only reads the shards of the months that may hold
+        such activities: those started at most `longest` seconds before
+        `start`, and the ongoing activity.
+
+        Args:
+            start (int): the start of the range, in seconds since the epoch
+            end (int): the end of the range, in seconds since the epoch
+
+        Returns:
+            Iterator[EntryRef]: pairs of days and activities
+        """
+        earliest = start - self.longest
+
+        ongoing = self.current_activity()
+        if ongoing is not None and ongoing.start < earliest:
+            yield utils.from_epoch(ongoing.start).date_str, ongoing
+
+        for day, entries in self.timeline.items_between(
+                utils.from_epoch(earliest).date_str,
+                utils.from_epoch(end - 1).date_str):
+            for entry in entries:
+                if (entry.start < end
+                        and (entry.end is None or entry.end > start)):
+                    yield day, entry
+
+    @property
+    def intervals(self) -> IntervalIndex:
+        """
+        The index of the time intervals covered by the entries of this
+        timeline. It is built the first time it is used, which requires
+        reading every shard, and is kept up to date by `start` and `done`.
+        """
+        if self._intervals is None:
+            self._intervals = IntervalIndex()
+            for day in self.timeline:
+                for activity in self.timeline[day]:
+                    self._intervals.add(
+                        activity.start,
+                        OPEN if activity.end is None else activity.end,
+                        (day, activity))
+
+        return self._intervals
+
+    @property
+    def rollups(self) -> Rollups:
+        """
+        The roll-ups of the time spent on each activity. They are read as
+        needed if they match the snapshot, and are otherwise rebuilt from
+        every completed entry, which requires reading every shard. Either
+        way, they are kept up to date as entries are completed.
+        """
+        if self._rollups is None:
+            if self._rolled_up:
+                self._rollups = Rollups(self.directory, self.index)
+                for activity_id, start, end in self._unrolled:
+                    self._rollups.add(activity_id, start, end)
+            else:
+                self._rollups = Rollups(self.directory, self.index, fresh=True)
+                for day in self.timeline:
+                    for entry in self.timeline[day]:
+                        if entry.end is not None:
+                            self._rollups.add(entry.id, entry.start, entry.end)
+
+            self._unrolled = []
+
+        return self._rollups
+
+    @property
+    def matcher(self) -> ActivityMatcher:
+        """
+        The matcher of partial activity names. It is built the first time it
+        is used, and is kept up to date as activities are created.
+        """
+        if self._matcher is None:
+            self._matcher = ActivityMatcher(self.index)
+
+        return self._matcher
+
+    def at(self, moment: utils.Timestamp) -> List[EntryRef]:
+        """
+        Returns the activities that were ongoing at `moment`, along with the
+        day they were started on.
+
+        Args:
+            moment (utils.Timestamp): the moment to look up
+
+        Returns:
+            List[EntryRef]: pairs of days and activities
+        """
+        return self.intervals.at(utils.epoch(moment))
+
+    def between(self,
+                start: utils.Timestamp,
+                end: utils.Timestamp) -> List[EntryRef]:
+        """
+        Returns the activities that overlap the time between `start` and
+        `end`, along with the day they were started on, oldest first.
+
+        Args:
+            start (utils.Timestamp): the start of the range
+            end (utils.Timestamp): the end of the range
+
+        Returns:
+            List[EntryRef]: pairs of days and activities
+        """
+        return self.intervals.between(utils.epoch(start), utils.epoch(end))
 
     def start(self,
               activity: str) -> Optional[Tuple[utils.Timestamp, utils.Timestamp, str]]:
@@ -100,7 +359,8 @@ class Timeline:
         Completes any ongoing activity and starts a new one.
 
         Args:
-            activity (str): the activity to be started
+            activity (str):
+                the name or absolute path of the activity to be started
 
         Returns:
             Optional[Tuple[utils.Timestamp, utils.Timestamp, str]]:
@@ -118,14 +378,15 @@ class Timeline:
             activity_completed = self.done()
 
         start_timestamp = utils.utc_now()
-        if start_timestamp.date_str not in self.timeline:
-            self.timeline[start_timestamp.date_str] = []
+        day = start_timestamp.date_str
 
-        self.timeline[start_timestamp.date_str].append({
+        self._record({
+            "op": "start",
             "id": activity_id,
-            "name": activity,
-            "start": start_timestamp.datetime_str
+            "start": start_timestamp.datetime_str,
+            "index": len(self.timeline[day]) if day in self.timeline else 0,
         })
+        self._status_stale = True
 
         return activity_completed
 
@@ -139,68 +400,357 @@ class Timeline:
                 information about the activity that was completed:
                 start/end/name.
         """
-        # grab the most recent day and the most recent activity on that day
-        last_activity = self.timeline[sorted(self.timeline.keys())[-1]][-1]
+        last_activity = self.current_activity()
+        if last_activity is None:
+            raise TimelineError("There is no ongoing activity.")
 
-        start_timestamp = utils.parse(last_activity["start"])
+        start_timestamp = utils.from_epoch(last_activity.start)
         end_timestamp = utils.utc_now()
 
-        last_activity["end"] = end_timestamp.datetime_str
-
         # quickly check that start time is not in the future.
         if start_timestamp.date_str > end_timestamp.date_str:
             raise TimelineError("Finishing activity before it was started. "
                                 "Maybe system clock is wrong?")
 
-        # fill any days in between the start time and today
-        if start_timestamp.date_str != end_timestamp.date_str:
-            num_days = end_timestamp.datetime.day - start_timestamp.datetime.day
-            for offset in range(1, num_days + 1):
-                day = utils.offset_day(start_timestamp, days_offset=offset)
-                self.timeline[day] = [
-                    {
-                        "id": last_activity["id"],
-                        "name": last_activity["name"],
-                        "start": last_activity["start"],
-                        "end": end_timestamp.datetime_str,
-                        "previous": "",
-                    }
-                ]
-
-        return (start_timestamp, end_timestamp, last_activity["name"])
-
-    def current_activity(self) -> Optional[Dict[str, str]]:
+        day_activities = self.timeline[start_timestamp.date_str]
+        completed = self._record({
+            "op": "done",
+            "start": start_timestamp.datetime_str,
+            "end": end_timestamp.datetime_str,
+            "index": next(i for i, activity in enumerate(day_activities)
+                          if activity is last_activity),
+        })
+        self._status_stale = True
+
+        return completed
+
+    def _record(self, event: JournalEvent) -> Any:
         """
-        Returns the ongoing activity if there is one. Returns `None` otherwise.
+        Applies `event` to this timeline and records the change it made in
+        storage, to be made durable by the next `save`.
+
+        Args:
+            event (JournalEvent): the event to be applied
 
         Returns:
-            Optional[Dict[str, str]]:
-                The literal JSON that represents this activity.
+            Any: whatever the handler for this kind of event returns
         """
-        if self.timeline == {}:
-            return None
+        result = self._apply(event)
+
+        if event["op"] == "make":
+            self.storage.create_activity(
+                event["path"], event["id"],
+                self.index.parent_by_id[event["id"]])
+        else:
+            day = utils.parse(event["start"]).date_str
+            entry = self.timeline[day][event["index"]]
+            if event["op"] == "start":
+                self.storage.append_entry(day, event["index"], entry)
+            else:
+                self.storage.close_entry(day, event["index"], entry)
+
+        return result
+
+    def _apply(self, event: JournalEvent) -> Any:
+        """
+        Applies `event` to this timeline without recording it.
+
+        Args:
+            event (JournalEvent): the event to be applied
+
+        Returns:
+            Any: whatever the handler for this kind of event returns
+        """
+        handlers = {
+            "start": self._apply_start,
+            "done": self._apply_done,
+            "make": self._apply_make,
+        }
+        return handlers[event["op"]](event)
+
+    def _apply_start(self, event: JournalEvent) -> None:
+        """
+        Adds the entry described by a "start" event to the timeline, unless
+        the entry at the position it was recorded at already exists.
+        """
+        day = utils.parse(event["start"]).date_str
+        if day not in self.timeline:
+            self.timeline[day] = []
+
+        if event.get("index", len(self.timeline[day])) < len(self.timeline[day]):
+            return
 
-        last_activity = self.timeline[sorted(self.timeline.keys())[-1]][-1]
+        self._open = Entry(event["id"],
+                           utils.parse_epoch(event["start"]))
+        self.timeline[day].append(self._open)
+        self.timeline.mark_dirty(day)
 
-        if "end" in last_activity:
+        if self._intervals is not None:
+            self._intervals.add(self._open.start, OPEN, (day, self._open))
+
+    def _apply_done(self,
+                    event: JournalEvent) -> Optional[Tuple[utils.Timestamp, utils.Timestamp, str]]:
+        """
+        Completes the activity of a "done" event at the time it gives, unless
+        it is already complete.
+        """
+        start_timestamp = utils.parse(event["start"])
+        end_timestamp = utils.parse(event["end"])
+
+        if "index" in event:
+            last_activity = self.timeline[start_timestamp.date_str][
+                event["index"]]
+        else:
+            last_activity = self.current_activity()
+
+        if last_activity is None or last_activity.end is not None:
             return None
 
-        return last_activity
+        last_activity.end = utils.epoch(end_timestamp)
+        self.timeline.mark_dirty(start_timestamp.date_str)
+        if last_activity is self._open:
+            self._open = None
+
+        if self._intervals is not None:
+            self._intervals.close(utils.epoch(start_timestamp),
+                                  utils.epoch(end_timestamp))
+
+        self.longest = max(self.longest,
+                           last_activity.end - last_activity.start)
+        self._completed(last_activity)
+
+        return (start_timestamp,
+                end_timestamp,
+                self.index.name_by_id[last_activity.id])
+
+    def add_entry(self,
+                  activity_id: str,
+                  start: utils.Timestamp,
+                  end: utils.Timestamp) -> None:
+        """
+        Adds a completed activity to the timeline, among the activities of
+        the day it was started on in order of start time, for instance when
+        importing past activities. Unlike `start` and `done`, this is not
+        recorded in the journal, so the next `save` compacts the timeline.
+        It must not overlap any other activity.
+
+        Args:
+            activity_id (str): the id of the activity
+            start (utils.Timestamp): when the activity was started
+            end (utils.Timestamp): when the activity was completed
+        """
+        entry = Entry(activity_id,
+                      utils.epoch(start),
+                      utils.epoch(end))
+        self._insert(start.date_str, entry)
+        self.longest = max(self.longest, entry.end - entry.start)
+        self._completed(entry)
+
+        if self._intervals is not None:
+            self._intervals.add(entry.start,
+                                entry.end,
+                                (start.date_str, entry))
+
+        self._snapshot_stale = True
+
+    def _completed(self, entry: Entry) -> None:
+        """
+        Adds the completed entry `entry` to the roll-ups, or records it until
+        they are loaded.
+        """
+        if self._rollups is not None:
+            self._rollups.add(entry.id, entry.start, entry.end)
+        elif self._rolled_up:
+            self._unrolled.append((entry.id, entry.start, entry.end))
+
+    def _insert(self, day: str, entry: Entry) -> None:
+        """
+        Inserts `entry` among the entries of `day`, in order of start time.
+        """
+        if day not in self.timeline:
+            self.timeline[day] = []
+
+        entries = self.timeline[day]
+        index = bisect.bisect_right([e.start for e in entries], entry.start)
+        entries.insert(index, entry)
+        self.timeline.mark_dirty(day)
+
+    def current_activity(self) -> Optional[Entry]:
+        """
+        Returns the ongoing activity if there is one. Returns `None` otherwise.
+
+        Returns:
+            Optional[Entry]: the entry of this activity
+        """
+        if self._open is _UNKNOWN:
+            last_day = self.timeline.last_day()
+            if (last_day is None
+                    or self.timeline[last_day][-1].end is not None):
+                self._open = None
+            else:
+                self._open = self.timeline[last_day][-1]
+
+        return self._open
+
+    def status(self) -> JSONStatus:
+        """
+        Returns the ongoing activity in the form it is cached in (see
+        `tyme.status`), empty if there is none.
+
+        Returns:
+            JSONStatus: the id, name, path and start of the ongoing activity
+        """
+        ongoing = self.current_activity()
+        if ongoing is None:
+            return {}
+
+        return {"id": ongoing.id,
+                "name": self.index.name_by_id[ongoing.id],
+                "path": self.index.path_by_id[ongoing.id],
+                "start": ongoing.start}
+
+    def write_status(self) -> None:
+        """
+        Writes the ongoing activity to the status cache of this timeline's
+        user (see `tyme.status`).
+        """
+        write_status(self.user, self.status())
+        self._status_stale = False
 
     def save(self) -> str:
         """
-        Saves this timeline to the default location:
+        Saves any changes made to this timeline by appending them to the
+        journal. Nothing is written if the timeline was not modified. Once
+        the journal grows past `JOURNAL_COMPACT_THRESHOLD` events, it is
+        compacted into the snapshot instead. Storage without a journal is
+        compacted whenever there are changes, which only writes those. The
+        status cache is written once the changes are, if an activity was
+        started or completed.
+
+        Returns:
+            str: the location of the file that was written to.
+        """
+        threshold = JOURNAL_COMPACT_THRESHOLD if self.storage.journaled else 0
+        if self._snapshot_stale or self.storage.changes() > threshold:
+            location = self.compact()
+        else:
+            location = self.storage.commit()
+
+        if self._status_stale:
+            self.write_status()
+
+        return location
+
+    def compact(self) -> str:
+        """
+        Rewrites the snapshot of this timeline with all changes made so far,
+        and empties the journal. Only the month shards that changed are
+        rewritten, along with the roll-ups of the years that changed.
+
+        Returns:
+            str: the location of the directory that was saved.
+        """
+        # the roll-ups are marked as stale while they and the snapshot are
+        # out of step, so that they are rebuilt if this is interrupted
+        rollups = self.rollups
+        self._write_meta(rolled_up=self._rolled_up and not rollups.dirty)
+
+        location = self.storage.compact(self.activities,
+                                        prune=self._snapshot_stale)
+        rollups.save()
+        self._write_meta(rolled_up=True)
+
+        self._snapshot_stale = False
+
+        return location
+
+    def _write_meta(self, rolled_up: bool) -> None:
+        """
+        Writes the metadata of this timeline (see `tyme.meta`).
+        """
+        self.storage.write_meta({"version": FORMAT_VERSION,
+                                 "longest": self.longest,
+                                 "rollups": rolled_up})
+        self._rolled_up = rolled_up
+
+    def archive(self,
+                before: str,
+                compression: str = archive.DEFAULT_COMPRESSION) -> List[str]:
+        """
+        Moves every year before `before` into a compressed, read-only archive
+        (see `tyme.archive`), except for the year the ongoing activity was
+        started in and those after it. The timeline is compacted first.
+
+        Args:
+            before (str): the first year not to archive, YYYY
+            compression (str): either "gzip" or "lzma"
 
         Returns:
-            str: the location of the .hjson file that was saved.
+            List[str]: the years that were archived
+
+        Raises:
+            TimelineError: if `before` is after the current year, which can't
+                be archived
+        """
+        current_year = utils.utc_now().date_str[:4]
+        if before > current_year:
+            raise TimelineError(f"The current year, {current_year}, can't "
+                                "be archived.")
+
+        if not self.storage.archivable:
+            raise TimelineError("Timelines stored with "
+                                f"'{self.storage.name}' can't be archived.")
+
+        # journal events refer to entries by their position in a day
+        self.compact()
+
+        ongoing = self.current_activity()
+        if ongoing is not None:
+            before = min(before, utils.from_epoch(ongoing.start).date_str[:4])
+
+        years = [year for year in self.timeline.unarchived_years()
+                 if year < before]
+        for year in years:
+            self.timeline.archive(year, compression)
+
+        return years
+
+    def convert(self, storage_name: str) -> str:
         """
-        timeline_file = (TYME_TIMELINES_DIR / self.user).with_suffix(".hjson")
+        Moves this timeline to the storage backend `storage_name` (see
+        `tyme.storage`), which then replaces the one it was stored with.
+        Archived years are moved too, but are no longer archived.
 
-        with open(timeline_file, "w") as timeline:
-            hjson.dump({"timeline": self.timeline,
-                        "activities": self.activities},
-                       timeline)
-        return str(timeline_file)
+        Args:
+            storage_name (str): the name of the backend
+
+        Returns:
+            str: the location of the timeline in its new storage
+        """
+        if storage_name == self.storage.name:
+            return self.compact()
+
+        self.compact()
+
+        # anything left behind by an interrupted conversion is replaced
+        target = open_storage(self.directory, storage_name)
+        target.remove()
+
+        days = target.new_days({})
+        for day in self.timeline:
+            days[day] = self.timeline[day]
+        location = target.compact(self.activities, prune=True)
+
+        # a timeline is only found in its new storage once this is written
+        target.write_meta({"version": FORMAT_VERSION,
+                           "longest": self.longest,
+                           "rollups": self._rolled_up})
+        self.storage.remove()
+
+        self.storage = target
+        self.timeline = days
+
+        return location
 
     def new_activity(self, activity, parents=False):
         """
@@ -213,27 +763,66 @@ class Timeline:
 
         If parents is true, the parents of an absolute activity path /p1/.../pn
         will also be created if they do not exist.
+
+        Raises:
+            TimelineError: if the path is malformed, one of its parents does
+                not exist, or the activity already exists
         """
         activity_path = activity.split("/")[1:]
         if "" in activity_path:
-            raise ValueError("malformed absolute activity path")
+            raise TimelineError(f"Malformed activity path '{activity}'.")
 
         *path, new_activity = activity_path
 
         current_category = self.activities
-        for category in path:
+        for depth, category in enumerate(path):
             if category not in current_category:
                 if not parents:
-                    raise ValueError(f"the activity '{category}' within "
-                                     f"'{activity}' does not exist")
+                    raise TimelineError(f"The activity '{category}' within "
+                                        f"'{activity}' does not exist.")
                 else:
                     # just make a new activity.
-                    current_category[category] = (str(uuid.uuid4()), {})
+                    self._record({
+                        "op": "make",
+                        "path": "/" + "/".join(path[:depth + 1]),
+                        "id": self.index.next_id(),
+                    })
 
-            # [1] is because the first element in each activity is a uuid
+            # [1] is because the first element in each activity is its id
             current_category = current_category[category][1]
 
-        current_category[new_activity] = (str(uuid.uuid4()), {})
+        if new_activity in current_category:
+            raise TimelineError(f"The activity '{activity}' already exists.")
+
+        self._record({
+            "op": "make",
+            "path": activity,
+            "id": self.index.next_id(),
+        })
+
+    def _apply_make(self, event: JournalEvent) -> None:
+        """
+        Adds the activity described by a "make" event to the hierarchy. All
+        of its parents must already exist.
+        """
+        *path, new_activity = event["path"].split("/")[1:]
+
+        current_category = self.activities
+        for category in path:
+            current_category = current_category[category][1]
+
+        if new_activity in current_category:
+            return
+
+        current_category[new_activity] = (event["id"], {})
+
+        parent_path = "/" + "/".join(path)
+        self.index.add(new_activity,
+                       event["id"],
+                       self.index.id_by_path.get(parent_path))
+
+        if self._matcher is not None:
+            self._matcher.add(event["id"])
 
     def activity_path(self, activity: str) -> Optional[str]:
         """
@@ -246,52 +835,96 @@ class Timeline:
         Returns:
             Optional[str]: the absolute path leading to `activity` if there
                 is one
-        """
-        def search(category, path):
-            """
-            Returns the path if activity is under the sub-tree `category`
-            otherwise returns None
-            """
-            for name, (_, children) in category.items():
-                if name == activity:
-                    return f"{path}/{activity}"
-
-                potential_path = search(children, f"{path}/{name}")
-                if potential_path is not None:
-                    return potential_path
 
+        Raises:
+            AmbiguousActivityError: if more than one activity has this name
+        """
+        activity_id = self.activity_id(activity)
+        if activity_id is None:
             return None
 
-        return search(self.activities, "")
+        return self.index.path_by_id[activity_id]
 
     def activity_id(self, activity: str) -> Optional[str]:
         """
-        Returns the uuid4 corresponding to activity `activity` if there is one.
-        Otherwise, return `None`.
+        Returns the id corresponding to activity `activity` if there is one.
+        Otherwise, return `None`. `activity` can either be a name or an
+        absolute path, the latter being necessary when several activities
+        share the same name. If no activity has exactly this name or path,
+        `activity` may also be part of a name or the start of a path, as
+        long as it only matches a single activity (see `tyme.matcher`).
 
         Args:
             activity (str): the activity whose id is desired
 
         Returns:
-            Optional[str]: the uuid4 corresponding to `activity` if there is
+            Optional[str]: the id corresponding to `activity` if there is
                 one
+
+        Raises:
+            AmbiguousActivityError: if more than one activity matches
         """
-        def search(category: JSONActivities) -> Optional[str]:
-            """
-            Returns the id of `activity` if it is under the sub-tree `category`
-            otherwise returns None
-            """
-            for name, (activity_id, children) in category.items():
-                if name == activity:
-                    return activity_id
+        activity_ids = (self.index.ids(activity)
+                        or self.matcher.match(activity))
+        if len(activity_ids) > 1:
+            raise AmbiguousActivityError(
+                activity, [self.index.path_by_id[i] for i in activity_ids])
 
-                potential_id = search(children)
-                if potential_id is not None:
-                    return potential_id
+        return activity_ids[0] if activity_ids else None
 
-            return None
+    @staticmethod
+    @contextlib.contextmanager
+    def locked(user: str = None) -> Iterator["Timeline"]:
+        """
+        Loads the timeline of user `user` while holding its lock, which is
+        only released when the block exits. Any process that modifies a
+        timeline must load and save it within such a block, so that
+        concurrent modifications are never lost.
+
+        Args:
+            user (str): the user whose timeline is loaded, or `None` for the
+                default user
+
+        Returns:
+            Iterator[Timeline]: the locked timeline
+        """
+        if user is None:
+            user = Timeline.default_user()
 
-        return search(self.activities)
+        # the lock file of a missing timeline would be left behind
+        Timeline.check_exists(user)
+
+        with locked(Timeline.lock_path(user)):
+            yield Timeline(user=user)
+
+    @staticmethod
+    def lock_path(user: str) -> Path:
+        """
+        Returns the path of the lock file of the timeline of user `user`.
+
+        Args:
+            user (str): the user whose timeline's lock file is desired
+
+        Returns:
+            Path: the lock file
+        """
+        return (TYME_TIMELINES_DIR / user).with_suffix(".lock")
+
+    @staticmethod
+    def check_exists(user: str) -> None:
+        """
+        Checks that user `user` has a timeline, in any layout.
+
+        Args:
+            user (str): the user whose timeline is checked
+
+        Raises:
+            TimelineError: if `user` has no timeline
+        """
+        directory = TYME_TIMELINES_DIR / user
+        if not (directory.is_dir()
+                or directory.with_suffix(".hjson").exists()):
+            raise TimelineError(f"There is no timeline for user '{user}'.")
 
     @staticmethod
     def make_empty(user: str) -> None:
@@ -301,7 +934,8 @@ class Timeline:
         Args:
             user (str): the user whose timeline is being created
         """
-        Timeline(user=user, timeline={}, activities={}).save()
+        with locked(Timeline.lock_path(user)):
+            Timeline(user=user, timeline={}, activities={}).save()
 
     @staticmethod
     def default_user() -> str:
@@ -312,21 +946,65 @@ class Timeline:
             str: the name of the default user
         """
         with open(TYME_STATE_FILE) as state_file:
-            return hjson.load(state_file)["default_user"]
+            state_text = state_file.read()
+
+        try:
+            return json.loads(state_text)["default_user"]
+        except ValueError:
+            # written as hjson by older versions of tyme
+            import hjson
+            return hjson.loads(state_text)["default_user"]
+
+    @staticmethod
+    def users() -> List[str]:
+        """
+        Returns every user with a timeline in TYME_TIMELINES_DIR, including
+        those whose timelines are stored in an older layout.
+
+        Returns:
+            List[str]: the names of the users, in order
+        """
+        if not TYME_TIMELINES_DIR.is_dir():
+            return []
+
+        users = set()
+        for entry in os.scandir(TYME_TIMELINES_DIR):
+            if entry.is_dir():
+                users.add(entry.name)
+            elif entry.name.endswith(".hjson"):
+                users.add(entry.name[:-len(".hjson")])
+
+        return sorted(users)
 
     @staticmethod
     def load_user_timeline(user: str) -> Any:
         """
         Loads and returns the json object corresponding to a users timeline.
-        This will contain two fields "timeline" and "activites", each
-        corresponding to a JSONTimeline and JSONActivities object respectively.
+        This will contain two fields "timeline" and "activites", the days of
+        the timeline (see `tyme.storage`) and a JSONActivities object
+        respectively, a "meta" field with its metadata, a "journal" field
+        with the events to replay on top of them, and a "storage" field with
+        the storage it was loaded from. Days in the timeline are read lazily.
 
         Args:
             str: the user whose timeline is desired
 
         Returns:
             The json object corresponding to a users timeline
+
+        Raises:
+            TimelineError: if `user` has no timeline
         """
-        user_timeline_path = (TYME_TIMELINES_DIR / user).with_suffix(".hjson")
-        with open(user_timeline_path) as timeline:
-            return hjson.load(timeline)
+        Timeline.check_exists(user)
+
+        storage = open_storage(TYME_TIMELINES_DIR / user)
+        if storage.needs_migration():
+            with locked(Timeline.lock_path(user)):
+                storage.migrate()
+
+        days, activities, meta, journal = storage.load()
+        return {"journal": journal,
+                "activities": activities,
+                "meta": meta,
+                "timeline": days,
+                "storage": storage}
@@ -0,0 +1,140 @@
+"""
+Per-phase tracing of a tyme invocation, to find out where a slow command
+spends its time. When enabled with `enable`, every `phase` records its wall
+time and the peak memory allocated during it, and `summary` formats them.
+Optionally, the whole invocation is profiled with cProfile.
+
+Memory is tracked with `tracemalloc`, which slows Python down noticeably, so
+wall times are only comparable between traced runs. When tracing is
+disabled, `phase` costs a function call.
+"""
+
+import contextlib
+import sys
+import time
+from typing import Any, Iterator, List, Optional, Tuple
+
+# when the `tyme` package started being imported
+IMPORT_STARTED = time.perf_counter()
+
+# name, wall time in seconds and peak memory in bytes of each phase so far.
+# The memory taken by imports is not known, since it is traced afterwards
+_phases: Optional[List[Tuple[str, float, Optional[int]]]] = None
+
+# the profiler of the invocation and the file its statistics are dumped to
+_profile: Optional[Tuple[Any, str]] = None
+
+
+def enable(profile_path: Optional[str] = None) -> None:
+    """
+    Starts recording phases, and the time spent importing tyme up to now as
+    the "import" phase.
+
+    Args:
+        profile_path (Optional[str]):
+            a file to dump cProfile statistics of the rest of the invocation
+            to when `summary` is called, if any
+    """
+    global _phases, _profile
+    import tracemalloc
+
+    _phases = [("import", time.perf_counter() - IMPORT_STARTED, None)]
+    tracemalloc.start()
+
+    if profile_path is not None:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        _profile = (profiler, profile_path)
+
+
+def enabled() -> bool:
+    """
+    Returns whether phases are being recorded.
+    """
+    return _phases is not None
+
+
+@contextlib.contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Records the wall time and peak memory of the block as the phase `name`,
+    if tracing is enabled. Phases should not be nested.
+
+    Args:
+        name (str): the name of the phase
+    """
+    if _phases is None:
+        yield
+        return
+
+    import tracemalloc
+
+    # before Python 3.9, the peak is the highest since tracing started
+    if hasattr(tracemalloc, "reset_peak"):
+        tracemalloc.reset_peak()
+    current, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        if _phases is not None:
+            _phases.append((name, elapsed, peak - current))
+
+
+def max_rss() -> Optional[int]:
+    """
+    Returns the peak resident memory of this process in bytes, if it is
+    known on this platform.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # in bytes on macOS, and in kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def summary() -> str:
+    """
+    Stops tracing, dumps the cProfile statistics if they were requested, and
+    returns a summary of the phases recorded, one per line.
+
+    Returns:
+        str: the summary, empty if tracing is disabled
+    """
+    global _phases, _profile
+    import tracemalloc
+
+    if _phases is None:
+        return ""
+
+    phases, _phases = _phases, None
+    tracemalloc.stop()
+
+    lines = []
+    for name, elapsed, peak in phases:
+        line = f"{name:>10} {elapsed * 1000:9.2f}ms"
+        if peak is not None:
+            line += f" {peak / 2 ** 20:8.2f}MiB"
+        lines.append(line)
+
+    elapsed = time.perf_counter() - IMPORT_STARTED
+    total = f"{'total':>10} {elapsed * 1000:9.2f}ms"
+    rss = max_rss()
+    if rss is not None:
+        total += f" {rss / 2 ** 20:8.2f}MiB max rss"
+    lines.append(total)
+
+    if _profile is not None:
+        profiler, path = _profile
+        _profile = None
+        profiler.disable()
+        profiler.dump_stats(path)
+        lines.append(f"profile written to {path}")
+
+    return "".join(f"tyme: {line}\n" for line in lines)